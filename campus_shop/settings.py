@@ -72,6 +72,7 @@ INSTALLED_APPS = [
     'stores.apps.StoresConfig',
     'products.apps.ProductsConfig',
     'orders.apps.OrdersConfig',
+    'uploads.apps.UploadsConfig',
 ]
 
 MIDDLEWARE = [
@@ -130,6 +131,28 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# Payment verification locks, count estimates, the category list and store
+# page versions are shared through the cache, so every worker process must
+# use the same one. Set REDIS_URL (e.g. redis://localhost:6379/0) wherever
+# more than one process serves requests; the local-memory fallback is private
+# to each process and only suits a single development server.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'campus-shop',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -217,9 +240,61 @@ PAYSTACK_PUBLIC_KEY = os.getenv('PAYSTACK_PUBLIC_KEY', 'pk_test_ddb3d899f6f7fbbd
 PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY', 'sk_test_3083f3d7f674f923fe89db24ca6d88a2d1845cdc')
 PAYSTACK_CALLBACK_URL = os.getenv('PAYSTACK_CALLBACK_URL', 'https://CampusShop.com')
 
+# Payment verification is coalesced per reference; finished results are cached
+# for this many seconds and a verification lock is held for at most the lock timeout
+PAYSTACK_VERIFY_CACHE_TIMEOUT = int(os.getenv('PAYSTACK_VERIFY_CACHE_TIMEOUT', 30))
+PAYSTACK_VERIFY_LOCK_TIMEOUT = int(os.getenv('PAYSTACK_VERIFY_LOCK_TIMEOUT', 15))
+
 # Platform commission (5% by default)
 PLATFORM_COMMISSION = 0.05  # 5% commission on each sale
 
+# Seller payout runs
+PAYOUT_MINIMUM_AMOUNT = os.getenv('PAYOUT_MINIMUM_AMOUNT', '10.00')
+PAYOUT_MAX_CONCURRENCY = int(os.getenv('PAYOUT_MAX_CONCURRENCY', 4))
+PAYOUT_MAX_ATTEMPTS = int(os.getenv('PAYOUT_MAX_ATTEMPTS', 3))
+
+# Rows fetched per database round trip by the streaming order exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Unfiltered listings of tables at least this large show an estimated count;
+# where no planner estimate exists, exact counts are cached for this long
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ESTIMATED_COUNT_THRESHOLD', 10000))
+ESTIMATED_COUNT_CACHE_TIMEOUT = int(os.getenv('ESTIMATED_COUNT_CACHE_TIMEOUT', 300))
+
+# Seconds the category list with product counts stays cached; saves that
+# change product visibility clear it sooner
+CATEGORY_CACHE_TIMEOUT = int(os.getenv('CATEGORY_CACHE_TIMEOUT', 600))
+
+# Seconds a store page stays cached; changes to the store bump its version sooner
+STORE_PAGE_CACHE_TIMEOUT = int(os.getenv('STORE_PAGE_CACHE_TIMEOUT', 300))
+
+# Chunked uploads: bytes per chunk, largest file accepted, and hours an
+# unfinished or unattached upload is kept before expire_uploads removes it
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 1024 * 1024))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 25 * 1024 * 1024))
+CHUNKED_UPLOAD_EXPIRY_HOURS = int(os.getenv('CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+
+# Digital product downloads: 'stream' through Django, or offload to the web
+# server with 'x-accel' (nginx, internal location at the prefix below) or
+# 'x-sendfile'. Signed download links stay valid for the given seconds.
+DIGITAL_DOWNLOAD_MODE = os.getenv('DIGITAL_DOWNLOAD_MODE', 'stream')
+# Digital product files live here, outside MEDIA_ROOT so they are never served
+# as media; the x-accel internal location should alias this directory
+PROTECTED_MEDIA_ROOT = os.getenv('PROTECTED_MEDIA_ROOT', os.path.join(BASE_DIR, 'protected_media'))
+DIGITAL_DOWNLOAD_ACCEL_PREFIX = os.getenv('DIGITAL_DOWNLOAD_ACCEL_PREFIX', '/protected/')
+DIGITAL_DOWNLOAD_URL_MAX_AGE = int(os.getenv('DIGITAL_DOWNLOAD_URL_MAX_AGE', 300))
+
+# Carts untouched for this many days are removed by sweep_stale_data
+CART_RETENTION_DAYS = int(os.getenv('CART_RETENTION_DAYS', 30))
+
+# Carts for visitors who are not logged in are kept in this signed cookie
+ANONYMOUS_CART_COOKIE = 'campus_shop_cart'
+ANONYMOUS_CART_MAX_AGE = 60 * 60 * 24 * 30
+ANONYMOUS_CART_MAX_LINES = 50
+
+# Finished orders older than this many days are moved out by archive_orders
+ORDER_RETENTION_DAYS = int(os.getenv('ORDER_RETENTION_DAYS', 365))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,6 +1,8 @@
 from .settings import *
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Production settings
 DEBUG = False
 
@@ -32,6 +34,14 @@ DATABASES = {
     }
 }
 
+# Cache - production runs several worker processes, which must share one cache.
+# Refuse to start on the per-process fallback unless explicitly allowed.
+if not REDIS_URL and os.getenv('ALLOW_LOCAL_MEMORY_CACHE', 'False') != 'True':
+    raise ImproperlyConfigured(
+        'Set REDIS_URL to a shared cache; the local-memory cache is private to '
+        'each process. Set ALLOW_LOCAL_MEMORY_CACHE=True for a single-process deployment.'
+    )
+
 # Static files settings for production
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -39,6 +49,8 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files settings
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Digital products; alias DIGITAL_DOWNLOAD_ACCEL_PREFIX to this as an internal location
+PROTECTED_MEDIA_ROOT = os.getenv('PROTECTED_MEDIA_ROOT', os.path.join(BASE_DIR, 'protected_media'))
 
 # Security settings for production
 SECURE_SSL_REDIRECT = False  # Set to True when using HTTPS
@@ -65,5 +77,9 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'INFO',
         },
+        'orders': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     },
 }
\ No newline at end of file
@@ -37,6 +37,7 @@ urlpatterns = [
     path('api/stores/', include('stores.urls')),
     path('api/products/', include('products.urls')),
     path('api/orders/', include('orders.urls')),
+    path('api/uploads/', include('uploads.urls')),
     
     # Health Check
     path('health/', lambda request: JsonResponse({'status': 'ok', 'message': 'Campus Shop API is running'})),
@@ -0,0 +1,158 @@
+"""
+Delivery of protected files such as digital products.
+
+serve_file() answers with one of three modes, chosen by DIGITAL_DOWNLOAD_MODE:
+
+- ``stream``: Django streams the file in blocks with FileResponse, honouring a
+  single-range ``Range`` header so interrupted downloads can resume.
+- ``x-accel``: an empty response with ``X-Accel-Redirect``, for nginx to serve
+  the file from an ``internal`` location at DIGITAL_DOWNLOAD_ACCEL_PREFIX.
+- ``x-sendfile``: an empty response with ``X-Sendfile`` for Apache/lighttpd.
+
+In the offload modes the web server handles ranges itself and the worker is
+free as soon as the headers are sent.
+
+sign_download()/unsign_download() make short-lived download URLs that can be
+handed to a download manager or browser without the API credentials.
+
+Protected files are kept by ProtectedStorage under PROTECTED_MEDIA_ROOT,
+outside MEDIA_ROOT, so no public URL reaches them. The x-accel location at
+DIGITAL_DOWNLOAD_ACCEL_PREFIX should alias that directory.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+
+
+SIGNING_SALT = 'core.downloads'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ProtectedStorage(FileSystemStorage):
+    """Storage for files that are only ever delivered through serve_file()."""
+
+    # Read on every access so overridden settings apply, as for MEDIA_ROOT
+    @property
+    def base_location(self):
+        return settings.PROTECTED_MEDIA_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        # There is deliberately no public URL
+        return ''
+
+
+def protected_storage():
+    """Storage for ``FileField(storage=...)``; a callable keeps it out of migrations."""
+    return _protected_storage
+
+
+_protected_storage = ProtectedStorage()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range ``Range`` header, or None when
+    the whole file should be sent. Multiple ranges are answered in full.
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+class RangeReader:
+    """File-like view of ``length`` bytes of ``file`` from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, field_file, filename=None):
+    """Response delivering ``field_file`` as an attachment named ``filename``."""
+    filename = filename or os.path.basename(field_file.name)
+    mode = settings.DIGITAL_DOWNLOAD_MODE
+
+    if mode in ('x-accel', 'x-sendfile'):
+        response = HttpResponse()
+        # Let the web server pick the type from the file it sends
+        del response['Content-Type']
+        if mode == 'x-accel':
+            response['X-Accel-Redirect'] = settings.DIGITAL_DOWNLOAD_ACCEL_PREFIX + field_file.name
+        else:
+            response['X-Sendfile'] = field_file.path
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    size = field_file.size
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            RangeReader(file, end - start + 1), status=206, as_attachment=True, filename=filename
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def sign_download(*parts):
+    """Token carrying ``parts`` that unsign_download() accepts for a short time."""
+    return signing.dumps([str(part) for part in parts], salt=SIGNING_SALT, compress=True)
+
+
+def unsign_download(token):
+    """The parts signed into ``token``, or None if it is invalid or expired."""
+    try:
+        return signing.loads(token, salt=SIGNING_SALT, max_age=settings.DIGITAL_DOWNLOAD_URL_MAX_AGE)
+    except signing.BadSignature:
+        return None
@@ -0,0 +1,70 @@
+"""
+Pagination that avoids exact COUNT(*) on large, unfiltered tables.
+
+When a listing has no filters, the row count is taken from the database's
+statistics (``pg_class.reltuples`` on PostgreSQL) or, on other backends,
+from an exact count cached for a few minutes. Filtered listings and tables
+below ``ESTIMATED_COUNT_THRESHOLD`` rows are always counted exactly.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+def estimated_count(queryset):
+    """Approximate row count of the queryset's table, or None if unknown."""
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table]
+                )
+                row = cursor.fetchone()
+        except DatabaseError:
+            return None
+        # reltuples is -1 for a table that has never been analyzed
+        if row and row[0] >= 0:
+            return row[0]
+        return None
+
+    timeout = getattr(settings, 'ESTIMATED_COUNT_CACHE_TIMEOUT', 300)
+    return cache.get_or_set(
+        f'rowcount:{queryset.db}:{model._meta.db_table}',
+        lambda: model._default_manager.using(queryset.db).count(),
+        timeout
+    )
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return not query.where and not query.distinct and not query.combinator
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses estimated counts for unfiltered listings."""
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+        if hasattr(object_list, 'query') and is_unfiltered(object_list):
+            estimate = estimated_count(object_list)
+            threshold = getattr(settings, 'ESTIMATED_COUNT_THRESHOLD', 10000)
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super().count
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+
+
+class EstimatedCountAdminMixin:
+    """ModelAdmin mixin that skips exact counts on large changelists."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -3,8 +3,14 @@ import os
 import requests
 import hashlib
 import hmac
+import threading
+import time
+import uuid
 from decimal import Decimal
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils import timezone
 
 
 class PaystackAPI:
@@ -75,14 +81,21 @@ class PaystackAPI:
         
         return hmac.compare_digest(expected_signature, signature)
     
-    def list_transactions(self, page=1, per_page=50):
-        """List transactions"""
+    def list_transactions(self, page=1, per_page=50, status=None, from_date=None, to_date=None):
+        """List transactions, optionally filtered by status and a date window"""
         url = f"{self.base_url}/transaction"
         params = {
             'page': page,
             'perPage': per_page
         }
         
+        if status:
+            params['status'] = status
+        if from_date:
+            params['from'] = from_date.isoformat()
+        if to_date:
+            params['to'] = to_date.isoformat()
+        
         try:
             response = requests.get(url, params=params, headers=self._headers())
             response.raise_for_status()
@@ -90,12 +103,12 @@ class PaystackAPI:
         except requests.exceptions.RequestException as e:
             return {"status": False, "message": f"Request failed: {str(e)}"}
     
-    def create_transfer_recipient(self, account_number, bank_code, name):
+    def create_transfer_recipient(self, account_number, bank_code, name, recipient_type='nuban'):
         """Create a transfer recipient for payouts"""
         url = f"{self.base_url}/transferrecipient"
         
         data = {
-            "type": "nuban",
+            "type": recipient_type,
             "name": name,
             "account_number": account_number,
             "bank_code": bank_code,
@@ -109,8 +122,13 @@ class PaystackAPI:
         except requests.exceptions.RequestException as e:
             return {"status": False, "message": f"Request failed: {str(e)}"}
     
-    def initiate_transfer(self, recipient_code, amount, reason):
-        """Initiate a transfer/payout"""
+    def initiate_transfer(self, recipient_code, amount, reason, reference=None):
+        """
+        Initiate a transfer/payout.
+
+        Paystack rejects a second transfer with the same reference, so passing
+        the payout reference makes retries safe.
+        """
         url = f"{self.base_url}/transfer"
         
         # Convert amount to kobo
@@ -120,9 +138,13 @@ class PaystackAPI:
             "source": "balance",
             "amount": amount_in_kobo,
             "recipient": recipient_code,
-            "reason": reason
+            "reason": reason,
+            "currency": "GHS"
         }
         
+        if reference:
+            data["reference"] = reference
+        
         try:
             response = requests.post(url, json=data, headers=self._headers())
             response.raise_for_status()
@@ -130,6 +152,17 @@ class PaystackAPI:
         except requests.exceptions.RequestException as e:
             return {"status": False, "message": f"Request failed: {str(e)}"}
     
+    def verify_transfer(self, reference):
+        """Look up a transfer by its reference"""
+        url = f"{self.base_url}/transfer/verify/{reference}"
+        
+        try:
+            response = requests.get(url, headers=self._headers())
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return {"status": False, "message": f"Verification failed: {str(e)}"}
+    
     def get_banks(self):
         """Get list of supported banks"""
         url = f"{self.base_url}/bank"
@@ -213,57 +246,179 @@ def process_order_payment(order, payment_method='paystack'):
         }
 
 
+# In-process locks keyed by payment reference. Each entry is [lock, waiters] so the
+# entry can be dropped once nobody is waiting on it.
+_verification_locks = {}
+_verification_locks_guard = threading.Lock()
+
+
+def _verification_cache_key(reference):
+    return f"paystack:verify:{reference}"
+
+
+def forget_verifications(references):
+    """Drop cached verification results for payments settled by other means."""
+    cache.delete_many([_verification_cache_key(reference) for reference in references])
+
+
+def _acquire_verification_lock(reference):
+    with _verification_locks_guard:
+        entry = _verification_locks.setdefault(reference, [threading.Lock(), 0])
+        entry[1] += 1
+    entry[0].acquire()
+    return entry
+
+
+def _release_verification_lock(reference, entry):
+    entry[0].release()
+    with _verification_locks_guard:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _verification_locks.pop(reference, None)
+
+
 def verify_order_payment(reference):
-    """Verify payment and update order status"""
+    """
+    Verify payment and update order status.
+
+    The callback page, page refreshes and the webhook all verify the same
+    reference, so verification is single-flight: concurrent callers wait for
+    the one in-flight verification and the finished result is cached briefly.
+    Only the order id is cached; the order itself is read fresh for every caller.
+    """
+    cache_key = _verification_cache_key(reference)
+    result = cache.get(cache_key)
+    if result is not None:
+        return _with_order(result)
+
+    entry = _acquire_verification_lock(reference)
+    try:
+        # Another thread may have finished while we were waiting
+        result = cache.get(cache_key)
+        if result is not None:
+            return _with_order(result)
+
+        # Coordinate with other worker processes through the cache. The lock
+        # holds a token so only the worker that took it ever deletes it.
+        lock_key = f"{cache_key}:lock"
+        lock_timeout = getattr(settings, 'PAYSTACK_VERIFY_LOCK_TIMEOUT', 15)
+        token = uuid.uuid4().hex
+        acquired = cache.add(lock_key, token, timeout=lock_timeout)
+        if not acquired:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                result = cache.get(cache_key)
+                if result is not None:
+                    return _with_order(result)
+            # The holder is taking too long; go ahead, taking the lock if it expired
+            acquired = cache.add(lock_key, token, timeout=lock_timeout)
+
+        try:
+            result = _verify_order_payment(reference)
+            if result.pop('cacheable', False):
+                cache.set(
+                    cache_key,
+                    result,
+                    timeout=getattr(settings, 'PAYSTACK_VERIFY_CACHE_TIMEOUT', 30)
+                )
+        finally:
+            if acquired and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        return _with_order(result)
+    finally:
+        _release_verification_lock(reference, entry)
+
+
+def _with_order(result):
+    """Copy of a verification result with its ``order_id`` loaded as ``order``.
+
+    Orders archived since the result was cached are loaded from the archive,
+    which keeps their ids; an order that is gone entirely fails the result.
+    """
+    from orders.models import ArchivedOrder, Order
+
+    result = dict(result)
+    order_id = result.pop('order_id', None)
+    if order_id is not None:
+        order = (
+            Order.objects.filter(pk=order_id).first()
+            or ArchivedOrder.objects.filter(pk=order_id).first()
+        )
+        if order is None:
+            return {'success': False, 'message': 'Order not found'}
+        result['order'] = order
+    return result
+
+
+def _verify_order_payment(reference):
+    """Verify a single reference with Paystack and apply the result once."""
     from orders.models import Transaction
-    
+
     try:
-        transaction = Transaction.objects.get(reference=reference)
-        order = transaction.order
-        
-        # Initialize Paystack API
-        paystack = PaystackAPI()
-        
-        # Verify transaction with Paystack
-        response = paystack.verify_transaction(reference)
-        
-        if response.get('status') and response['data']['status'] == 'success':
-            # Payment successful
-            transaction.status = 'completed'
-            transaction.gateway_response = response
-            transaction.save()
-            
-            # Update order
-            order.is_paid = True
-            order.payment_reference = reference
-            order.status = 'processing'  # Move from pending to processing
-            order.save()
-            
-            # Update product inventory
-            for item in order.items.all():
-                product = item.product
-                if product.quantity >= item.quantity:
-                    product.quantity -= item.quantity
-                    product.save()
-            
-            return {
-                'success': True,
-                'order': order,
-                'message': 'Payment verified successfully'
-            }
-        else:
-            # Payment failed
-            transaction.status = 'failed'
-            transaction.gateway_response = response
-            transaction.save()
-            
-            return {
-                'success': False,
-                'message': 'Payment verification failed'
-            }
-            
+        transaction = Transaction.objects.select_related('order').get(reference=reference)
     except Transaction.DoesNotExist:
         return {
             'success': False,
             'message': 'Transaction not found'
-        }
\ No newline at end of file
+        }
+
+    order = transaction.order
+
+    # Already applied by an earlier verification, no need to ask Paystack again
+    if transaction.status == 'completed':
+        return {
+            'success': True,
+            'order_id': order.pk,
+            'message': 'Payment verified successfully',
+            'cacheable': True
+        }
+
+    # Initialize Paystack API
+    paystack = PaystackAPI()
+
+    # Verify transaction with Paystack
+    response = paystack.verify_transaction(reference)
+
+    if not response.get('status'):
+        # Paystack could not be reached, leave the transaction untouched
+        return {
+            'success': False,
+            'message': response.get('message', 'Payment verification failed')
+        }
+
+    now = timezone.now()
+    if response['data']['status'] == 'success':
+        with db_transaction.atomic():
+            # Only the caller that moves the transaction out of its open state
+            # updates the order and inventory
+            applied = Transaction.objects.filter(
+                pk=transaction.pk
+            ).exclude(status='completed').update(
+                status='completed',
+                gateway_response=response,
+                paid_at=now,
+                updated_at=now
+            )
+            if applied:
+                order.mark_as_paid(payment_reference=reference)
+
+        return {
+            'success': True,
+            'order_id': order.pk,
+            'message': 'Payment verified successfully',
+            'cacheable': True
+        }
+
+    # Payment failed
+    Transaction.objects.filter(pk=transaction.pk, status='pending').update(
+        status='failed',
+        gateway_response=response,
+        updated_at=now
+    )
+
+    return {
+        'success': False,
+        'message': 'Payment verification failed',
+        'cacheable': True
+    }
@@ -24,6 +24,8 @@ function AdminVerificationDashboard() {
   const [filter, setFilter] = useState('all'); // all, pending, verified, rejected
   const [searchTerm, setSearchTerm] = useState('');
   const [showReviewModal, setShowReviewModal] = useState(false);
+  const [selectedIds, setSelectedIds] = useState([]);
+  const [isBulkUpdating, setIsBulkUpdating] = useState(false);
 
   useEffect(() => {
     loadPendingVerifications();
@@ -32,8 +34,15 @@ function AdminVerificationDashboard() {
   const loadPendingVerifications = async () => {
     try {
       setIsLoading(true);
-      const response = await storesAPI.getPendingVerifications();
-      setPendingVerifications(response.pending_verifications || []);
+      // The queue is paginated; follow `next` until every page is loaded
+      let page = await storesAPI.getPendingVerifications();
+      const verifications = [...(page.results || [])];
+      while (page.next) {
+        page = await storesAPI.getPendingVerifications(page.next);
+        verifications.push(...(page.results || []));
+      }
+      setPendingVerifications(verifications);
+      setSelectedIds([]);
     } catch (err) {
       setError('Failed to load verification requests');
       console.error('Verification loading error:', err);
@@ -66,6 +75,30 @@ function AdminVerificationDashboard() {
     }
   };
 
+  const handleBulkDecision = async (decision) => {
+    if (selectedIds.length === 0) return;
+    const label = decision === 'approve' ? 'approve' : 'reject';
+    if (!window.confirm(`Are you sure you want to ${label} ${selectedIds.length} verification(s)?`)) {
+      return;
+    }
+    try {
+      setIsBulkUpdating(true);
+      await storesAPI.bulkVerification(selectedIds, decision);
+      await loadPendingVerifications(); // Reload data
+    } catch (error) {
+      console.error(`Failed to ${label} verifications:`, error);
+      alert(`Failed to ${label} the selected verifications. Please try again.`);
+    } finally {
+      setIsBulkUpdating(false);
+    }
+  };
+
+  const toggleSelected = (storeId) => {
+    setSelectedIds((ids) =>
+      ids.includes(storeId) ? ids.filter((id) => id !== storeId) : [...ids, storeId]
+    );
+  };
+
   const openReviewModal = async (verification) => {
     try {
       // Load full verification details
@@ -87,6 +120,19 @@ function AdminVerificationDashboard() {
     return matchesSearch;
   });
 
+  const allFilteredSelected =
+    filteredVerifications.length > 0 &&
+    filteredVerifications.every((verification) => selectedIds.includes(verification.store_id));
+
+  const toggleAllFiltered = () => {
+    const filteredIds = filteredVerifications.map((verification) => verification.store_id);
+    setSelectedIds((ids) =>
+      allFilteredSelected
+        ? ids.filter((id) => !filteredIds.includes(id))
+        : [...new Set([...ids, ...filteredIds])]
+    );
+  };
+
   if (isLoading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -227,8 +273,29 @@ function AdminVerificationDashboard() {
 
       {/* Verifications Table */}
       <div className="bg-white shadow rounded-lg overflow-hidden">
-        <div className="px-6 py-4 border-b border-gray-200">
+        <div className="px-6 py-4 border-b border-gray-200 flex items-center justify-between">
           <h3 className="text-lg font-medium text-gray-900">Pending Verifications</h3>
+          {selectedIds.length > 0 && (
+            <div className="flex items-center space-x-3">
+              <span className="text-sm text-gray-500">{selectedIds.length} selected</span>
+              <button
+                onClick={() => handleBulkDecision('reject')}
+                disabled={isBulkUpdating}
+                className="inline-flex items-center px-3 py-1 text-sm font-medium text-white bg-red-600 border border-transparent rounded-md hover:bg-red-700 disabled:opacity-50"
+              >
+                <XCircle className="h-4 w-4 mr-1" />
+                Reject Selected
+              </button>
+              <button
+                onClick={() => handleBulkDecision('approve')}
+                disabled={isBulkUpdating}
+                className="inline-flex items-center px-3 py-1 text-sm font-medium text-white bg-green-600 border border-transparent rounded-md hover:bg-green-700 disabled:opacity-50"
+              >
+                <CheckCircle className="h-4 w-4 mr-1" />
+                Approve Selected
+              </button>
+            </div>
+          )}
         </div>
 
         {filteredVerifications.length === 0 ? (
@@ -244,6 +311,15 @@ function AdminVerificationDashboard() {
             <table className="min-w-full divide-y divide-gray-200">
               <thead className="bg-gray-50">
                 <tr>
+                  <th className="px-6 py-3 text-left">
+                    <input
+                      type="checkbox"
+                      checked={allFilteredSelected}
+                      onChange={toggleAllFiltered}
+                      aria-label="Select all verifications"
+                      className="rounded border-gray-300 text-primary-600 focus:ring-primary-500"
+                    />
+                  </th>
                   <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                     Store / Business
                   </th>
@@ -267,6 +343,15 @@ function AdminVerificationDashboard() {
               <tbody className="bg-white divide-y divide-gray-200">
                 {filteredVerifications.map((verification) => (
                   <tr key={verification.store_id} className="hover:bg-gray-50">
+                    <td className="px-6 py-4 whitespace-nowrap">
+                      <input
+                        type="checkbox"
+                        checked={selectedIds.includes(verification.store_id)}
+                        onChange={() => toggleSelected(verification.store_id)}
+                        aria-label={`Select ${verification.store_name}`}
+                        className="rounded border-gray-300 text-primary-600 focus:ring-primary-500"
+                      />
+                    </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div>
                         <div className="text-sm font-medium text-gray-900">
@@ -349,7 +349,7 @@ function SellerOrdersPage() {
                         )}
                         
                         <button
-                          onClick={() => window.open(`/orders/${order.id}`, '_blank')}
+                          onClick={() => window.open(`/orders/${order.order_id}`, '_blank')}
                           className="inline-flex items-center px-3 py-1 border border-gray-300 text-sm leading-4 font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50"
                         >
                           <Eye className="h-4 w-4" />
@@ -254,9 +254,20 @@ export const storesAPI = {
     return response.data;
   },
 
-  // Admin: Get pending verifications
-  getPendingVerifications: async () => {
-    const response = await api.get('/stores/pending_verifications/');
+  // Admin: Get a page of pending verifications ({count, next, previous, results});
+  // pass a page's `next` URL to get the following page
+  getPendingVerifications: async (url = '/stores/pending_verifications/') => {
+    const response = await api.get(url);
+    return response.data;
+  },
+
+  // Admin: Approve or reject many pending verifications at once
+  bulkVerification: async (storeIds, decision, notes = '') => {
+    const response = await api.post('/stores/bulk_verification/', {
+      store_ids: storeIds,
+      decision,
+      notes,
+    });
     return response.data;
   },
 
@@ -1,5 +1,13 @@
-from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem, Transaction, OrderStatusHistory, SellerPayout
+from django.contrib import admin, messages
+from django.utils import timezone
+from core.pagination import EstimatedCountAdminMixin
+from core.paystack import PaystackAPI
+from . import payouts
+from .models import (
+    Cart, CartItem, Order, OrderItem, StoreOrder, Transaction, OrderStatusHistory, SellerPayout,
+    SellerBalance, SellerLedgerEntry, SellerPayoutAccount, PayoutRun, ArchivedOrder,
+    ArchivedOrderItem, ArchivedTransaction
+)
 
 
 class CartItemInline(admin.TabularInline):
@@ -23,34 +31,44 @@ class CartAdmin(admin.ModelAdmin):
 
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['cart', 'product', 'variant', 'quantity', 'price']
     list_filter = ['created_at']
     search_fields = ['cart__user__email', 'product__name']
     raw_id_fields = ['cart', 'product', 'variant']
 
 
+class StoreOrderInline(admin.TabularInline):
+    model = StoreOrder
+    extra = 0
+    readonly_fields = ['store', 'status', 'subtotal', 'platform_fee', 'total', 'created_at', 'delivered_at']
+    can_delete = False
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ['product_name', 'variant_name', 'price', 'quantity', 'subtotal', 'total']
-    raw_id_fields = ['product', 'variant', 'store']
+    raw_id_fields = ['product', 'variant', 'store', 'store_order']
 
 
 class OrderStatusHistoryInline(admin.TabularInline):
     model = OrderStatusHistory
     extra = 0
-    readonly_fields = ['status', 'note', 'created_by', 'created_at']
+    readonly_fields = ['previous_status', 'status', 'note', 'created_by', 'created_at']
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['order_number', 'user', 'status', 'payment_status', 'total', 'created_at']
     list_filter = ['status', 'payment_status', 'payment_method', 'created_at']
     search_fields = ['order_number', 'user__email', 'payment_reference']
     raw_id_fields = ['user', 'shipping_address', 'billing_address']
-    inlines = [OrderItemInline, OrderStatusHistoryInline]
-    readonly_fields = ['order_number', 'created_at', 'updated_at', 'paid_at', 'delivered_at']
+    inlines = [StoreOrderInline, OrderItemInline, OrderStatusHistoryInline]
+    # Status changes go through the actions so store orders and history follow
+    readonly_fields = [
+        'order_number', 'status', 'payment_status', 'created_at', 'updated_at', 'paid_at', 'delivered_at'
+    ]
     
     fieldsets = (
         ('Order Information', {
@@ -73,21 +91,67 @@ class OrderAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered']
     
+    def _transition(self, request, queryset, new_status, **changes):
+        moved = Order.transition_orders(
+            queryset.values_list('pk', flat=True), new_status,
+            changed_by=request.user, note='Changed in admin', **changes
+        )
+        skipped = queryset.count() - len(moved)
+        self.message_user(request, f"{len(moved)} order(s) updated, {skipped} skipped.")
+
     def mark_as_processing(self, request, queryset):
-        queryset.update(status='processing')
+        self._transition(request, queryset, 'processing')
     mark_as_processing.short_description = "Mark selected orders as Processing"
     
     def mark_as_shipped(self, request, queryset):
-        queryset.update(status='shipped')
+        self._transition(request, queryset, 'shipped')
     mark_as_shipped.short_description = "Mark selected orders as Shipped"
     
     def mark_as_delivered(self, request, queryset):
-        queryset.update(status='delivered')
+        self._transition(request, queryset, 'delivered', delivered_at=timezone.now())
     mark_as_delivered.short_description = "Mark selected orders as Delivered"
 
 
+@admin.register(StoreOrder)
+class StoreOrderAdmin(admin.ModelAdmin):
+    list_display = ['order', 'store', 'status', 'subtotal', 'platform_fee', 'total', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['order__order_number', 'store__name']
+    raw_id_fields = ['order', 'store']
+    # Status changes go through the actions so the ledger and the order follow
+    readonly_fields = ['status', 'created_at', 'updated_at', 'delivered_at']
+    list_select_related = ['order', 'store']
+
+    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered', 'mark_as_cancelled']
+
+    def _transition(self, request, queryset, new_status):
+        # update_status moves each one with StoreOrder.transition_store_orders
+        moved = sum(
+            store_order.update_status(new_status, changed_by=request.user)
+            for store_order in queryset.select_related('order')
+        )
+        skipped = queryset.count() - moved
+        self.message_user(request, f"{moved} store order(s) updated, {skipped} skipped.")
+
+    def mark_as_processing(self, request, queryset):
+        self._transition(request, queryset, 'processing')
+    mark_as_processing.short_description = "Mark selected store orders as Processing"
+
+    def mark_as_shipped(self, request, queryset):
+        self._transition(request, queryset, 'shipped')
+    mark_as_shipped.short_description = "Mark selected store orders as Shipped"
+
+    def mark_as_delivered(self, request, queryset):
+        self._transition(request, queryset, 'delivered')
+    mark_as_delivered.short_description = "Mark selected store orders as Delivered"
+
+    def mark_as_cancelled(self, request, queryset):
+        self._transition(request, queryset, 'cancelled')
+    mark_as_cancelled.short_description = "Cancel selected store orders"
+
+
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['order', 'product_name', 'variant_name', 'store', 'quantity', 'price', 'total']
     list_filter = ['created_at']
     search_fields = ['order__order_number', 'product_name', 'store__name']
@@ -95,7 +159,7 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['reference', 'order', 'amount', 'currency', 'payment_method', 'status', 'created_at']
     list_filter = ['status', 'payment_method', 'created_at']
     search_fields = ['reference', 'order__order_number']
@@ -118,7 +182,7 @@ class TransactionAdmin(admin.ModelAdmin):
 
 @admin.register(OrderStatusHistory)
 class OrderStatusHistoryAdmin(admin.ModelAdmin):
-    list_display = ['order', 'status', 'created_by', 'created_at']
+    list_display = ['order', 'previous_status', 'status', 'created_by', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['order__order_number', 'note']
     raw_id_fields = ['order', 'created_by']
@@ -127,15 +191,16 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
 
 @admin.register(SellerPayout)
 class SellerPayoutAdmin(admin.ModelAdmin):
-    list_display = ['reference', 'store', 'amount', 'fee', 'status', 'created_at']
+    list_display = ['reference', 'store', 'run', 'amount', 'fee', 'status', 'created_at']
     list_filter = ['status', 'payment_method', 'created_at']
-    search_fields = ['reference', 'store__name']
-    raw_id_fields = ['store']
-    readonly_fields = ['created_at', 'updated_at', 'processed_at']
+    search_fields = ['reference', 'store__name', 'run__reference']
+    raw_id_fields = ['store', 'run']
+    # Status changes go through orders.payouts so the ledger follows
+    readonly_fields = ['status', 'created_at', 'updated_at', 'processed_at']
     
     fieldsets = (
         ('Payout Information', {
-            'fields': ('store', 'reference', 'amount', 'fee', 'payment_method')
+            'fields': ('store', 'run', 'reference', 'amount', 'fee', 'payment_method')
         }),
         ('Status', {
             'fields': ('status', 'payment_details', 'notes')
@@ -146,14 +211,114 @@ class SellerPayoutAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_as_processing', 'mark_as_completed']
-    
-    def mark_as_processing(self, request, queryset):
-        for payout in queryset:
-            payout.mark_as_processing()
-    mark_as_processing.short_description = "Mark selected payouts as Processing"
+    actions = ['check_transfers', 'mark_as_completed', 'mark_as_failed']
+
+    def get_readonly_fields(self, request, obj=None):
+        # The amount was reserved in the ledger when the payout was created
+        if obj is not None:
+            return self.readonly_fields + ['store', 'run', 'reference', 'amount', 'fee']
+        return self.readonly_fields
+
+    def check_transfers(self, request, queryset):
+        try:
+            gateway = PaystackAPI()
+        except ValueError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
+        stats = payouts.check_transfers(queryset, gateway)
+        self.message_user(
+            request, f"{stats['completed']} payout(s) completed, {stats['failed']} failed."
+        )
+    check_transfers.short_description = "Check selected payouts with Paystack"
     
     def mark_as_completed(self, request, queryset):
-        for payout in queryset:
-            payout.mark_as_completed()
+        closed = payouts.close_payouts(queryset, 'completed')
+        self.message_user(request, f"{closed} payout(s) marked as completed.")
     mark_as_completed.short_description = "Mark selected payouts as Completed"
+
+    def mark_as_failed(self, request, queryset):
+        closed = payouts.close_payouts(queryset, 'failed', reason='Marked as failed in admin')
+        self.message_user(request, f"{closed} payout(s) marked as failed.")
+    mark_as_failed.short_description = "Mark selected payouts as Failed"
+
+
+@admin.register(SellerPayoutAccount)
+class SellerPayoutAccountAdmin(admin.ModelAdmin):
+    list_display = ['store', 'account_type', 'account_name', 'account_number', 'bank_code', 'recipient_code']
+    list_filter = ['account_type']
+    search_fields = ['store__name', 'account_name', 'account_number']
+    raw_id_fields = ['store']
+    readonly_fields = ['recipient_code', 'created_at', 'updated_at']
+
+
+class SellerPayoutInline(admin.TabularInline):
+    model = SellerPayout
+    extra = 0
+    fields = ['reference', 'store', 'amount', 'status', 'processed_at']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(PayoutRun)
+class PayoutRunAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'status', 'minimum_amount', 'created_at', 'completed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['reference']
+    readonly_fields = ['reference', 'status', 'minimum_amount', 'created_at', 'completed_at']
+    inlines = [SellerPayoutInline]
+
+
+@admin.register(SellerBalance)
+class SellerBalanceAdmin(admin.ModelAdmin):
+    list_display = ['store', 'available_balance', 'total_sales', 'platform_fees',
+                    'total_payouts', 'pending_payouts', 'updated_at']
+    search_fields = ['store__name']
+    raw_id_fields = ['store']
+    readonly_fields = SellerBalance.TOTAL_FIELDS + ['updated_at']
+
+
+@admin.register(SellerLedgerEntry)
+class SellerLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['store', 'entry_type', 'amount', 'balance_after', 'description', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['store__name', 'description']
+    raw_id_fields = ['store', 'store_order', 'payout']
+    readonly_fields = ['store', 'entry_type', 'amount', 'balance_after', 'store_order',
+                       'payout', 'description', 'created_at']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ['product_name', 'variant_name', 'store', 'quantity', 'price', 'total']
+    readonly_fields = fields
+    can_delete = False
+
+
+class ArchivedTransactionInline(admin.TabularInline):
+    model = ArchivedTransaction
+    extra = 0
+    fields = ['reference', 'amount', 'status', 'paid_at']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ['order_number', 'user', 'status', 'payment_status', 'total', 'created_at', 'archived_at']
+    list_filter = ['status', 'payment_status', 'created_at']
+    search_fields = ['order_number', 'user__email', 'payment_reference']
+    raw_id_fields = ['user', 'shipping_address', 'billing_address']
+    inlines = [ArchivedOrderItemInline, ArchivedTransactionInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
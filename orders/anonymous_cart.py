@@ -0,0 +1,245 @@
+"""
+Carts for visitors who are not logged in.
+
+An anonymous cart lives entirely in a signed cookie as a list of
+``[product_id, variant_id, quantity]`` lines; it never creates database
+rows. Reading it validates every line against the catalogue in a single
+query, and the first authenticated cart request after login merges it into
+the user's Cart.
+"""
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
+from django.db.models import Exists, FilteredRelation, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from products.models import Product, ProductImage, ProductVariant
+from .models import CartItem
+
+
+SALT = 'orders.anonymous_cart'
+
+
+def read_lines(request):
+    """The cookie's cart lines, or an empty list if it is missing or tampered with."""
+    try:
+        value = request.get_signed_cookie(
+            settings.ANONYMOUS_CART_COOKIE,
+            salt=SALT,
+            max_age=settings.ANONYMOUS_CART_MAX_AGE
+        )
+    except (KeyError, signing.BadSignature):
+        return []
+
+    try:
+        lines = json.loads(value)
+    except ValueError:
+        return []
+    if not isinstance(lines, list):
+        return []
+    return [
+        (line[0], line[1], line[2]) for line in lines
+        if isinstance(line, list) and len(line) == 3
+        and isinstance(line[0], int)
+        and (line[1] is None or isinstance(line[1], int))
+        and isinstance(line[2], int) and line[2] > 0
+    ][:settings.ANONYMOUS_CART_MAX_LINES]
+
+
+def write_lines(request, response, lines):
+    if not lines:
+        response.delete_cookie(settings.ANONYMOUS_CART_COOKIE)
+        return
+    response.set_signed_cookie(
+        settings.ANONYMOUS_CART_COOKIE,
+        json.dumps([list(line) for line in lines], separators=(',', ':')),
+        salt=SALT,
+        max_age=settings.ANONYMOUS_CART_MAX_AGE,
+        secure=request.is_secure(),
+        httponly=True,
+        samesite='Lax'
+    )
+
+
+def set_line(lines, product_id, variant_id, quantity):
+    """Return ``lines`` with the given line set to ``quantity`` (0 removes it)."""
+    key = (product_id, variant_id)
+    new_line = (product_id, variant_id, quantity)
+    if not any(line[:2] == key for line in lines):
+        return [*lines, new_line] if quantity > 0 else list(lines)
+    # Keep the line where it was so the cart order stays stable
+    return [
+        new_line if line[:2] == key else line
+        for line in lines
+        if line[:2] != key or quantity > 0
+    ]
+
+
+def resolve_lines(lines, rejected=None):
+    """
+    Validate cart lines against the catalogue in one query.
+
+    Returns ``(items, valid_lines)``. Lines for inactive or missing products
+    or variants, or for products that need a variant, are dropped;
+    quantities are capped at the stock available. If ``rejected`` is a
+    dict, it is filled with the reason each dropped line was dropped.
+    """
+    if rejected is None:
+        rejected = {}
+    if not lines:
+        return [], []
+
+    product_ids = {line[0] for line in lines}
+    variant_ids = {line[1] for line in lines if line[1] is not None}
+    main_image = ProductImage.objects.filter(
+        product=OuterRef('pk'), is_main=True
+    ).order_by('position', 'created_at').values('image')[:1]
+    rows = Product.objects.filter(pk__in=product_ids, is_active=True).annotate(
+        has_variants=Exists(ProductVariant.objects.filter(product=OuterRef('pk'))),
+        main_image=Subquery(main_image),
+    )
+    fields = ['id', 'name', 'slug', 'price', 'quantity', 'has_variants', 'main_image']
+    if variant_ids:
+        # One row per requested variant, joined onto its product
+        rows = rows.annotate(cart_variant=FilteredRelation(
+            'variants',
+            condition=Q(variants__pk__in=variant_ids, variants__is_active=True)
+        ))
+        fields += [
+            'cart_variant__id', 'cart_variant__name', 'cart_variant__price',
+            'cart_variant__quantity'
+        ]
+
+    products = {}
+    variants = {}
+    for row in rows.values(*fields):
+        products[row['id']] = row
+        if row.get('cart_variant__id') is not None:
+            variants[(row['id'], row['cart_variant__id'])] = row
+
+    items = []
+    valid_lines = []
+    for product_id, variant_id, quantity in lines:
+        key = (product_id, variant_id)
+        if variant_id is None:
+            row = products.get(product_id)
+            if row is None:
+                rejected[key] = 'Product is no longer available'
+                continue
+            if row['has_variants']:
+                rejected[key] = 'Choose an option for this product'
+                continue
+            price, available, variant_name = row['price'], row['quantity'], None
+        else:
+            row = variants.get(key)
+            if row is None:
+                rejected[key] = 'Product option is no longer available'
+                continue
+            price = row['cart_variant__price']
+            available = row['cart_variant__quantity']
+            variant_name = row['cart_variant__name']
+
+        quantity = min(quantity, available)
+        if quantity <= 0:
+            rejected[key] = 'Out of stock'
+            continue
+        valid_lines.append((product_id, variant_id, quantity))
+        items.append({
+            'product': product_id,
+            'product_name': row['name'],
+            'product_slug': row['slug'],
+            'variant': variant_id,
+            'variant_name': variant_name,
+            'quantity': quantity,
+            'price': price,
+            'available': available,
+            'image': row['main_image'],
+        })
+    return items, valid_lines
+
+
+def cart_data(request, items):
+    """Serialize resolved items in the same shape as CartSerializer."""
+    data_items = []
+    subtotal = Decimal('0.00')
+    for item in items:
+        total_price = item['price'] * item['quantity']
+        subtotal += total_price
+        image = item['image']
+        data_items.append({
+            'id': None,
+            'product': item['product'],
+            'product_name': item['product_name'],
+            'product_slug': item['product_slug'],
+            'variant': item['variant'],
+            'variant_name': item['variant_name'],
+            'quantity': item['quantity'],
+            'price': f"{item['price']:.2f}",
+            'total_price': f"{total_price:.2f}",
+            'product_image': request.build_absolute_uri(default_storage.url(image)) if image else None,
+            'issue': None,
+            'price_changed': False,
+            'available_quantity': item['available'],
+            'created_at': None,
+        })
+    return {
+        'id': None,
+        'items': data_items,
+        'subtotal': f"{subtotal:.2f}",
+        'total': f"{subtotal:.2f}",
+        'item_count': sum(item['quantity'] for item in items),
+        'has_issues': False,
+        'created_at': None,
+        'updated_at': None,
+    }
+
+
+def merge_into_cart(cart, lines):
+    """
+    Merge anonymous cart lines into ``cart``.
+
+    Quantities for products already in the cart are added together, capped
+    at the stock available. Returns the number of lines merged.
+    """
+    items, _ = resolve_lines(lines)
+    return merge_items(cart, items)
+
+
+def merge_items(cart, items):
+    """Add items from resolve_lines() to ``cart`` with one bulk insert and update."""
+    if not items:
+        return 0
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        existing = {
+            (item.product_id, item.variant_id): item
+            for item in CartItem.objects.select_for_update().filter(
+                cart=cart, product_id__in={item['product'] for item in items}
+            )
+        }
+        to_create = []
+        to_update = []
+        for item in items:
+            cart_item = existing.get((item['product'], item['variant']))
+            if cart_item is None:
+                to_create.append(CartItem(
+                    cart=cart,
+                    product_id=item['product'],
+                    variant_id=item['variant'],
+                    quantity=item['quantity'],
+                    price=item['price']
+                ))
+            else:
+                cart_item.quantity = min(cart_item.quantity + item['quantity'], item['available'])
+                cart_item.price = item['price']
+                cart_item.updated_at = now
+                to_update.append(cart_item)
+        # bulk_create skips CartItem.save, so the price is set explicitly above
+        CartItem.objects.bulk_create(to_create)
+        CartItem.objects.bulk_update(to_update, ['quantity', 'price', 'updated_at'])
+    return len(items)
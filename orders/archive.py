@@ -0,0 +1,89 @@
+"""
+Archival of finished orders.
+
+Delivered, cancelled and refunded orders past the retention window are
+copied, with their store orders, lines, transactions and status history,
+into the Archived* tables and removed from the hot tables. Each batch is
+copied and deleted in one transaction, so an interrupted run leaves every
+order in exactly one place.
+"""
+from django.db import transaction as db_transaction
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedStoreOrder, ArchivedTransaction, Order, OrderItem,
+    OrderStatusHistory, StoreOrder, Transaction
+)
+
+
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled', 'refunded')
+
+
+def archivable_orders(cutoff):
+    """Finished orders created before ``cutoff``."""
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def copy_fields(obj, archive_model, **extra):
+    """Build an archive row from every field the archive model shares with ``obj``."""
+    values = {
+        field.attname: getattr(obj, field.attname)
+        for field in archive_model._meta.concrete_fields
+        if hasattr(obj, field.attname)
+    }
+    values.update(extra)
+    return archive_model(**values)
+
+
+def archive_batch(order_ids):
+    """Move the given orders to the archive. Returns how many were moved."""
+    with db_transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=list(order_ids), status__in=ARCHIVABLE_STATUSES)
+        )
+        if not orders:
+            return 0
+        ids = [order.pk for order in orders]
+
+        history = {}
+        for row in (
+            OrderStatusHistory.objects.filter(order_id__in=ids)
+            .order_by('created_at')
+            .values('order_id', 'previous_status', 'status', 'note', 'created_by_id', 'created_at')
+        ):
+            history.setdefault(row.pop('order_id'), []).append(row)
+
+        ArchivedOrder.objects.bulk_create([
+            copy_fields(order, ArchivedOrder, status_history=history.get(order.pk, []))
+            for order in orders
+        ])
+        ArchivedStoreOrder.objects.bulk_create([
+            copy_fields(store_order, ArchivedStoreOrder)
+            for store_order in StoreOrder.objects.filter(order_id__in=ids)
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            copy_fields(item, ArchivedOrderItem)
+            for item in OrderItem.objects.filter(order_id__in=ids)
+        ])
+        ArchivedTransaction.objects.bulk_create([
+            copy_fields(payment, ArchivedTransaction)
+            for payment in Transaction.objects.filter(order_id__in=ids)
+        ])
+
+        # Cascades to the lines, store orders, transactions and history
+        Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(cutoff, batch_size=500, limit=None):
+    """Archive every order eligible at ``cutoff``, one batch at a time."""
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids = list(
+            archivable_orders(cutoff).order_by('pk').values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            break
+        archived += archive_batch(ids)
+    return archived
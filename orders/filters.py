@@ -0,0 +1,14 @@
+import django_filters
+
+from .models import StoreOrder
+
+
+class StoreOrderFilter(django_filters.FilterSet):
+    payment_status = django_filters.CharFilter(
+        field_name='order__payment_status',
+        help_text='Payment status of the order this store order belongs to'
+    )
+
+    class Meta:
+        model = StoreOrder
+        fields = ['status', 'payment_status']
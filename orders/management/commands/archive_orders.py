@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from orders.archive import archivable_orders, archive_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Move delivered, cancelled and refunded orders older than the retention '
+        'window, with their lines and transactions, into the archive tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive finished orders older than this many days (default: ORDER_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Orders moved per transaction',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after archiving this many orders',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the orders that would be archived',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Time the hot order listing before and after archiving',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = settings.ORDER_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f'{count} orders older than {days} days would be archived.')
+            return
+
+        if options['benchmark']:
+            before = self.benchmark()
+
+        started = time.monotonic()
+        archived = archive_orders(cutoff, options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} orders in {time.monotonic() - started:.1f}s.'
+        ))
+
+        if options['benchmark']:
+            after = self.benchmark()
+            for label in before:
+                self.stdout.write(
+                    f'{label}: {before[label] * 1000:.1f}ms -> {after[label] * 1000:.1f}ms'
+                )
+
+    def benchmark(self, repeat=5):
+        """Best-of-``repeat`` timings of the queries behind the order listings."""
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        queries = {
+            'order count': lambda: Order.objects.count(),
+            'order list page': lambda: list(Order.objects.with_details()[:page_size]),
+            'revenue aggregate': lambda: Order.objects.filter(
+                payment_status='paid'
+            ).aggregate(total=Sum('total')),
+        }
+        timings = {}
+        for label, query in queries.items():
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = best
+        return timings
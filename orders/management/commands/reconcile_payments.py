@@ -0,0 +1,235 @@
+import csv
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.paystack import PaystackAPI, forget_verifications
+from orders.models import Order, Transaction, ReconciliationCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile local transactions against Paystack. Walks the Paystack '
+        'transaction listing page by page, applies missed payments and '
+        'failures, and streams a CSV discrepancy report.'
+    )
+
+    JOB_NAME = 'paystack_transactions'
+    FAILED_STATUSES = ('failed', 'abandoned')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--per-page',
+            type=int,
+            default=100,
+            help='Number of Paystack transactions to fetch per page',
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=None,
+            help='Stop after this many pages (the run resumes from there next time)',
+        )
+        parser.add_argument(
+            '--overlap-minutes',
+            type=int,
+            default=10,
+            help='Re-check transactions this far before the last checkpoint',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the checkpoint and reconcile the whole history',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report discrepancies without changing anything',
+        )
+        parser.add_argument(
+            '--report',
+            default=None,
+            help='Write the discrepancy report to this file instead of stdout',
+        )
+
+    def handle(self, *args, **options):
+        paystack = PaystackAPI()
+        dry_run = options['dry_run']
+        checkpoint, _ = ReconciliationCheckpoint.objects.get_or_create(job=self.JOB_NAME)
+
+        if options['full']:
+            checkpoint.cursor = None
+            checkpoint.window_end = None
+            checkpoint.page = 0
+
+        # Keep the window fixed for the whole run so pages do not shift as new
+        # transactions arrive; an interrupted run resumes inside the same window
+        if checkpoint.window_end is None:
+            checkpoint.window_end = timezone.now()
+            checkpoint.page = 0
+        from_date = None
+        if checkpoint.cursor:
+            from_date = checkpoint.cursor - timedelta(minutes=options['overlap_minutes'])
+
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        try:
+            writer = csv.writer(report_file or self.stdout)
+            writer.writerow(['reference', 'issue', 'local_status', 'gateway_status', 'detail'])
+            stats = self.reconcile(
+                paystack, checkpoint, from_date, writer,
+                per_page=options['per_page'],
+                max_pages=options['max_pages'],
+                dry_run=dry_run,
+            )
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            'Checked {checked} transactions on {pages} pages: {paid} marked paid, '
+            '{failed} marked failed, {discrepancies} discrepancies.'.format(**stats)
+        ))
+
+    def reconcile(self, paystack, checkpoint, from_date, writer, per_page, max_pages, dry_run):
+        stats = {'pages': 0, 'checked': 0, 'paid': 0, 'failed': 0, 'discrepancies': 0}
+        page = checkpoint.page + 1
+
+        while max_pages is None or stats['pages'] < max_pages:
+            response = paystack.list_transactions(
+                page=page,
+                per_page=per_page,
+                from_date=from_date,
+                to_date=checkpoint.window_end,
+            )
+            if not response.get('status'):
+                raise CommandError(
+                    f"Paystack listing failed on page {page}: {response.get('message')}"
+                )
+
+            gateway_transactions = response.get('data') or []
+            if not gateway_transactions:
+                break
+
+            self.reconcile_page(gateway_transactions, writer, stats, dry_run)
+            stats['pages'] += 1
+            stats['checked'] += len(gateway_transactions)
+
+            if not dry_run:
+                checkpoint.page = page
+                checkpoint.save()
+
+            page_count = (response.get('meta') or {}).get('pageCount')
+            if page_count is not None and page >= page_count:
+                break
+            page += 1
+        else:
+            # Stopped by --max-pages, keep the window so the next run resumes
+            return stats
+
+        if not dry_run:
+            checkpoint.cursor = checkpoint.window_end
+            checkpoint.window_end = None
+            checkpoint.page = 0
+            checkpoint.save()
+        return stats
+
+    def reconcile_page(self, gateway_transactions, writer, stats, dry_run):
+        """Match one page of Paystack transactions with a single lookup."""
+        by_reference = {t['reference']: t for t in gateway_transactions if t.get('reference')}
+        local = {
+            row['reference']: row
+            for row in Transaction.objects.filter(reference__in=list(by_reference)).values(
+                'id', 'reference', 'status', 'amount', 'order_id'
+            )
+        }
+
+        to_complete = {}
+        to_fail = []
+        for reference, gateway in by_reference.items():
+            gateway_status = gateway.get('status')
+            row = local.get(reference)
+
+            if row is None:
+                self.report(writer, stats, reference, 'unknown_reference', '', gateway_status)
+                continue
+
+            if gateway_status == 'success':
+                expected = int(Decimal(row['amount']) * 100)
+                if gateway.get('amount') is not None and int(gateway['amount']) != expected:
+                    self.report(
+                        writer, stats, reference, 'amount_mismatch', row['status'], gateway_status,
+                        f"expected {expected} pesewas, gateway has {gateway['amount']}"
+                    )
+                elif row['status'] == 'pending':
+                    to_complete[row['id']] = (row, gateway)
+                elif row['status'] != 'completed':
+                    self.report(writer, stats, reference, 'status_mismatch', row['status'], gateway_status)
+            elif gateway_status in self.FAILED_STATUSES:
+                if row['status'] == 'pending':
+                    to_fail.append(row['id'])
+                elif row['status'] == 'completed':
+                    self.report(writer, stats, reference, 'status_mismatch', row['status'], gateway_status)
+            elif gateway_status == 'reversed' and row['status'] == 'completed':
+                self.report(writer, stats, reference, 'reversed', row['status'], gateway_status)
+
+        if dry_run:
+            for row, gateway in to_complete.values():
+                self.report(writer, stats, row['reference'], 'missed_payment', row['status'], 'success')
+            return
+
+        self.apply_completed(to_complete, writer, stats)
+        if to_fail:
+            stats['failed'] += Transaction.objects.filter(
+                pk__in=to_fail, status='pending'
+            ).update(status='failed', updated_at=timezone.now())
+
+    def apply_completed(self, to_complete, writer, stats):
+        if not to_complete:
+            return
+
+        with db_transaction.atomic():
+            # Lock the rows so a concurrent verification cannot apply them twice
+            claimed = list(
+                Transaction.objects.select_for_update()
+                .filter(pk__in=list(to_complete), status='pending')
+                .values_list('id', flat=True)
+            )
+            if not claimed:
+                return
+
+            now = timezone.now()
+            claimed_transactions = []
+            for transaction_id in claimed:
+                row, gateway = to_complete[transaction_id]
+                paid_at = parse_datetime(gateway.get('paid_at') or gateway.get('paidAt') or '') or now
+                claimed_transactions.append(Transaction(
+                    id=transaction_id,
+                    status='completed',
+                    gateway_response={'status': True, 'data': gateway},
+                    paid_at=paid_at,
+                    updated_at=now,
+                ))
+            Transaction.objects.bulk_update(
+                claimed_transactions, ['status', 'gateway_response', 'paid_at', 'updated_at']
+            )
+
+            payments = {
+                to_complete[transaction_id][0]['order_id']: to_complete[transaction_id][0]['reference']
+                for transaction_id in claimed
+            }
+            Order.mark_orders_as_paid(payments)
+
+        # A cached verification from before this run would still say unpaid
+        forget_verifications(to_complete[transaction_id][0]['reference'] for transaction_id in claimed)
+        stats['paid'] += len(claimed)
+        for transaction_id in claimed:
+            row = to_complete[transaction_id][0]
+            self.report(writer, stats, row['reference'], 'missed_payment', row['status'], 'success', 'marked paid')
+
+    def report(self, writer, stats, reference, issue, local_status, gateway_status, detail=''):
+        stats['discrepancies'] += 1
+        writer.writerow([reference, issue, local_status, gateway_status, detail])
@@ -0,0 +1,143 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import F, Q, Sum
+
+from orders.models import (
+    ArchivedStoreOrder, SellerBalance, SellerLedgerEntry, SellerPayout, StoreOrder
+)
+
+
+ZERO = Decimal('0.00')
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify every store ledger against the store order and payout tables. '
+        'With --fix, post adjustment entries so balances match the source tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Post adjustment entries for stores whose ledger does not match',
+        )
+
+    def handle(self, *args, **options):
+        expected = self.expected_totals()
+        ledger_sums = dict(
+            SellerLedgerEntry.objects.values('store_id')
+            .annotate(total=Sum('amount'))
+            .values_list('store_id', 'total')
+        )
+        balances = {balance.store_id: balance for balance in SellerBalance.objects.all()}
+
+        mismatched = []
+        for store_id in sorted(set(expected) | set(ledger_sums) | set(balances)):
+            totals = expected.get(store_id, self.empty_totals())
+            balance = balances.get(store_id) or SellerBalance(store_id=store_id)
+            problems = []
+
+            ledger_sum = ledger_sums.get(store_id) or ZERO
+            if ledger_sum != balance.available_balance:
+                problems.append(
+                    f'ledger entries sum to {ledger_sum} but running balance is {balance.available_balance}'
+                )
+            for field in SellerBalance.TOTAL_FIELDS:
+                if getattr(balance, field) != totals[field]:
+                    problems.append(
+                        f'{field} is {getattr(balance, field)}, source tables give {totals[field]}'
+                    )
+
+            if problems:
+                mismatched.append((store_id, balance, totals))
+                self.stdout.write(self.style.WARNING(f'Store {store_id}:'))
+                for problem in problems:
+                    self.stdout.write(f'  {problem}')
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f'All {len(expected)} store ledgers reconcile.'))
+            return
+
+        if options['fix']:
+            for store_id, balance, totals in mismatched:
+                self.fix(store_id, totals)
+            self.stdout.write(self.style.SUCCESS(f'Adjusted {len(mismatched)} store ledgers.'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'{len(mismatched)} store ledgers do not reconcile. Run with --fix to adjust them.'
+            ))
+
+    def empty_totals(self):
+        return {field: ZERO for field in SellerBalance.TOTAL_FIELDS}
+
+    def expected_totals(self):
+        """Compute every store's totals from the source tables in grouped queries."""
+        totals = {}
+
+        # Archived orders still count towards what the store has earned
+        for model in (StoreOrder, ArchivedStoreOrder):
+            sales = (
+                model.objects.filter(order__payment_status='paid')
+                .values('store_id')
+                .annotate(
+                    sales=Sum('total'),
+                    fees=Sum('platform_fee'),
+                    refunds=Sum(
+                        F('total') - F('platform_fee'),
+                        filter=Q(status__in=StoreOrder.REVERSED_STATUSES)
+                    ),
+                )
+            )
+            for row in sales:
+                store_totals = totals.setdefault(row['store_id'], self.empty_totals())
+                store_totals['total_sales'] += row['sales'] or ZERO
+                store_totals['platform_fees'] += row['fees'] or ZERO
+                store_totals['total_refunds'] += row['refunds'] or ZERO
+
+        payouts = (
+            SellerPayout.objects.values('store_id')
+            .annotate(
+                completed=Sum('amount', filter=Q(status='completed')),
+                pending=Sum('amount', filter=Q(status__in=['pending', 'processing'])),
+            )
+        )
+        for row in payouts:
+            store_totals = totals.setdefault(row['store_id'], self.empty_totals())
+            store_totals['total_payouts'] = row['completed'] or ZERO
+            store_totals['pending_payouts'] = row['pending'] or ZERO
+
+        for store_totals in totals.values():
+            store_totals['available_balance'] = (
+                store_totals['total_sales']
+                - store_totals['platform_fees']
+                - store_totals['total_refunds']
+                - store_totals['total_payouts']
+                - store_totals['pending_payouts']
+            )
+        return totals
+
+    def fix(self, store_id, totals):
+        with db_transaction.atomic():
+            SellerBalance.objects.get_or_create(store_id=store_id)
+            balance = SellerBalance.objects.select_for_update().get(store_id=store_id)
+            ledger_sum = SellerLedgerEntry.objects.filter(store_id=store_id).aggregate(
+                total=Sum('amount')
+            )['total'] or ZERO
+
+            # Entries are never edited; the difference is posted as an adjustment
+            difference = totals['available_balance'] - ledger_sum
+            if difference:
+                SellerLedgerEntry.objects.create(
+                    store_id=store_id,
+                    entry_type='adjustment',
+                    amount=difference,
+                    balance_after=totals['available_balance'],
+                    description='Ledger reconciliation'
+                )
+
+            for field, value in totals.items():
+                setattr(balance, field, value)
+            balance.save()
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.paystack import PaystackAPI
+from orders.models import PayoutRun
+from orders.payouts import create_payout_run, execute_payout_run, payable_summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Pay out every store balance above the minimum through Paystack transfers. '
+        'Unfinished runs are resumed first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-amount',
+            type=Decimal,
+            default=None,
+            help='Only pay stores with at least this balance (default: PAYOUT_MINIMUM_AMOUNT)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='Maximum transfers in flight at once (default: PAYOUT_MAX_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--resume-only',
+            action='store_true',
+            help='Finish unfinished runs without starting a new one',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what a new run would pay without creating it',
+        )
+
+    def handle(self, *args, **options):
+        minimum_amount = options['min_amount']
+        if minimum_amount is None:
+            minimum_amount = Decimal(str(settings.PAYOUT_MINIMUM_AMOUNT))
+
+        if options['dry_run']:
+            summary = payable_summary(minimum_amount)
+            self.stdout.write(
+                f"{summary['stores']} stores payable, "
+                f"total {summary['total'] or Decimal('0.00')}"
+            )
+            return
+
+        gateway = PaystackAPI()
+
+        for run in PayoutRun.objects.filter(status='running').order_by('created_at'):
+            self.stdout.write(f'Resuming {run.reference}...')
+            self.execute(run, gateway, options['concurrency'])
+
+        if options['resume_only']:
+            return
+
+        run = create_payout_run(minimum_amount)
+        if run is None:
+            self.stdout.write('No store balances are payable.')
+            return
+
+        self.stdout.write(f'Created {run.reference} with {run.payouts.count()} payouts.')
+        self.execute(run, gateway, options['concurrency'])
+
+    def execute(self, run, gateway, concurrency):
+        stats = execute_payout_run(run, gateway, concurrency=concurrency)
+        self.stdout.write(self.style.SUCCESS(
+            '{reference}: {completed} completed, {processing} awaiting confirmation, '
+            '{failed} failed.'.format(reference=run.reference, **stats)
+        ))
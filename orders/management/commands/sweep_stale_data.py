@@ -0,0 +1,100 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from orders.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete abandoned carts, cart items for products that can no longer be '
+        'bought, and expired JWT outstanding tokens, in small batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cart-days',
+            type=int,
+            default=None,
+            help='Delete carts untouched for this many days (default: CART_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be deleted without deleting it',
+        )
+
+    def handle(self, *args, **options):
+        cart_days = options['cart_days']
+        if cart_days is None:
+            cart_days = settings.CART_RETENTION_DAYS
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        now = timezone.now()
+        cutoff = now - timedelta(days=cart_days)
+        recent_items = CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=cutoff)
+        sweeps = [
+            (
+                f'carts untouched for {cart_days} days',
+                Cart.objects.filter(updated_at__lt=cutoff).exclude(Exists(recent_items)),
+            ),
+            (
+                'cart items no longer available',
+                CartItem.objects.filter(
+                    Q(product__is_active=False)
+                    | Q(variant__isnull=True, product__quantity=0)
+                    | Q(variant__is_active=False)
+                    | Q(variant__quantity=0)
+                ),
+            ),
+            (
+                'expired outstanding tokens',
+                OutstandingToken.objects.filter(expires_at__lt=now),
+            ),
+        ]
+
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        for label, queryset in sweeps:
+            started = time.monotonic()
+            deleted, batches = self.sweep(queryset)
+            self.stdout.write(
+                f'{verb} {deleted} {label} '
+                f'({batches} batches, {time.monotonic() - started:.1f}s)'
+            )
+        self.stdout.write(self.style.SUCCESS('Sweep finished.'))
+
+    def sweep(self, queryset):
+        """Delete ``queryset`` in primary-key order, one short transaction per batch."""
+        if self.dry_run:
+            return queryset.count(), 0
+
+        model = queryset.model
+        deleted = batches = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                break
+            with db_transaction.atomic():
+                _, per_model = model.objects.filter(pk__in=ids).delete()
+            deleted += per_model.get(model._meta.label, 0)
+            batches += 1
+            last_pk = ids[-1]
+        return deleted, batches
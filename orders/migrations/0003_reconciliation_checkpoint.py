@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_update_currency_to_ghs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50, unique=True, verbose_name='job')),
+                ('cursor', models.DateTimeField(blank=True, help_text='Everything created before this time has been reconciled', null=True, verbose_name='cursor')),
+                ('window_end', models.DateTimeField(blank=True, help_text='Upper bound of the run in progress, if any', null=True, verbose_name='window end')),
+                ('page', models.PositiveIntegerField(default=0, verbose_name='last completed page')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'reconciliation checkpoint',
+                'verbose_name_plural': 'reconciliation checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:39
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_store_orders(apps, schema_editor):
+    """Create one StoreOrder per store for every existing order."""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    StoreOrder = apps.get_model('orders', 'StoreOrder')
+    rate = Decimal(str(settings.PLATFORM_COMMISSION))
+
+    shares = (
+        OrderItem.objects.values(
+            'order_id', 'store_id', 'order__status', 'order__created_at', 'order__delivered_at'
+        )
+        .annotate(subtotal=Sum('subtotal'), total=Sum('total'))
+        .order_by('order_id', 'store_id')
+    )
+
+    batch = []
+    for share in shares.iterator():
+        batch.append(StoreOrder(
+            order_id=share['order_id'],
+            store_id=share['store_id'],
+            status=share['order__status'],
+            subtotal=share['subtotal'],
+            platform_fee=(share['subtotal'] * rate).quantize(Decimal('0.01')),
+            total=share['total'],
+            created_at=share['order__created_at'],
+            delivered_at=share['order__delivered_at'],
+        ))
+        if len(batch) >= 500:
+            StoreOrder.objects.bulk_create(batch)
+            batch = []
+    StoreOrder.objects.bulk_create(batch)
+
+    OrderItem.objects.filter(store_order__isnull=True).update(
+        store_order=Subquery(
+            StoreOrder.objects.filter(
+                order_id=OuterRef('order_id'),
+                store_id=OuterRef('store_id')
+            ).values('id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_store_verification_approved_at_and_more'),
+        ('orders', '0003_reconciliation_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='pending', max_length=20, verbose_name='status')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='subtotal')),
+                ('platform_fee', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='platform fee')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='total')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='delivered at')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_orders', to='orders.order', verbose_name='order')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='store_orders', to='stores.store', verbose_name='store')),
+            ],
+            options={
+                'verbose_name': 'store order',
+                'verbose_name_plural': 'store orders',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='store_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.storeorder', verbose_name='store order'),
+        ),
+        migrations.AddIndex(
+            model_name='storeorder',
+            index=models.Index(fields=['store', '-created_at'], name='orders_stor_store_i_45190b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='storeorder',
+            unique_together={('order', 'store')},
+        ),
+        migrations.RunPython(backfill_store_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:42
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Q, Sum
+import django.db.models.deletion
+
+
+def seed_opening_balances(apps, schema_editor):
+    """
+    Open every store's ledger at what its existing paid orders and payouts
+    give, so balances are right from the start. reconcile_seller_ledger
+    computes the same totals to detect drift later.
+    """
+    StoreOrder = apps.get_model('orders', 'StoreOrder')
+    SellerPayout = apps.get_model('orders', 'SellerPayout')
+    SellerBalance = apps.get_model('orders', 'SellerBalance')
+    SellerLedgerEntry = apps.get_model('orders', 'SellerLedgerEntry')
+    zero = Decimal('0.00')
+    fields = [
+        'available_balance', 'total_sales', 'platform_fees',
+        'total_refunds', 'total_payouts', 'pending_payouts'
+    ]
+    totals = {}
+
+    sales = (
+        StoreOrder.objects.filter(order__payment_status='paid')
+        .values('store_id')
+        .annotate(
+            sales=Sum('total'),
+            fees=Sum('platform_fee'),
+            refunds=Sum(
+                F('total') - F('platform_fee'),
+                filter=Q(status__in=('cancelled', 'refunded'))
+            ),
+        )
+        .order_by()
+    )
+    for row in sales:
+        store_totals = totals.setdefault(row['store_id'], dict.fromkeys(fields, zero))
+        store_totals['total_sales'] = row['sales'] or zero
+        store_totals['platform_fees'] = row['fees'] or zero
+        store_totals['total_refunds'] = row['refunds'] or zero
+
+    payouts = (
+        SellerPayout.objects.values('store_id')
+        .annotate(
+            completed=Sum('amount', filter=Q(status='completed')),
+            pending=Sum('amount', filter=Q(status__in=['pending', 'processing'])),
+        )
+        .order_by()
+    )
+    for row in payouts:
+        store_totals = totals.setdefault(row['store_id'], dict.fromkeys(fields, zero))
+        store_totals['total_payouts'] = row['completed'] or zero
+        store_totals['pending_payouts'] = row['pending'] or zero
+
+    balances = []
+    entries = []
+    for store_id, store_totals in totals.items():
+        available = (
+            store_totals['total_sales']
+            - store_totals['platform_fees']
+            - store_totals['total_refunds']
+            - store_totals['total_payouts']
+            - store_totals['pending_payouts']
+        )
+        store_totals['available_balance'] = available
+        balances.append(SellerBalance(store_id=store_id, **store_totals))
+        if available:
+            entries.append(SellerLedgerEntry(
+                store_id=store_id,
+                entry_type='adjustment',
+                amount=available,
+                balance_after=available,
+                description='Opening balance'
+            ))
+    SellerBalance.objects.bulk_create(balances, batch_size=500)
+    SellerLedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_store_verification_approved_at_and_more'),
+        ('orders', '0004_storeorder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('available_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='available balance')),
+                ('total_sales', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='total sales')),
+                ('platform_fees', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='platform fees')),
+                ('total_refunds', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='total refunds')),
+                ('total_payouts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='total payouts')),
+                ('pending_payouts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='pending payouts')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to='stores.store', verbose_name='store')),
+            ],
+            options={
+                'verbose_name': 'seller balance',
+                'verbose_name_plural': 'seller balances',
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('sale', 'Sale'), ('fee', 'Platform Fee'), ('refund', 'Refund'), ('payout', 'Payout'), ('payout_reversal', 'Payout Reversal'), ('adjustment', 'Adjustment')], max_length=20, verbose_name='entry type')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Positive for credits, negative for debits', max_digits=12, verbose_name='amount')),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='balance after')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='description')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='orders.sellerpayout', verbose_name='payout')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='stores.store', verbose_name='store')),
+                ('store_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='orders.storeorder', verbose_name='store order')),
+            ],
+            options={
+                'verbose_name': 'seller ledger entry',
+                'verbose_name_plural': 'seller ledger entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['store', '-created_at'], name='orders_sell_store_i_98be9d_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_store_verification_approved_at_and_more'),
+        ('orders', '0005_seller_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=50, unique=True, verbose_name='reference')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=20, verbose_name='status')),
+                ('minimum_amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='minimum amount')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='completed at')),
+            ],
+            options={
+                'verbose_name': 'payout run',
+                'verbose_name_plural': 'payout runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerPayoutAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_type', models.CharField(choices=[('ghipss', 'Bank Account'), ('mobile_money', 'Mobile Money')], default='ghipss', max_length=20, verbose_name='account type')),
+                ('account_name', models.CharField(max_length=200, verbose_name='account name')),
+                ('account_number', models.CharField(max_length=50, verbose_name='account number')),
+                ('bank_code', models.CharField(help_text='Paystack bank or mobile money provider code', max_length=20, verbose_name='bank code')),
+                ('recipient_code', models.CharField(blank=True, editable=False, max_length=100, verbose_name='Paystack recipient code')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payout_account', to='stores.store', verbose_name='store')),
+            ],
+            options={
+                'verbose_name': 'seller payout account',
+                'verbose_name_plural': 'seller payout accounts',
+            },
+        ),
+        migrations.AddField(
+            model_name='sellerpayout',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payouts', to='orders.payoutrun', verbose_name='payout run'),
+        ),
+    ]
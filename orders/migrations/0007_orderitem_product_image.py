@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:46
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def backfill_product_images(apps, schema_editor):
+    """Snapshot each product's current main image onto its existing order lines."""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    ProductImage = apps.get_model('products', 'ProductImage')
+
+    images = (
+        ProductImage.objects.filter(is_main=True)
+        .exclude(image='')
+        .values_list('product_id', 'image')
+        .order_by('product_id', 'position', 'created_at')
+    )
+    seen = set()
+    for product_id, name in images.iterator():
+        if product_id in seen:
+            continue
+        seen.add(product_id)
+        OrderItem.objects.filter(product_id=product_id, product_image='').update(
+            product_image=default_storage.url(name)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_payout_runs'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, help_text='Main product image at the time of purchase', max_length=500, verbose_name='product image URL'),
+        ),
+        migrations.RunPython(backfill_product_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderitem_product_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderstatushistory',
+            name='previous_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending Payment'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20, verbose_name='previous status'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatushistory',
+            index=models.Index(fields=['order', 'created_at'], name='orders_orde_order_i_1de1d7_idx'),
+        ),
+    ]
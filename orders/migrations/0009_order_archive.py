@@ -0,0 +1,125 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:54
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0002_alter_address_country'),
+        ('stores', '0002_store_verification_approved_at_and_more'),
+        ('products', '0001_initial'),
+        ('orders', '0008_order_status_history_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_number', models.CharField(max_length=20, unique=True, verbose_name='order number')),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20, verbose_name='status')),
+                ('payment_method', models.CharField(choices=[('paystack', 'Paystack'), ('bank_transfer', 'Bank Transfer'), ('cash_on_delivery', 'Cash on Delivery')], max_length=20, verbose_name='payment method')),
+                ('payment_status', models.CharField(max_length=20, verbose_name='payment status')),
+                ('payment_reference', models.CharField(blank=True, max_length=100, verbose_name='payment reference')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='subtotal')),
+                ('tax_amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='tax amount')),
+                ('shipping_cost', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='shipping cost')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='total')),
+                ('platform_fee', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='platform fee')),
+                ('customer_note', models.TextField(blank=True, verbose_name='customer note')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP address')),
+                ('status_history', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='status history')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('updated_at', models.DateTimeField(verbose_name='updated at')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='paid at')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='delivered at')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='archived at')),
+                ('billing_address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.address', verbose_name='billing address')),
+                ('shipping_address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.address', verbose_name='shipping address')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived order',
+                'verbose_name_plural': 'archived orders',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='amount')),
+                ('currency', models.CharField(max_length=3, verbose_name='currency')),
+                ('payment_method', models.CharField(choices=[('paystack', 'Paystack'), ('bank_transfer', 'Bank Transfer'), ('cash_on_delivery', 'Cash on Delivery')], max_length=20, verbose_name='payment method')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], max_length=20, verbose_name='status')),
+                ('reference', models.CharField(max_length=100, unique=True, verbose_name='reference')),
+                ('gateway_response', models.JSONField(blank=True, null=True, verbose_name='gateway response')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP address')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('updated_at', models.DateTimeField(verbose_name='updated at')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='paid at')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='orders.archivedorder', verbose_name='order')),
+            ],
+            options={
+                'verbose_name': 'archived transaction',
+                'verbose_name_plural': 'archived transactions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedStoreOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20, verbose_name='status')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='subtotal')),
+                ('platform_fee', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='platform fee')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='total')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('updated_at', models.DateTimeField(verbose_name='updated at')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='delivered at')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_orders', to='orders.archivedorder', verbose_name='order')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_store_orders', to='stores.store', verbose_name='store')),
+            ],
+            options={
+                'verbose_name': 'archived store order',
+                'verbose_name_plural': 'archived store orders',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('product_name', models.CharField(max_length=200, verbose_name='product name')),
+                ('variant_name', models.CharField(blank=True, max_length=100, verbose_name='variant name')),
+                ('quantity', models.PositiveIntegerField(verbose_name='quantity')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='price')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='subtotal')),
+                ('tax_amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='tax amount')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='total')),
+                ('product_image', models.CharField(blank=True, max_length=500, verbose_name='product image URL')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder', verbose_name='order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_order_items', to='products.product', verbose_name='product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_order_items', to='stores.store', verbose_name='store')),
+                ('store_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedstoreorder', verbose_name='store order')),
+                ('variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_order_items', to='products.productvariant', verbose_name='variant')),
+            ],
+            options={
+                'verbose_name': 'archived order item',
+                'verbose_name_plural': 'archived order items',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedstoreorder',
+            index=models.Index(fields=['store', '-created_at'], name='orders_arch_store_i_aef212_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-created_at'], name='orders_arch_user_id_6febd8_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['paid_at'], name='orders_orde_paid_at_8fa0ef_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_paid_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['product', 'order'], name='orders_orde_product_d9c1ab_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_item_product_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedorderitem',
+            index=models.Index(fields=['product', 'order'], name='orders_arch_product_f90584_idx'),
+        ),
+    ]
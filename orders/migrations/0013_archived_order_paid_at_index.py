@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_archived_order_item_product_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['paid_at'], name='orders_arch_paid_at_19b1f6_idx'),
+        ),
+    ]
@@ -1,11 +1,16 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models import ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 import uuid
 from django.utils import timezone
 
+from uploads.models import MediaBlob
+
 
 class Cart(models.Model):
     """Shopping cart model."""
@@ -40,6 +45,76 @@ class Cart(models.Model):
         """Calculate the total including any additional charges (tax, shipping)."""
         return self.subtotal
 
+    def validate(self):
+        """
+        Reprice every line against the live catalogue and flag lines that can
+        no longer be bought.
+
+        Lines are read in one joined query and any repricing is written with
+        bulk_update. Sets ``lines`` and ``totals`` (as used by CartSerializer)
+        and returns the lines that have an issue.
+        """
+        from products.models import ProductImage
+
+        lines = list(
+            self.items.with_availability()
+            .select_related('product', 'variant')
+            .prefetch_related(models.Prefetch(
+                'product__images',
+                queryset=ProductImage.objects.filter(is_main=True),
+                to_attr='main_images'
+            ))
+            .order_by('created_at', 'id')
+        )
+
+        now = timezone.now()
+        repriced = []
+        for line in lines:
+            if not line.is_active:
+                line.issue = 'unavailable'
+            elif line.available_quantity == 0:
+                line.issue = 'out_of_stock'
+            elif line.quantity > line.available_quantity:
+                line.issue = 'insufficient_stock'
+            else:
+                line.issue = None
+            line.price_changed = line.price != line.current_price
+            if line.price_changed:
+                line.price = line.current_price
+                line.updated_at = now
+                repriced.append(line)
+        CartItem.objects.bulk_update(repriced, ['price', 'updated_at'])
+
+        purchasable = Q(is_active=True, quantity__lte=F('available_quantity'))
+        self.lines = lines
+        self.totals = self.items.with_availability().aggregate(
+            subtotal=Coalesce(
+                Sum(
+                    F('current_price') * F('quantity'),
+                    filter=purchasable,
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2)
+                ),
+                Decimal('0.00')
+            ),
+            item_count=Coalesce(Sum('quantity'), 0),
+        )
+        self.totals['total'] = self.totals['subtotal']
+        self.totals['has_issues'] = any(line.issue for line in lines)
+        return [line for line in lines if line.issue]
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_availability(self):
+        """Annotate each line with its live price and stock and whether it is active."""
+        return self.annotate(
+            current_price=Coalesce('variant__price', 'product__price'),
+            available_quantity=Coalesce('variant__quantity', 'product__quantity'),
+            is_active=ExpressionWrapper(
+                Q(product__is_active=True) & (Q(variant__isnull=True) | Q(variant__is_active=True)),
+                output_field=models.BooleanField()
+            ),
+        )
+
 
 class CartItem(models.Model):
     """Individual item in a shopping cart."""
@@ -76,6 +151,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('cart item')
         verbose_name_plural = _('cart items')
@@ -99,6 +176,16 @@ class CartItem(models.Model):
         super().save(*args, **kwargs)
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """Prefetch everything OrderSerializer reads, in a fixed number of queries."""
+        return self.select_related(
+            'user', 'shipping_address', 'billing_address'
+        ).prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.with_details())
+        )
+
+
 class Order(models.Model):
     """Order model for completed purchases."""
     STATUS_CHOICES = (
@@ -116,6 +203,16 @@ class Order(models.Model):
         ('cash_on_delivery', 'Cash on Delivery'),
     )
 
+    # Statuses each status may move to
+    ALLOWED_TRANSITIONS = {
+        'pending': ('processing', 'cancelled'),
+        'processing': ('shipped', 'delivered', 'cancelled', 'refunded'),
+        'shipped': ('delivered', 'refunded'),
+        'delivered': ('refunded',),
+        'cancelled': (),
+        'refunded': (),
+    }
+
     order_number = models.CharField(
         _('order number'),
         max_length=20,
@@ -211,6 +308,8 @@ class Order(models.Model):
     paid_at = models.DateTimeField(_('paid at'), null=True, blank=True)
     delivered_at = models.DateTimeField(_('delivered at'), null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('order')
         verbose_name_plural = _('orders')
@@ -219,6 +318,7 @@ class Order(models.Model):
             models.Index(fields=['order_number']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['paid_at']),
         ]
 
     def __str__(self):
@@ -235,26 +335,165 @@ class Order(models.Model):
         random_str = str(uuid.uuid4())[:8].upper()
         return f"ORD-{timestamp}-{random_str}"
 
+    @classmethod
+    def can_transition(cls, old_status, new_status):
+        return new_status in cls.ALLOWED_TRANSITIONS.get(old_status, ())
+
+    def transition_to(self, new_status, changed_by=None, note='', **changes):
+        """Move this order to ``new_status``. Returns False if it could not."""
+        if not Order.transition_orders([self.pk], new_status, changed_by, note, **changes):
+            return False
+        self.refresh_from_db(fields=['status', 'updated_at', *changes])
+        return True
+
+    @classmethod
+    def transition_orders(cls, order_ids, new_status, changed_by=None, note='', **changes):
+        """
+        Move orders to ``new_status`` and record each move in the status history.
+
+        Every change is applied as ``UPDATE ... WHERE status = <old status>``,
+        so orders that cannot make the transition, or that another request
+        changed first, are skipped. ``changes`` are extra fields to set on the
+        moved orders. Their store orders are moved with
+        StoreOrder.transition_store_orders. Returns the ids of the orders that
+        moved.
+        """
+        sources = [
+            old_status for old_status, targets in cls.ALLOWED_TRANSITIONS.items()
+            if new_status in targets
+        ]
+        now = timezone.now()
+        moved = []
+        history = []
+        with db_transaction.atomic():
+            current = (
+                cls.objects.select_for_update()
+                .filter(pk__in=list(order_ids), status__in=sources)
+                .values_list('pk', 'status')
+            )
+            by_status = {}
+            for pk, old_status in current:
+                by_status.setdefault(old_status, []).append(pk)
+
+            for old_status, ids in by_status.items():
+                updated = cls.objects.filter(pk__in=ids, status=old_status).update(
+                    status=new_status, updated_at=now, **changes
+                )
+                if updated != len(ids):
+                    # Lost a race; keep only the rows this update changed
+                    ids = list(cls.objects.filter(
+                        pk__in=ids, status=new_status, updated_at=now
+                    ).values_list('pk', flat=True))
+                moved.extend(ids)
+                history.extend(
+                    OrderStatusHistory(
+                        order_id=pk,
+                        previous_status=old_status,
+                        status=new_status,
+                        note=note,
+                        created_by=changed_by
+                    )
+                    for pk in ids
+                )
+            OrderStatusHistory.objects.bulk_create(history)
+
+            # Store orders follow, except those that have already moved past it
+            StoreOrder.transition_store_orders(
+                StoreOrder.objects.filter(order_id__in=moved).values_list('pk', flat=True),
+                new_status
+            )
+        return moved
+
     def mark_as_paid(self, payment_reference=None):
         """Mark the order as paid."""
-        self.status = 'processing'
-        self.payment_status = 'paid'
-        self.payment_reference = payment_reference or self.payment_reference
-        self.paid_at = timezone.now()
-        self.save(update_fields=[
-            'status', 'payment_status', 'payment_reference', 'paid_at'
+        Order.mark_orders_as_paid({self.pk: payment_reference or self.payment_reference})
+        self.refresh_from_db(fields=[
+            'status', 'payment_status', 'payment_reference', 'paid_at', 'updated_at'
         ])
-        self._update_inventory()
-
-    def _update_inventory(self):
-        """Update product inventory after order is placed."""
-        for item in self.items.all():
-            if item.variant:
-                item.variant.quantity -= item.quantity
-                item.variant.save()
+
+    @classmethod
+    def mark_orders_as_paid(cls, payments):
+        """
+        Mark several orders as paid and update inventory in bulk.
+
+        ``payments`` maps order ids to their payment reference. Orders that
+        are already paid are skipped. A payment that lands on an order that
+        was cancelled in the meantime is not a sale: the order is flagged
+        ``refund_due`` and stock and the sellers' ledgers are left alone.
+        Store orders cancelled before the payment arrived keep their stock
+        and have their sale reversed at once. Returns the ids of the orders
+        marked paid.
+        """
+        now = timezone.now()
+        with db_transaction.atomic():
+            orders = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=list(payments))
+                .exclude(payment_status__in=('paid', 'refund_due'))
+            )
+            for order in orders:
+                late = order.status in StoreOrder.REVERSED_STATUSES
+                order.payment_status = 'refund_due' if late else 'paid'
+                order.payment_reference = payments[order.pk] or order.payment_reference
+                order.paid_at = now
+                order.updated_at = now
+            cls.objects.bulk_update(orders, [
+                'payment_status', 'payment_reference', 'paid_at', 'updated_at'
+            ])
+            order_ids = [order.pk for order in orders if order.payment_status == 'paid']
+            cls.transition_orders(order_ids, 'processing', note='Payment received')
+            cls._update_inventory(order_ids)
+            StoreOrder.post_sales(order_ids)
+
+            # Stores cancelled before the payment arrived give their share straight back
+            cancelled = list(
+                StoreOrder.objects.filter(
+                    order_id__in=order_ids, status__in=StoreOrder.REVERSED_STATUSES
+                ).values_list('pk', 'order_id')
+            )
+            StoreOrder.post_reversals([pk for pk, _ in cancelled])
+            OrderStatusHistory.objects.bulk_create([
+                OrderStatusHistory(
+                    order_id=order.pk,
+                    previous_status=order.status,
+                    status=order.status,
+                    note='Payment received after cancellation, refund due'
+                )
+                for order in orders if order.payment_status == 'refund_due'
+            ] + [
+                OrderStatusHistory(
+                    order_id=order_id,
+                    previous_status='processing',
+                    status='processing',
+                    note='Payment received for cancelled stores, partial refund due'
+                )
+                for order_id in {order_id for _, order_id in cancelled}
+            ])
+        return order_ids
+
+    @staticmethod
+    def _update_inventory(order_ids):
+        """Update product inventory after orders are paid."""
+        from products.models import Product, ProductVariant
+
+        quantities = (
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .exclude(store_order__status__in=StoreOrder.REVERSED_STATUSES)
+            .values('product_id', 'variant_id')
+            .annotate(total_quantity=Sum('quantity'))
+        )
+        for row in quantities:
+            # Decrement in the database so concurrent payments cannot
+            # oversell or push stock below zero
+            quantity = row['total_quantity']
+            if row['variant_id']:
+                ProductVariant.objects.filter(
+                    pk=row['variant_id'], quantity__gte=quantity
+                ).update(quantity=F('quantity') - quantity)
             else:
-                item.product.quantity -= item.quantity
-                item.product.save()
+                Product.objects.filter(
+                    pk=row['product_id'], quantity__gte=quantity
+                ).update(quantity=F('quantity') - quantity)
 
     @property
     def is_paid(self):
@@ -262,6 +501,204 @@ class Order(models.Model):
         return self.payment_status == 'paid' and self.paid_at is not None
 
 
+class StoreOrder(models.Model):
+    """The part of an order fulfilled by a single store."""
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='store_orders',
+        verbose_name=_('order')
+    )
+    store = models.ForeignKey(
+        'stores.Store',
+        on_delete=models.PROTECT,
+        related_name='store_orders',
+        verbose_name=_('store')
+    )
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        default='pending'
+    )
+    subtotal = models.DecimalField(
+        _('subtotal'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    platform_fee = models.DecimalField(
+        _('platform fee'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    total = models.DecimalField(
+        _('total'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    # Copied from the order rather than auto_now_add so backfilled rows keep
+    # the original order date
+    created_at = models.DateTimeField(_('created at'), default=timezone.now)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    delivered_at = models.DateTimeField(_('delivered at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('store order')
+        verbose_name_plural = _('store orders')
+        ordering = ['-created_at']
+        unique_together = ['order', 'store']
+        indexes = [
+            models.Index(fields=['store', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order.order_number} - {self.store.name}"
+
+    # A paid store order in one of these statuses no longer counts as a sale
+    REVERSED_STATUSES = ('cancelled', 'refunded')
+
+    @property
+    def earnings(self):
+        """Amount owed to the store for this order."""
+        return self.total - self.platform_fee
+
+    @staticmethod
+    def calculate_platform_fee(amount):
+        """Platform commission on a store's share of an order."""
+        rate = Decimal(str(settings.PLATFORM_COMMISSION))
+        return (amount * rate).quantize(Decimal('0.01'))
+
+    @classmethod
+    def post_sales(cls, order_ids):
+        """Credit each store's ledger with its share of newly paid orders."""
+        entries = []
+        store_orders = cls.objects.filter(order_id__in=order_ids).values_list(
+            'id', 'store_id', 'total', 'platform_fee', 'order__order_number'
+        )
+        for store_order_id, store_id, total, platform_fee, order_number in store_orders:
+            entries.append(SellerLedgerEntry(
+                store_id=store_id,
+                store_order_id=store_order_id,
+                entry_type='sale',
+                amount=total,
+                description=order_number
+            ))
+            if platform_fee:
+                entries.append(SellerLedgerEntry(
+                    store_id=store_id,
+                    store_order_id=store_order_id,
+                    entry_type='fee',
+                    amount=-platform_fee,
+                    description=order_number
+                ))
+        SellerBalance.post_entries(entries)
+
+    @classmethod
+    def post_reversals(cls, store_order_ids):
+        """Reverse what each store earned from paid store orders that were cancelled or refunded."""
+        entries = []
+        store_orders = cls.objects.filter(
+            pk__in=list(store_order_ids), order__payment_status='paid'
+        ).values_list('id', 'store_id', 'total', 'platform_fee', 'order__order_number')
+        for store_order_id, store_id, total, platform_fee, order_number in store_orders:
+            entries.append(SellerLedgerEntry(
+                store_id=store_id,
+                store_order_id=store_order_id,
+                entry_type='refund',
+                amount=-(total - platform_fee),
+                description=order_number
+            ))
+        SellerBalance.post_entries(entries)
+
+    @classmethod
+    def transition_store_orders(cls, store_order_ids, new_status):
+        """
+        Move store orders to ``new_status`` the way Order.transition_orders
+        moves orders: one conditional UPDATE per current status, skipping
+        rows that cannot make the transition. Paid store orders that stop
+        being a sale have their earnings reversed in the store's ledger.
+        Returns the ids of the store orders that moved.
+        """
+        sources = [
+            old_status for old_status, targets in Order.ALLOWED_TRANSITIONS.items()
+            if new_status in targets
+        ]
+        now = timezone.now()
+        changes = {'status': new_status, 'updated_at': now}
+        if new_status == 'delivered':
+            changes['delivered_at'] = now
+        moved = []
+        with db_transaction.atomic():
+            current = (
+                cls.objects.select_for_update()
+                .filter(pk__in=list(store_order_ids), status__in=sources)
+                .values_list('pk', 'status')
+            )
+            by_status = {}
+            for pk, old_status in current:
+                by_status.setdefault(old_status, []).append(pk)
+
+            for old_status, ids in by_status.items():
+                updated = cls.objects.filter(pk__in=ids, status=old_status).update(**changes)
+                if updated != len(ids):
+                    # Lost a race; keep only the rows this update changed
+                    ids = list(cls.objects.filter(
+                        pk__in=ids, status=new_status, updated_at=now
+                    ).values_list('pk', flat=True))
+                moved.extend(ids)
+
+            # Both statuses are final, so a store order is reversed at most once
+            if new_status in cls.REVERSED_STATUSES:
+                cls.post_reversals(moved)
+        return moved
+
+    def update_status(self, new_status, changed_by=None):
+        """
+        Update this store's status and roll it up to the order.
+
+        Returns False if the transition is not allowed or the status was
+        changed by someone else first.
+        """
+        if not Order.can_transition(self.status, new_status):
+            return False
+
+        with db_transaction.atomic():
+            if not StoreOrder.transition_store_orders([self.pk], new_status):
+                return False
+            self.refresh_from_db(fields=['status', 'updated_at', 'delivered_at'])
+
+            # The order follows once every store has reached the same status
+            statuses = set(self.order.store_orders.values_list('status', flat=True))
+            if statuses == {new_status} and self.order.status != new_status:
+                order_changes = {}
+                if new_status == 'delivered':
+                    order_changes['delivered_at'] = self.delivered_at
+                self.order.transition_to(
+                    new_status,
+                    changed_by=changed_by,
+                    note=f'All stores {new_status}',
+                    **order_changes
+                )
+        return True
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_details(self):
+        """Prefetch the store, product and main image OrderItemSerializer reads."""
+        from products.models import ProductImage
+
+        return self.select_related('store', 'product').prefetch_related(
+            models.Prefetch(
+                'product__images',
+                queryset=ProductImage.objects.filter(is_main=True),
+                to_attr='main_images'
+            )
+        )
+
+
 class OrderItem(models.Model):
     """Individual item in an order."""
     order = models.ForeignKey(
@@ -289,6 +726,14 @@ class OrderItem(models.Model):
         related_name='order_items',
         verbose_name=_('store')
     )
+    store_order = models.ForeignKey(
+        StoreOrder,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='items',
+        verbose_name=_('store order')
+    )
     product_name = models.CharField(_('product name'), max_length=200)
     variant_name = models.CharField(_('variant name'), max_length=100, blank=True)
     price = models.DecimalField(
@@ -319,11 +764,22 @@ class OrderItem(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(Decimal('0.01'))]
     )
+    product_image = models.CharField(
+        _('product image URL'),
+        max_length=500,
+        blank=True,
+        help_text=_('Main product image at the time of purchase')
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('order item')
         verbose_name_plural = _('order items')
+        indexes = [
+            models.Index(fields=['product', 'order']),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.product_name}"
@@ -337,8 +793,20 @@ class OrderItem(models.Model):
             self.price = self.variant.price if self.variant else self.product.price
             self.subtotal = self.price * self.quantity
             self.total = self.subtotal + self.tax_amount
+            if not self.product_image:
+                self.product_image = self.product_image_url(self.product)
+            # The snapshot must outlive the product image it was taken from
+            MediaBlob.pin_urls([self.product_image])
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def product_image_url(product):
+        """URL of the product's current main image, for snapshotting on the line."""
+        main_img = product.main_image
+        if main_img and main_img.image:
+            return main_img.image.url
+        return ''
+
 
 class Transaction(models.Model):
     """Payment transaction model."""
@@ -445,6 +913,12 @@ class OrderStatusHistory(models.Model):
         max_length=20,
         choices=Order.STATUS_CHOICES
     )
+    previous_status = models.CharField(
+        _('previous status'),
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        blank=True
+    )
     note = models.TextField(_('note'), blank=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -459,11 +933,111 @@ class OrderStatusHistory(models.Model):
         verbose_name = _('order status history')
         verbose_name_plural = _('order status history')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Order {self.order.order_number} - {self.get_status_display()} at {self.created_at}"
 
 
+class SellerPayoutAccount(models.Model):
+    """Where a store's payouts are sent."""
+    ACCOUNT_TYPES = (
+        ('ghipss', _('Bank Account')),
+        ('mobile_money', _('Mobile Money')),
+    )
+
+    store = models.OneToOneField(
+        'stores.Store',
+        on_delete=models.CASCADE,
+        related_name='payout_account',
+        verbose_name=_('store')
+    )
+    account_type = models.CharField(
+        _('account type'),
+        max_length=20,
+        choices=ACCOUNT_TYPES,
+        default='ghipss'
+    )
+    account_name = models.CharField(_('account name'), max_length=200)
+    account_number = models.CharField(_('account number'), max_length=50)
+    bank_code = models.CharField(
+        _('bank code'),
+        max_length=20,
+        help_text=_('Paystack bank or mobile money provider code')
+    )
+    recipient_code = models.CharField(
+        _('Paystack recipient code'),
+        max_length=100,
+        blank=True,
+        editable=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('seller payout account')
+        verbose_name_plural = _('seller payout accounts')
+
+    def __str__(self):
+        return f"{self.account_name} ({self.store.name})"
+
+    def save(self, *args, **kwargs):
+        # Account details changed, the Paystack recipient has to be recreated
+        if self.pk and not kwargs.get('update_fields'):
+            previous = SellerPayoutAccount.objects.filter(pk=self.pk).values(
+                'account_type', 'account_number', 'bank_code'
+            ).first()
+            if previous and previous != {
+                'account_type': self.account_type,
+                'account_number': self.account_number,
+                'bank_code': self.bank_code,
+            }:
+                self.recipient_code = ''
+        super().save(*args, **kwargs)
+
+
+class PayoutRun(models.Model):
+    """A batch of seller payouts created and submitted together."""
+    STATUS_CHOICES = (
+        ('running', _('Running')),
+        ('completed', _('Completed')),
+    )
+
+    reference = models.CharField(
+        _('reference'),
+        max_length=50,
+        unique=True
+    )
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='running'
+    )
+    minimum_amount = models.DecimalField(
+        _('minimum amount'),
+        max_digits=12,
+        decimal_places=2
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(_('completed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('payout run')
+        verbose_name_plural = _('payout runs')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Payout run {self.reference}"
+
+    def save(self, *args, **kwargs):
+        if not self.reference:
+            self.reference = f"RUN-{timezone.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:6].upper()}"
+        super().save(*args, **kwargs)
+
+
 class SellerPayout(models.Model):
     """Payout model for store owners."""
     STATUS_CHOICES = (
@@ -479,6 +1053,14 @@ class SellerPayout(models.Model):
         related_name='payouts',
         verbose_name=_('store')
     )
+    run = models.ForeignKey(
+        PayoutRun,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payouts',
+        verbose_name=_('payout run')
+    )
     amount = models.DecimalField(
         _('amount'),
         max_digits=12,
@@ -528,7 +1110,22 @@ class SellerPayout(models.Model):
     def save(self, *args, **kwargs):
         if not self.reference:
             self.reference = f"PYT-{str(uuid.uuid4())[:8].upper()}"
-        super().save(*args, **kwargs)
+        is_new = self._state.adding
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                # Reserve the payout amount against the store's balance
+                SellerBalance.post_entries([self.ledger_entry('payout', -self.amount)])
+
+    def ledger_entry(self, entry_type, amount):
+        """Build an unsaved ledger entry for this payout."""
+        return SellerLedgerEntry(
+            store_id=self.store_id,
+            payout=self,
+            entry_type=entry_type,
+            amount=amount,
+            description=self.reference
+        )
 
     def mark_as_processing(self):
         """Mark the payout as processing."""
@@ -537,15 +1134,432 @@ class SellerPayout(models.Model):
 
     def mark_as_completed(self, payment_details=None):
         """Mark the payout as completed."""
-        self.status = 'completed'
         self.processed_at = timezone.now()
+        changes = {'status': 'completed', 'processed_at': self.processed_at}
         if payment_details:
-            self.payment_details = payment_details
-        self.save(update_fields=['status', 'processed_at', 'payment_details', 'updated_at'])
+            changes['payment_details'] = self.payment_details = payment_details
+        with db_transaction.atomic():
+            # Only an open payout can complete, so a webhook and a payout run
+            # racing on the same transfer settle it once
+            if self._close(changes):
+                SellerBalance.settle_payout(self.store_id, self.amount)
+                self.status = 'completed'
 
     def mark_as_failed(self, reason=None):
         """Mark the payout as failed."""
-        self.status = 'failed'
+        changes = {'status': 'failed'}
         if reason:
-            self.notes = f"Failed: {reason}"
-        self.save(update_fields=['status', 'notes', 'updated_at'])
+            changes['notes'] = self.notes = f"Failed: {reason}"
+        with db_transaction.atomic():
+            if self._close(changes):
+                # Release the reserved amount back to the store
+                SellerBalance.post_entries([self.ledger_entry('payout_reversal', self.amount)])
+                self.status = 'failed'
+
+    def _close(self, changes):
+        return SellerPayout.objects.filter(
+            pk=self.pk, status__in=['pending', 'processing']
+        ).update(updated_at=timezone.now(), **changes)
+
+
+class ReconciliationCheckpoint(models.Model):
+    """Progress marker for incremental reconciliation jobs."""
+    job = models.CharField(_('job'), max_length=50, unique=True)
+    cursor = models.DateTimeField(
+        _('cursor'),
+        null=True,
+        blank=True,
+        help_text=_('Everything created before this time has been reconciled')
+    )
+    window_end = models.DateTimeField(
+        _('window end'),
+        null=True,
+        blank=True,
+        help_text=_('Upper bound of the run in progress, if any')
+    )
+    page = models.PositiveIntegerField(
+        _('last completed page'),
+        default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('reconciliation checkpoint')
+        verbose_name_plural = _('reconciliation checkpoints')
+
+    def __str__(self):
+        return f"{self.job} checkpoint"
+
+
+class SellerBalance(models.Model):
+    """Running totals of a store's ledger, kept in step with every entry."""
+    store = models.OneToOneField(
+        'stores.Store',
+        on_delete=models.CASCADE,
+        related_name='balance',
+        verbose_name=_('store')
+    )
+    available_balance = models.DecimalField(
+        _('available balance'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    total_sales = models.DecimalField(
+        _('total sales'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    platform_fees = models.DecimalField(
+        _('platform fees'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    total_refunds = models.DecimalField(
+        _('total refunds'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    total_payouts = models.DecimalField(
+        _('total payouts'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    pending_payouts = models.DecimalField(
+        _('pending payouts'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    TOTAL_FIELDS = [
+        'available_balance', 'total_sales', 'platform_fees',
+        'total_refunds', 'total_payouts', 'pending_payouts'
+    ]
+
+    class Meta:
+        verbose_name = _('seller balance')
+        verbose_name_plural = _('seller balances')
+
+    def __str__(self):
+        return f"{self.store.name} balance"
+
+    @classmethod
+    def post_entries(cls, entries):
+        """
+        Append unsaved SellerLedgerEntry objects and update running balances.
+
+        Balances are locked for the duration so each entry records the
+        balance it produced.
+        """
+        if not entries:
+            return []
+
+        with db_transaction.atomic():
+            store_ids = {entry.store_id for entry in entries}
+            cls.objects.bulk_create(
+                [cls(store_id=store_id) for store_id in store_ids],
+                ignore_conflicts=True
+            )
+            balances = {
+                balance.store_id: balance
+                for balance in cls.objects.select_for_update().filter(store_id__in=store_ids)
+            }
+
+            for entry in entries:
+                balance = balances[entry.store_id]
+                balance.available_balance += entry.amount
+                if entry.entry_type == 'sale':
+                    balance.total_sales += entry.amount
+                elif entry.entry_type == 'fee':
+                    balance.platform_fees -= entry.amount
+                elif entry.entry_type == 'refund':
+                    balance.total_refunds -= entry.amount
+                elif entry.entry_type == 'payout':
+                    balance.pending_payouts -= entry.amount
+                elif entry.entry_type == 'payout_reversal':
+                    balance.pending_payouts -= entry.amount
+                entry.balance_after = balance.available_balance
+
+            SellerLedgerEntry.objects.bulk_create(entries)
+            now = timezone.now()
+            for balance in balances.values():
+                balance.updated_at = now
+            cls.objects.bulk_update(balances.values(), cls.TOTAL_FIELDS + ['updated_at'])
+        return entries
+
+    @classmethod
+    def settle_payout(cls, store_id, amount):
+        """Move a payout from pending to paid out. The ledger already debited it."""
+        cls.objects.filter(store_id=store_id).update(
+            pending_payouts=F('pending_payouts') - amount,
+            total_payouts=F('total_payouts') + amount,
+            updated_at=timezone.now()
+        )
+
+
+class SellerLedgerEntry(models.Model):
+    """Append-only record of money owed to, or paid out to, a store."""
+    ENTRY_TYPES = (
+        ('sale', _('Sale')),
+        ('fee', _('Platform Fee')),
+        ('refund', _('Refund')),
+        ('payout', _('Payout')),
+        ('payout_reversal', _('Payout Reversal')),
+        ('adjustment', _('Adjustment')),
+    )
+
+    store = models.ForeignKey(
+        'stores.Store',
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        verbose_name=_('store')
+    )
+    entry_type = models.CharField(
+        _('entry type'),
+        max_length=20,
+        choices=ENTRY_TYPES
+    )
+    amount = models.DecimalField(
+        _('amount'),
+        max_digits=12,
+        decimal_places=2,
+        help_text=_('Positive for credits, negative for debits')
+    )
+    balance_after = models.DecimalField(
+        _('balance after'),
+        max_digits=12,
+        decimal_places=2
+    )
+    # Source rows may be archived or deleted; the description keeps the
+    # human-readable reference either way
+    store_order = models.ForeignKey(
+        StoreOrder,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries',
+        verbose_name=_('store order')
+    )
+    payout = models.ForeignKey(
+        SellerPayout,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries',
+        verbose_name=_('payout')
+    )
+    description = models.CharField(_('description'), max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('seller ledger entry')
+        verbose_name_plural = _('seller ledger entries')
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['store', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.amount} - {self.store_id}"
+
+
+class ArchivedOrder(models.Model):
+    """A finished order moved out of the hot order tables by archive_orders."""
+    id = models.BigIntegerField(primary_key=True)
+    order_number = models.CharField(_('order number'), max_length=20, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_orders',
+        verbose_name=_('user')
+    )
+    status = models.CharField(_('status'), max_length=20, choices=Order.STATUS_CHOICES)
+    payment_method = models.CharField(
+        _('payment method'),
+        max_length=20,
+        choices=Order.PAYMENT_METHODS
+    )
+    payment_status = models.CharField(_('payment status'), max_length=20)
+    payment_reference = models.CharField(_('payment reference'), max_length=100, blank=True)
+    subtotal = models.DecimalField(_('subtotal'), max_digits=12, decimal_places=2)
+    tax_amount = models.DecimalField(_('tax amount'), max_digits=12, decimal_places=2)
+    shipping_cost = models.DecimalField(_('shipping cost'), max_digits=12, decimal_places=2)
+    total = models.DecimalField(_('total'), max_digits=12, decimal_places=2)
+    platform_fee = models.DecimalField(_('platform fee'), max_digits=12, decimal_places=2)
+    shipping_address = models.ForeignKey(
+        'accounts.Address',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_('shipping address')
+    )
+    billing_address = models.ForeignKey(
+        'accounts.Address',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_('billing address')
+    )
+    customer_note = models.TextField(_('customer note'), blank=True)
+    ip_address = models.GenericIPAddressField(_('IP address'), null=True, blank=True)
+    status_history = models.JSONField(
+        _('status history'),
+        default=list,
+        encoder=DjangoJSONEncoder
+    )
+    created_at = models.DateTimeField(_('created at'))
+    updated_at = models.DateTimeField(_('updated at'))
+    paid_at = models.DateTimeField(_('paid at'), null=True, blank=True)
+    delivered_at = models.DateTimeField(_('delivered at'), null=True, blank=True)
+    archived_at = models.DateTimeField(_('archived at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('archived order')
+        verbose_name_plural = _('archived orders')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            # Incremental store stats rollups read paid_at ranges
+            models.Index(fields=['paid_at']),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_number} (archived)"
+
+    @property
+    def is_paid(self):
+        return self.payment_status == 'paid' and self.paid_at is not None
+
+
+class ArchivedStoreOrder(models.Model):
+    """Archived copy of a StoreOrder."""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='store_orders',
+        verbose_name=_('order')
+    )
+    store = models.ForeignKey(
+        'stores.Store',
+        on_delete=models.PROTECT,
+        related_name='archived_store_orders',
+        verbose_name=_('store')
+    )
+    status = models.CharField(_('status'), max_length=20, choices=Order.STATUS_CHOICES)
+    subtotal = models.DecimalField(_('subtotal'), max_digits=12, decimal_places=2)
+    platform_fee = models.DecimalField(_('platform fee'), max_digits=12, decimal_places=2)
+    total = models.DecimalField(_('total'), max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(_('created at'))
+    updated_at = models.DateTimeField(_('updated at'))
+    delivered_at = models.DateTimeField(_('delivered at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('archived store order')
+        verbose_name_plural = _('archived store orders')
+        indexes = [
+            models.Index(fields=['store', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order.order_number} - {self.store_id} (archived)"
+
+
+class ArchivedOrderItem(models.Model):
+    """Archived copy of an OrderItem."""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name=_('order')
+    )
+    store_order = models.ForeignKey(
+        ArchivedStoreOrder,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='items',
+        verbose_name=_('store order')
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.PROTECT,
+        related_name='archived_order_items',
+        verbose_name=_('product')
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='archived_order_items',
+        verbose_name=_('variant')
+    )
+    store = models.ForeignKey(
+        'stores.Store',
+        on_delete=models.PROTECT,
+        related_name='archived_order_items',
+        verbose_name=_('store')
+    )
+    product_name = models.CharField(_('product name'), max_length=200)
+    variant_name = models.CharField(_('variant name'), max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(_('quantity'))
+    price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(_('subtotal'), max_digits=12, decimal_places=2)
+    tax_amount = models.DecimalField(_('tax amount'), max_digits=12, decimal_places=2)
+    total = models.DecimalField(_('total'), max_digits=12, decimal_places=2)
+    product_image = models.CharField(_('product image URL'), max_length=500, blank=True)
+    created_at = models.DateTimeField(_('created at'))
+
+    class Meta:
+        verbose_name = _('archived order item')
+        verbose_name_plural = _('archived order items')
+        indexes = [
+            models.Index(fields=['product', 'order']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_name} (archived)"
+
+
+class ArchivedTransaction(models.Model):
+    """Archived copy of a Transaction."""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='transactions',
+        verbose_name=_('order')
+    )
+    amount = models.DecimalField(_('amount'), max_digits=12, decimal_places=2)
+    currency = models.CharField(_('currency'), max_length=3)
+    payment_method = models.CharField(
+        _('payment method'),
+        max_length=20,
+        choices=Transaction.PAYMENT_METHODS
+    )
+    status = models.CharField(_('status'), max_length=20, choices=Transaction.STATUS_CHOICES)
+    reference = models.CharField(_('reference'), max_length=100, unique=True)
+    gateway_response = models.JSONField(_('gateway response'), null=True, blank=True)
+    ip_address = models.GenericIPAddressField(_('IP address'), null=True, blank=True)
+    created_at = models.DateTimeField(_('created at'))
+    updated_at = models.DateTimeField(_('updated at'))
+    paid_at = models.DateTimeField(_('paid at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('archived transaction')
+        verbose_name_plural = _('archived transactions')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Transaction {self.reference} (archived)"
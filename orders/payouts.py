@@ -0,0 +1,218 @@
+"""
+Batched seller payouts.
+
+A payout run reserves every payable store balance in one transaction, then
+submits the transfers through a bounded thread pool. Each transfer uses the
+payout reference as its Paystack reference, so a run interrupted at any point
+can be resumed without paying a store twice.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import PayoutRun, SellerBalance, SellerPayout, SellerPayoutAccount
+
+
+FAILED_TRANSFER_STATUSES = ('failed', 'reversed', 'rejected', 'abandoned')
+
+
+def payable_balances(minimum_amount):
+    """Stores with a payout account and at least ``minimum_amount`` available."""
+    return SellerBalance.objects.filter(
+        available_balance__gte=minimum_amount,
+        store__payout_account__isnull=False
+    )
+
+
+def payable_summary(minimum_amount):
+    """Count and total of what a run would pay out right now."""
+    return payable_balances(minimum_amount).aggregate(
+        stores=Count('id'),
+        total=Sum('available_balance')
+    )
+
+
+def create_payout_run(minimum_amount=None):
+    """
+    Create a payout for every payable store and reserve it in the ledger.
+
+    Returns the new run, or None when no store is payable.
+    """
+    if minimum_amount is None:
+        minimum_amount = Decimal(str(settings.PAYOUT_MINIMUM_AMOUNT))
+
+    with db_transaction.atomic():
+        balances = list(
+            payable_balances(minimum_amount)
+            .select_for_update(of=('self',))
+            .values_list('store_id', 'available_balance')
+        )
+        if not balances:
+            return None
+
+        run = PayoutRun.objects.create(minimum_amount=minimum_amount)
+        payouts = SellerPayout.objects.bulk_create([
+            SellerPayout(
+                store_id=store_id,
+                run=run,
+                amount=amount,
+                reference=f"PYT-{run.reference[4:]}-{store_id}",
+                payment_method='paystack_transfer',
+                status='pending'
+            )
+            for store_id, amount in balances
+        ])
+        # bulk_create skips SellerPayout.save, so reserve the amounts here
+        SellerBalance.post_entries([
+            payout.ledger_entry('payout', -payout.amount) for payout in payouts
+        ])
+    return run
+
+
+def execute_payout_run(run, gateway, concurrency=None, max_attempts=None):
+    """
+    Submit the open payouts of a run and record the results.
+
+    Only gateway calls run in the worker threads; all database writes happen
+    on the calling thread as results arrive.
+    """
+    concurrency = concurrency or settings.PAYOUT_MAX_CONCURRENCY
+    max_attempts = max_attempts or settings.PAYOUT_MAX_ATTEMPTS
+    stats = {'completed': 0, 'processing': 0, 'failed': 0}
+
+    payouts = list(
+        run.payouts.filter(status__in=['pending', 'processing'])
+        .select_related('store__payout_account')
+    )
+    # Anything past this point may reach Paystack. A payout still marked
+    # processing when the run is resumed is looked up before resubmitting.
+    run.payouts.filter(status='pending').update(status='processing', updated_at=timezone.now())
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(submit_transfer, gateway, payout) for payout in payouts]
+        for future in as_completed(futures):
+            payout, outcome, response, recipient_code = future.result()
+            outcome = record_transfer(payout, outcome, response, recipient_code, max_attempts)
+            stats[outcome] += 1
+
+    if not run.payouts.filter(status__in=['pending', 'processing']).exists():
+        run.status = 'completed'
+        run.completed_at = timezone.now()
+        run.save(update_fields=['status', 'completed_at'])
+    return stats
+
+
+def submit_transfer(gateway, payout):
+    """
+    Send one payout to the gateway. Runs in a worker thread.
+
+    Returns ``(payout, outcome, response, new_recipient_code)`` where outcome
+    is 'completed', 'processing', 'failed' or 'retry'.
+    """
+    if payout.status == 'processing':
+        # A previous attempt may have reached Paystack before we crashed
+        response = gateway.verify_transfer(payout.reference)
+        if response.get('status'):
+            return payout, transfer_outcome(response), response, None
+
+    account = payout.store.payout_account
+    recipient_code = account.recipient_code
+    new_recipient_code = None
+    if not recipient_code:
+        response = gateway.create_transfer_recipient(
+            account.account_number,
+            account.bank_code,
+            account.account_name,
+            recipient_type=account.account_type
+        )
+        if not response.get('status'):
+            return payout, 'retry', response, None
+        recipient_code = new_recipient_code = response['data']['recipient_code']
+
+    response = gateway.initiate_transfer(
+        recipient_code,
+        payout.amount,
+        reason=f"Campus Shop payout {payout.reference}",
+        reference=payout.reference
+    )
+    if not response.get('status'):
+        return payout, 'retry', response, new_recipient_code
+    return payout, transfer_outcome(response), response, new_recipient_code
+
+
+def transfer_outcome(response):
+    transfer_status = (response.get('data') or {}).get('status')
+    if transfer_status == 'success':
+        return 'completed'
+    if transfer_status in FAILED_TRANSFER_STATUSES:
+        return 'failed'
+    # Queued at Paystack; the transfer webhook completes it
+    return 'processing'
+
+
+def record_transfer(payout, outcome, response, recipient_code, max_attempts):
+    """Store a gateway result against its payout. Returns the final outcome."""
+    if recipient_code:
+        SellerPayoutAccount.objects.filter(store_id=payout.store_id).update(
+            recipient_code=recipient_code
+        )
+
+    details = dict(payout.payment_details or {})
+    details['attempts'] = details.get('attempts', 0) + 1
+    details['gateway_response'] = response
+    if outcome == 'retry':
+        outcome = 'failed' if details['attempts'] >= max_attempts else 'processing'
+
+    SellerPayout.objects.filter(pk=payout.pk).update(
+        payment_details=details,
+        updated_at=timezone.now()
+    )
+    if outcome == 'completed':
+        payout.mark_as_completed(details)
+    elif outcome == 'failed':
+        payout.mark_as_failed(response.get('message', 'Transfer failed'))
+    return outcome
+
+
+def check_transfers(payouts, gateway):
+    """
+    Look up open payouts at the gateway and settle the ones it has finished.
+    Returns how many were completed and failed.
+    """
+    stats = {'completed': 0, 'failed': 0}
+    for payout in payouts:
+        if payout.status not in ('pending', 'processing'):
+            continue
+        response = gateway.verify_transfer(payout.reference)
+        if not response.get('status'):
+            continue
+        outcome = transfer_outcome(response)
+        if outcome == 'completed':
+            details = dict(payout.payment_details or {})
+            details['gateway_response'] = response
+            payout.mark_as_completed(details)
+        elif outcome == 'failed':
+            payout.mark_as_failed(response.get('message', 'Transfer failed'))
+        if payout.status == outcome:
+            stats[outcome] += 1
+    return stats
+
+
+def close_payouts(payouts, outcome, reason=None):
+    """
+    Complete or fail open payouts by hand, e.g. a transfer settled outside
+    Paystack. Completing settles the reserved amount; failing releases it
+    back to the store. Returns how many payouts were closed.
+    """
+    closed = 0
+    for payout in payouts:
+        if outcome == 'completed':
+            payout.mark_as_completed()
+        else:
+            payout.mark_as_failed(reason)
+        closed += payout.status == outcome
+    return closed
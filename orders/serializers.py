@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Cart, CartItem, Order, OrderItem, Transaction, SellerPayout
+from .models import (
+    Cart, CartItem, Order, OrderItem, StoreOrder, Transaction, SellerPayout, SellerLedgerEntry,
+    SellerPayoutAccount, OrderStatusHistory, ArchivedOrder, ArchivedOrderItem
+)
 from products.serializers import ProductListSerializer
 
 
@@ -11,11 +14,16 @@ class CartItemSerializer(serializers.ModelSerializer):
     price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     product_image = serializers.SerializerMethodField()
+    # Set by Cart.validate()
+    issue = serializers.CharField(read_only=True, default=None)
+    price_changed = serializers.BooleanField(read_only=True, default=False)
+    available_quantity = serializers.IntegerField(read_only=True, default=None)
 
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'product_name', 'product_slug', 'variant', 'variant_name', 
-                 'quantity', 'price', 'total_price', 'product_image', 'created_at']
+                 'quantity', 'price', 'total_price', 'product_image', 'issue', 'price_changed',
+                 'available_quantity', 'created_at']
         read_only_fields = ['cart', 'price', 'total_price']
 
     def get_product_image(self, obj):
@@ -28,16 +36,24 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
-    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    item_count = serializers.IntegerField(read_only=True)
+    """Serializes a cart with the lines and totals from Cart.validate()."""
+    items = CartItemSerializer(source='lines', many=True, read_only=True)
+    subtotal = serializers.DecimalField(source='totals.subtotal', max_digits=12, decimal_places=2, read_only=True)
+    total = serializers.DecimalField(source='totals.total', max_digits=12, decimal_places=2, read_only=True)
+    item_count = serializers.IntegerField(source='totals.item_count', read_only=True)
+    has_issues = serializers.BooleanField(source='totals.has_issues', read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'subtotal', 'total', 'item_count', 'created_at', 'updated_at']
+        fields = ['id', 'items', 'subtotal', 'total', 'item_count', 'has_issues', 'created_at', 'updated_at']
         read_only_fields = ['user']
 
+    def to_representation(self, instance):
+        # Carts the view did not validate (list, retrieve) are validated here
+        if not hasattr(instance, 'lines'):
+            instance.validate()
+        return super().to_representation(instance)
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
@@ -52,14 +68,12 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = fields
     
     def get_product_image(self, obj):
-        try:
-            main_img = obj.product.main_image
-            if main_img and main_img.image:
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(main_img.image.url)
-        except:
-            pass
+        # Prefer the snapshot taken at checkout so old orders keep their image
+        image_url = obj.product_image or OrderItem.product_image_url(obj.product)
+        if image_url:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(image_url)
         return None
 
 
@@ -98,6 +112,81 @@ class OrderSerializer(serializers.ModelSerializer):
         return None
 
 
+class ArchivedOrderItemSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        model = ArchivedOrderItem
+
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """Same shape as OrderSerializer, for orders served from the archive."""
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields + ['archived_at']
+        read_only_fields = fields
+
+
+class OrderStatusHistorySerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    changed_by = serializers.EmailField(source='created_by.email', read_only=True, allow_null=True)
+
+    class Meta:
+        model = OrderStatusHistory
+        fields = ['id', 'previous_status', 'status', 'status_display', 'note', 'changed_by', 'created_at']
+        read_only_fields = fields
+
+
+class StoreOrderSerializer(serializers.ModelSerializer):
+    """A store's view of an order: only its own lines and totals."""
+    items = OrderItemSerializer(many=True, read_only=True)
+    order_id = serializers.IntegerField(source='order.id', read_only=True)
+    order_number = serializers.CharField(source='order.order_number', read_only=True)
+    user = serializers.IntegerField(source='order.user_id', read_only=True)
+    user_email = serializers.EmailField(source='order.user.email', read_only=True)
+    user_first_name = serializers.CharField(source='order.user.first_name', read_only=True)
+    user_last_name = serializers.CharField(source='order.user.last_name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    payment_method = serializers.CharField(source='order.payment_method', read_only=True)
+    payment_status = serializers.CharField(source='order.payment_status', read_only=True)
+    payment_reference = serializers.CharField(source='order.payment_reference', read_only=True)
+    is_paid = serializers.BooleanField(source='order.is_paid', read_only=True)
+    customer_note = serializers.CharField(source='order.customer_note', read_only=True)
+    earnings = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    # Order-wide amounts, as on OrderSerializer; this store's share is subtotal/total
+    tax_amount = serializers.DecimalField(source='order.tax_amount', max_digits=10, decimal_places=2, read_only=True)
+    shipping_cost = serializers.DecimalField(source='order.shipping_cost', max_digits=10, decimal_places=2, read_only=True)
+    shipping_address = serializers.IntegerField(source='order.shipping_address_id', read_only=True)
+    billing_address = serializers.IntegerField(source='order.billing_address_id', read_only=True)
+    shipping_address_display = serializers.SerializerMethodField()
+    billing_address_display = serializers.SerializerMethodField()
+    paid_at = serializers.DateTimeField(source='order.paid_at', read_only=True)
+
+    class Meta:
+        model = StoreOrder
+        fields = [
+            'id', 'order_id', 'order_number', 'store', 'user', 'user_email', 'user_first_name',
+            'user_last_name', 'status', 'status_display', 'payment_method', 'payment_status',
+            'payment_reference', 'is_paid', 'subtotal', 'tax_amount',
+            'shipping_cost', 'platform_fee', 'total', 'earnings', 'customer_note',
+            'shipping_address', 'billing_address', 'shipping_address_display',
+            'billing_address_display', 'items', 'created_at', 'updated_at', 'paid_at', 'delivered_at'
+        ]
+        read_only_fields = fields
+
+    def get_shipping_address_display(self, obj):
+        address = obj.order.shipping_address
+        if address:
+            return f"{address.street_address}, {address.city}"
+        return None
+
+    def get_billing_address_display(self, obj):
+        address = obj.order.billing_address
+        if address:
+            return f"{address.street_address}, {address.city}"
+        return None
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     
@@ -114,10 +203,28 @@ class SellerPayoutSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = SellerPayout
-        fields = ['id', 'store', 'store_name', 'amount', 'fee', 'status', 'reference',
+        fields = ['id', 'store', 'store_name', 'run', 'amount', 'fee', 'status', 'reference',
                  'payment_method', 'payment_details', 'notes', 'processed_at',
                  'created_at', 'updated_at']
-        read_only_fields = ['store', 'reference', 'status', 'created_at', 'updated_at', 'processed_at']
+        read_only_fields = ['store', 'run', 'reference', 'status', 'created_at', 'updated_at', 'processed_at']
+
+
+class SellerPayoutAccountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SellerPayoutAccount
+        fields = ['account_type', 'account_name', 'account_number', 'bank_code',
+                 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+
+class SellerLedgerEntrySerializer(serializers.ModelSerializer):
+    entry_type_display = serializers.CharField(source='get_entry_type_display', read_only=True)
+
+    class Meta:
+        model = SellerLedgerEntry
+        fields = ['id', 'entry_type', 'entry_type_display', 'amount', 'balance_after',
+                 'store_order', 'payout', 'description', 'created_at']
+        read_only_fields = fields
 
 
 class CheckoutSerializer(serializers.Serializer):
@@ -130,3 +237,22 @@ class CheckoutSerializer(serializers.Serializer):
     def validate(self, data):
         # Additional validation can be added here
         return data
+
+
+class CartLineSerializer(serializers.Serializer):
+    """A product, optional variant and quantity, as held by cookie-backed carts"""
+    product_id = serializers.IntegerField()
+    variant_id = serializers.IntegerField(required=False, allow_null=True, default=None)
+    quantity = serializers.IntegerField(required=False, min_value=0, default=1)
+
+
+class CartOperationSerializer(CartLineSerializer):
+    """One add, set or remove operation in a batch cart update"""
+    OPERATIONS = ('add', 'set', 'remove')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Serializer for batch cart updates"""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
@@ -1,3 +1,1174 @@
-from django.test import TestCase
+import csv
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin as django_admin
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from accounts.models import Address, User
+from core.pagination import EstimatedCountAdminMixin, EstimatedCountPaginator, estimated_count
+from core.paystack import verify_order_payment
+from products.models import Product, ProductImage
+from stores.models import Store
+from .models import (
+    ArchivedOrder, Cart, CartItem, Order, OrderItem, PayoutRun, ReconciliationCheckpoint, SellerBalance,
+    SellerLedgerEntry, SellerPayout, SellerPayoutAccount, StoreOrder, Transaction
+)
+from . import anonymous_cart
+from .archive import archive_batch
+from .payouts import create_payout_run, execute_payout_run
+
+
+class StubGateway:
+    """In-memory stand-in for PaystackAPI's transfer endpoints."""
+
+    def __init__(self, transfer_status='success', fail_references=()):
+        self.transfer_status = transfer_status
+        self.fail_references = set(fail_references)
+        self.transfers = {}
+        self.recipients = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def create_transfer_recipient(self, account_number, bank_code, name, recipient_type='nuban'):
+        with self.lock:
+            self.recipients += 1
+        return {'status': True, 'data': {'recipient_code': f'RCP_{account_number}'}}
+
+    def initiate_transfer(self, recipient_code, amount, reason, reference=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if reference in self.fail_references:
+                return {'status': False, 'message': 'Request failed: timeout'}
+            with self.lock:
+                if reference in self.transfers:
+                    return {'status': False, 'message': 'Duplicate transfer reference'}
+                self.transfers[reference] = Decimal(str(amount))
+            return {'status': True, 'data': {'reference': reference, 'status': self.transfer_status}}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def verify_transfer(self, reference):
+        if reference in self.transfers:
+            return {'status': True, 'data': {'reference': reference, 'status': self.transfer_status}}
+        return {'status': False, 'message': 'Transfer not found'}
+
+
+class StubPaystack:
+    """Stand-in for PaystackAPI.verify_transaction that counts its calls."""
+
+    def __init__(self, status='success', delay=0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def verify_transaction(self, reference):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {'status': True, 'data': {'reference': reference, 'status': self.status}}
+
+
+def create_pending_payment(user, reference):
+    """A pending order with one store and a pending transaction for ``reference``."""
+    owner = User.objects.create_user(email=f'owner-{reference}@example.com', password='pass', is_seller=True)
+    store = Store.objects.create(owner=owner, name=f'Store {reference}', status='approved')
+    product = Product.objects.create(
+        store=store, name=f'Lamp {reference}', description='-', price=Decimal('20.00'), quantity=5
+    )
+    order = Order.objects.create(user=user, subtotal=Decimal('20.00'), total=Decimal('20.00'))
+    store_order = StoreOrder.objects.create(
+        order=order, store=store, subtotal=Decimal('20.00'),
+        platform_fee=Decimal('1.00'), total=Decimal('20.00')
+    )
+    OrderItem.objects.create(order=order, store_order=store_order, product=product, quantity=2)
+    Transaction.objects.create(order=order, amount=order.total, reference=reference)
+    return order, product
+
+
+class PaymentVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.order, self.product = create_pending_payment(self.buyer, 'REF-VERIFY')
+        self.gateway = StubPaystack()
+        patcher = mock.patch('core.paystack.PaystackAPI', lambda: self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_verification_applies_the_payment_once(self):
+        for _ in range(3):
+            result = verify_order_payment('REF-VERIFY')
+            self.assertTrue(result['success'])
+            self.assertEqual(result['order'].pk, self.order.pk)
+        # Expiring the cached result does not ask Paystack again either
+        cache.clear()
+        self.assertTrue(verify_order_payment('REF-VERIFY')['success'])
+
+        self.assertEqual(self.gateway.calls, 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+        self.assertEqual(self.order.status_history.filter(status='processing').count(), 1)
+
+    def test_cache_hit_reads_the_order_fresh(self):
+        verify_order_payment('REF-VERIFY')
+        cached = cache.get('paystack:verify:REF-VERIFY')
+        self.assertEqual(cached['order_id'], self.order.pk)
+        self.assertNotIn('order', cached)
+
+        Order.objects.filter(pk=self.order.pk).update(status='shipped')
+        with self.assertNumQueries(1):
+            result = verify_order_payment('REF-VERIFY')
+        self.assertEqual(result['order'].status, 'shipped')
+        self.assertEqual(self.gateway.calls, 1)
+
+    def test_cached_result_for_an_archived_order(self):
+        verify_order_payment('REF-VERIFY')
+        Order.objects.filter(pk=self.order.pk).update(status='delivered')
+        archive_batch([self.order.pk])
+
+        result = verify_order_payment('REF-VERIFY')
+        self.assertTrue(result['success'])
+        self.assertIsInstance(result['order'], ArchivedOrder)
+        self.assertEqual(result['order'].pk, self.order.pk)
+
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        response = client.get('/api/orders/payments/verify/REF-VERIFY/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['order_number'], self.order.order_number)
+
+        ArchivedOrder.objects.all().delete()
+        self.assertEqual(
+            verify_order_payment('REF-VERIFY'), {'success': False, 'message': 'Order not found'}
+        )
+
+    @override_settings(PAYSTACK_VERIFY_LOCK_TIMEOUT=0.3)
+    def test_lock_held_by_another_worker_is_left_alone(self):
+        lock_key = 'paystack:verify:REF-VERIFY:lock'
+        cache.add(lock_key, 'other-worker', timeout=60)
+
+        result = verify_order_payment('REF-VERIFY')
+        self.assertTrue(result['success'])
+        self.assertEqual(cache.get(lock_key), 'other-worker')
+
+    def test_own_lock_is_released(self):
+        verify_order_payment('REF-VERIFY')
+        self.assertIsNone(cache.get('paystack:verify:REF-VERIFY:lock'))
+
+
+class ConcurrentPaymentVerificationTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.order, self.product = create_pending_payment(self.buyer, 'REF-CONCURRENT')
+
+    def test_concurrent_verifications_call_paystack_once(self):
+        gateway = StubPaystack(delay=0.2)
+        results = []
+
+        def verify():
+            try:
+                results.append(verify_order_payment('REF-CONCURRENT'))
+            finally:
+                connection.close()
+
+        with mock.patch('core.paystack.PaystackAPI', lambda: gateway):
+            threads = [threading.Thread(target=verify) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(gateway.calls, 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+        self.assertEqual(self.order.status_history.filter(status='processing').count(), 1)
+
+
+class StubTransactionListing:
+    """Stand-in for PaystackAPI.list_transactions serving fixed pages."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def list_transactions(self, page=1, per_page=50, status=None, from_date=None, to_date=None):
+        self.requested.append((page, from_date, to_date))
+        data = self.pages[page - 1] if page <= len(self.pages) else []
+        return {'status': True, 'data': data, 'meta': {'pageCount': len(self.pages)}}
+
+
+class ReconcilePaymentsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.order, self.product = create_pending_payment(self.buyer, 'REF-MISSED')
+
+    def run_command(self, pages, *args):
+        self.gateway = StubTransactionListing(pages)
+        out = StringIO()
+        with mock.patch(
+            'orders.management.commands.reconcile_payments.PaystackAPI', lambda: self.gateway
+        ):
+            call_command('reconcile_payments', *args, stdout=out, stderr=StringIO())
+        return list(csv.reader(StringIO(out.getvalue())))
+
+    def test_applies_missed_payment_and_forgets_cached_verification(self):
+        cache.set('paystack:verify:REF-MISSED', {'success': False, 'message': 'Payment verification failed'})
+
+        rows = self.run_command([[{'reference': 'REF-MISSED', 'status': 'success', 'amount': 2000}]])
+        self.assertEqual(rows[1][:2], ['REF-MISSED', 'missed_payment'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'paid')
+        self.assertEqual(self.order.status, 'processing')
+        self.assertEqual(Transaction.objects.get(reference='REF-MISSED').status, 'completed')
+        self.assertIsNone(cache.get('paystack:verify:REF-MISSED'))
+
+    def test_dry_run_changes_nothing(self):
+        rows = self.run_command(
+            [[{'reference': 'REF-MISSED', 'status': 'success', 'amount': 2000}]], '--dry-run'
+        )
+        self.assertEqual(rows[1][:2], ['REF-MISSED', 'missed_payment'])
+        self.assertEqual(Transaction.objects.get(reference='REF-MISSED').status, 'pending')
+        self.assertFalse(ReconciliationCheckpoint.objects.exclude(page=0).exists())
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        pages = [
+            [{'reference': f'REF-OTHER-{number}', 'status': 'failed'}] for number in range(3)
+        ]
+        self.run_command(pages, '--per-page', '1', '--max-pages', '2')
+        checkpoint = ReconciliationCheckpoint.objects.get(job='paystack_transactions')
+        self.assertEqual(checkpoint.page, 2)
+        self.assertIsNone(checkpoint.cursor)
+        window_end = checkpoint.window_end
+        self.assertIsNotNone(window_end)
+
+        # The next run picks up at page 3 inside the same window, then moves the cursor
+        self.run_command(pages, '--per-page', '1')
+        self.assertEqual(self.gateway.requested, [(3, None, window_end)])
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.cursor, window_end)
+        self.assertIsNone(checkpoint.window_end)
+        self.assertEqual(checkpoint.page, 0)
+
+        # Later runs start from the cursor, less the overlap
+        self.run_command([], '--overlap-minutes', '5')
+        self.assertEqual(self.gateway.requested[0][1], window_end - timedelta(minutes=5))
+
+    def test_report_file_lists_discrepancies(self):
+        create_pending_payment(self.buyer, 'REF-PAID')
+        Transaction.objects.filter(reference='REF-PAID').update(status='completed')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.csv')
+            self.run_command([[
+                {'reference': 'REF-UNKNOWN', 'status': 'success', 'amount': 100},
+                {'reference': 'REF-MISSED', 'status': 'success', 'amount': 999},
+                {'reference': 'REF-PAID', 'status': 'failed'},
+            ]], '--report', path)
+            with open(path, newline='') as report:
+                rows = list(csv.reader(report))
+
+        self.assertEqual(rows[0], ['reference', 'issue', 'local_status', 'gateway_status', 'detail'])
+        self.assertEqual(
+            sorted((row[0], row[1]) for row in rows[1:]),
+            [
+                ('REF-MISSED', 'amount_mismatch'),
+                ('REF-PAID', 'status_mismatch'),
+                ('REF-UNKNOWN', 'unknown_reference'),
+            ]
+        )
+        # A mismatched amount is reported, not applied
+        self.assertEqual(Transaction.objects.get(reference='REF-MISSED').status, 'pending')
+
+
+class PayoutRunTests(TestCase):
+    def setUp(self):
+        self.stores = []
+        for index, balance in enumerate(['50.00', '120.00', '5.00', '80.00']):
+            owner = User.objects.create_user(email=f'seller{index}@example.com', password='pass', is_seller=True)
+            store = Store.objects.create(owner=owner, name=f'Store {index}', status='approved')
+            SellerBalance.post_entries([SellerLedgerEntry(
+                store=store, entry_type='sale', amount=Decimal(balance)
+            )])
+            SellerPayoutAccount.objects.create(
+                store=store, account_name=f'Seller {index}', account_number=f'00{index}', bank_code='GH001'
+            )
+            self.stores.append(store)
+
+    def test_run_pays_each_payable_store_once(self):
+        run = create_payout_run(Decimal('10.00'))
+        gateway = StubGateway()
+
+        stats = execute_payout_run(run, gateway, concurrency=2)
+
+        self.assertEqual(stats, {'completed': 3, 'processing': 0, 'failed': 0})
+        self.assertEqual(sum(gateway.transfers.values()), Decimal('250.00'))
+        self.assertLessEqual(gateway.max_in_flight, 2)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'completed')
+
+        balance = SellerBalance.objects.get(store=self.stores[1])
+        self.assertEqual(balance.available_balance, Decimal('0.00'))
+        self.assertEqual(balance.total_payouts, Decimal('120.00'))
+        self.assertEqual(balance.pending_payouts, Decimal('0.00'))
+        self.assertEqual(
+            SellerBalance.objects.get(store=self.stores[2]).available_balance, Decimal('5.00')
+        )
+
+        # Balances are reserved, so an immediate second run has nothing to pay
+        self.assertIsNone(create_payout_run(Decimal('10.00')))
+
+    def test_resumed_run_does_not_pay_twice(self):
+        run = create_payout_run(Decimal('10.00'))
+        gateway = StubGateway()
+        payout = run.payouts.get(store=self.stores[0])
+
+        # Simulate a crash after Paystack accepted the transfer but before
+        # the result was recorded
+        gateway.initiate_transfer('RCP_000', payout.amount, 'payout', reference=payout.reference)
+        run.payouts.update(status='processing')
+
+        stats = execute_payout_run(run, gateway, concurrency=4)
+
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(len(gateway.transfers), 3)
+        self.assertEqual(gateway.transfers[payout.reference], Decimal('50.00'))
+
+    def test_failed_transfers_are_retried_then_released(self):
+        run = create_payout_run(Decimal('10.00'))
+        payout = run.payouts.get(store=self.stores[3])
+        gateway = StubGateway(fail_references=[payout.reference])
+
+        execute_payout_run(run, gateway, max_attempts=2)
+        payout.refresh_from_db()
+        self.assertEqual(payout.status, 'processing')
+        self.assertEqual(PayoutRun.objects.get(pk=run.pk).status, 'running')
+
+        stats = execute_payout_run(run, gateway, max_attempts=2)
+        payout.refresh_from_db()
+        self.assertEqual(stats, {'completed': 0, 'processing': 0, 'failed': 1})
+        self.assertEqual(payout.status, 'failed')
+        self.assertEqual(
+            SellerBalance.objects.get(store=self.stores[3]).available_balance, Decimal('80.00')
+        )
+
+    def test_queued_transfers_wait_for_webhook(self):
+        run = create_payout_run(Decimal('10.00'))
+        stats = execute_payout_run(run, StubGateway(transfer_status='pending'))
+
+        self.assertEqual(stats['processing'], 3)
+        self.assertFalse(SellerPayout.objects.exclude(status='processing').exists())
+        self.assertEqual(
+            SellerBalance.objects.get(store=self.stores[0]).pending_payouts, Decimal('50.00')
+        )
+
+    def test_transfer_webhook_completes_payout_and_logs(self):
+        run = create_payout_run(Decimal('10.00'))
+        execute_payout_run(run, StubGateway(transfer_status='pending'))
+        payout = run.payouts.get(store=self.stores[0])
+        payload = json.dumps({'event': 'transfer.success', 'data': {'reference': payout.reference}}).encode()
+        signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), payload, hashlib.sha512).hexdigest()
+
+        with self.assertLogs('orders.views', level='INFO') as logs:
+            response = self.client.post(
+                '/api/orders/payments/webhook/', payload, content_type='application/json',
+                HTTP_X_PAYSTACK_SIGNATURE=signature
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(payout.reference, logs.output[0])
+        payout.refresh_from_db()
+        self.assertEqual(payout.status, 'completed')
+
+    def test_admin_changes_payout_status_through_the_ledger(self):
+        run = create_payout_run(Decimal('10.00'))
+        gateway = StubGateway(transfer_status='pending')
+        execute_payout_run(run, gateway)
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='pass')
+        self.client.force_login(admin_user)
+        payouts = {payout.store_id: payout for payout in run.payouts.all()}
+
+        response = self.client.get(f'/admin/orders/sellerpayout/{payouts[self.stores[0].pk].pk}/change/')
+        self.assertNotContains(response, 'name="status"')
+        self.assertNotContains(response, 'name="amount"')
+
+        # Failing releases the reservation; a closed payout cannot be reopened
+        for action in ('mark_as_failed', 'mark_as_completed'):
+            self.client.post('/admin/orders/sellerpayout/', {
+                'action': action, '_selected_action': [payouts[self.stores[0].pk].pk]
+            })
+        self.assertEqual(SellerPayout.objects.get(pk=payouts[self.stores[0].pk].pk).status, 'failed')
+        balance = SellerBalance.objects.get(store=self.stores[0])
+        self.assertEqual((balance.available_balance, balance.pending_payouts), (Decimal('50.00'), Decimal('0.00')))
+
+        # Transfers Paystack has finished since are settled from the gateway
+        gateway.transfer_status = 'success'
+        with mock.patch('orders.admin.PaystackAPI', lambda: gateway):
+            self.client.post('/admin/orders/sellerpayout/', {
+                'action': 'check_transfers', '_selected_action': [payout.pk for payout in payouts.values()]
+            })
+        self.assertEqual(
+            sorted(SellerPayout.objects.values_list('status', flat=True)), ['completed', 'completed', 'failed']
+        )
+        balance = SellerBalance.objects.get(store=self.stores[1])
+        self.assertEqual((balance.total_payouts, balance.pending_payouts), (Decimal('120.00'), Decimal('0.00')))
+
+
+class SellerLedgerReversalTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.owners = []
+        self.stores = []
+        for index in range(2):
+            owner = User.objects.create_user(email=f'seller{index}@example.com', password='pass', is_seller=True)
+            self.owners.append(owner)
+            self.stores.append(Store.objects.create(owner=owner, name=f'Ledger Store {index}', status='approved'))
+
+        self.order = Order.objects.create(
+            user=self.buyer, subtotal=Decimal('40.00'), total=Decimal('40.00')
+        )
+        for store in self.stores:
+            product = Product.objects.create(
+                store=store, name=f'Kettle {store.pk}', description='-', price=Decimal('20.00'), quantity=5
+            )
+            store_order = StoreOrder.objects.create(
+                order=self.order, store=store, subtotal=Decimal('20.00'),
+                platform_fee=Decimal('1.00'), total=Decimal('20.00')
+            )
+            OrderItem.objects.create(
+                order=self.order, store_order=store_order, product=product, quantity=1
+            )
+        self.order.mark_as_paid('REF-LEDGER')
+
+    def balance(self, store):
+        return SellerBalance.objects.get(store=store).available_balance
+
+    def assert_reconciles(self):
+        out = StringIO()
+        call_command('reconcile_seller_ledger', stdout=out)
+        self.assertIn('All 2 store ledgers reconcile.', out.getvalue())
+
+    def test_seller_cancelling_a_paid_store_order_reverses_the_sale(self):
+        self.assertEqual(self.balance(self.stores[0]), Decimal('19.00'))
+        store_order = StoreOrder.objects.get(store=self.stores[0])
+        client = APIClient()
+        client.force_authenticate(self.owners[0])
+
+        response = client.post(f'/api/orders/seller/orders/{store_order.pk}/update_status/', {'status': 'cancelled'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balance(self.stores[0]), Decimal('0.00'))
+        self.assertEqual(self.balance(self.stores[1]), Decimal('19.00'))
+        entry = SellerLedgerEntry.objects.get(store=self.stores[0], entry_type='refund')
+        self.assertEqual(entry.amount, Decimal('-19.00'))
+        self.assert_reconciles()
+
+    def test_buyer_cancel_reverses_every_store(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        response = client.post(f'/api/orders/{self.order.pk}/cancel/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            set(StoreOrder.objects.values_list('status', flat=True)), {'cancelled'}
+        )
+        for store in self.stores:
+            self.assertEqual(self.balance(store), Decimal('0.00'))
+            self.assertEqual(SellerBalance.objects.get(store=store).total_refunds, Decimal('19.00'))
+        # Nothing is left to pay out
+        self.assertIsNone(create_payout_run(Decimal('1.00')))
+        self.assert_reconciles()
+
+    def test_admin_actions_move_store_orders(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='pass')
+        self.client.force_login(admin_user)
+
+        response = self.client.post('/admin/orders/order/', {
+            'action': 'mark_as_shipped', '_selected_action': [self.order.pk]
+        })
+        self.assertEqual(response.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'shipped')
+        self.assertEqual(
+            set(StoreOrder.objects.values_list('status', flat=True)), {'shipped'}
+        )
+
+        # Status fields can only be changed through the actions
+        response = self.client.get(f'/admin/orders/order/{self.order.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="status"')
+        self.assertNotContains(response, 'name="payment_status"')
+
+    def test_store_order_admin_cancels_through_the_ledger(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='pass')
+        self.client.force_login(admin_user)
+        store_order = StoreOrder.objects.get(store=self.stores[0])
+
+        response = self.client.get(f'/admin/orders/storeorder/{store_order.pk}/change/')
+        self.assertNotContains(response, 'name="status"')
+
+        response = self.client.post('/admin/orders/storeorder/', {
+            'action': 'mark_as_cancelled', '_selected_action': [store_order.pk]
+        })
+        self.assertEqual(response.status_code, 302)
+        store_order.refresh_from_db()
+        self.assertEqual(store_order.status, 'cancelled')
+        self.assertEqual(self.balance(self.stores[0]), Decimal('0.00'))
+        self.assert_reconciles()
+
+    def test_seller_order_list_keeps_order_fields(self):
+        unpaid = Order.objects.create(user=self.buyer, subtotal=Decimal('20.00'), total=Decimal('20.00'))
+        StoreOrder.objects.create(
+            order=unpaid, store=self.stores[0], subtotal=Decimal('20.00'),
+            platform_fee=Decimal('1.00'), total=Decimal('20.00')
+        )
+        client = APIClient()
+        client.force_authenticate(self.owners[0])
+
+        response = client.get('/api/orders/seller/orders/', {'payment_status': 'paid'})
+        self.assertEqual(response.status_code, 200)
+        [row] = response.data['results']
+        self.assertEqual(row['order_id'], self.order.pk)
+        self.assertEqual(row['user'], self.buyer.pk)
+        self.assertEqual(row['payment_status'], 'paid')
+        self.assertEqual(row['payment_reference'], 'REF-LEDGER')
+        self.assertIsNotNone(row['paid_at'])
+        for field in ('tax_amount', 'shipping_cost', 'shipping_address', 'billing_address_display'):
+            self.assertIn(field, row)
+
+        response = client.get('/api/orders/seller/orders/', {'payment_status': 'pending'})
+        self.assertEqual([row['order_id'] for row in response.data['results']], [unpaid.pk])
+
+
+class AnonymousCartTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=owner, name='Cart Store', status='approved')
+        self.pen, self.book = [
+            Product.objects.create(
+                store=self.store, name=name, description='-', price=Decimal('2.50'), quantity=5
+            )
+            for name in ('Pen', 'Book')
+        ]
+        self.client = APIClient()
+
+    def set_cookie_lines(self, lines):
+        signer = signing.get_cookie_signer(salt=settings.ANONYMOUS_CART_COOKIE + anonymous_cart.SALT)
+        self.client.cookies[settings.ANONYMOUS_CART_COOKIE] = signer.sign(json.dumps(lines))
+
+    def add_item(self, product, quantity=1):
+        return self.client.post(
+            '/api/orders/carts/add_item/', {'product_id': product.pk, 'quantity': quantity}, format='json'
+        )
+
+    def cart_lines(self, response):
+        return {item['product']: item['quantity'] for item in response.data['items']}
+
+    def test_cart_lives_in_the_cookie(self):
+        response = self.add_item(self.pen, 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.ANONYMOUS_CART_COOKIE, response.cookies)
+
+        response = self.client.get('/api/orders/carts/my_cart/')
+        self.assertEqual(self.cart_lines(response), {self.pen.pk: 2})
+        self.assertEqual(response.data['subtotal'], '5.00')
+        self.assertFalse(Cart.objects.exists())
+
+    def test_update_and_remove_accept_string_ids(self):
+        self.add_item(self.pen, 1)
+        self.add_item(self.book, 1)
+
+        # Form posts carry every value as a string
+        response = self.client.post(
+            '/api/orders/carts/update_item/', {'product_id': str(self.pen.pk), 'quantity': '3'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/orders/carts/remove_item/', {'product_id': str(self.book.pk)})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/orders/carts/my_cart/')
+        self.assertEqual(self.cart_lines(response), {self.pen.pk: 3})
+
+        response = self.client.post('/api/orders/carts/update_item/', {'product_id': 'pen'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add_item(self.pen, 2)
+        cookie = self.client.cookies[settings.ANONYMOUS_CART_COOKIE]
+        # Raise the quantity but keep the old signature
+        payload, signature = cookie.value.split(':', 1)
+        self.assertEqual(json.loads(payload), [[self.pen.pk, None, 2]])
+        self.client.cookies[settings.ANONYMOUS_CART_COOKIE] = (
+            json.dumps([[self.pen.pk, None, 5]], separators=(',', ':')) + ':' + signature
+        )
+
+        response = self.client.get('/api/orders/carts/my_cart/')
+        self.assertEqual(response.data['items'], [])
+
+        # A validly signed cookie that is not a list of lines is ignored too
+        self.set_cookie_lines({'lines': [[self.pen.pk, None, 1]]})
+        self.assertEqual(self.client.get('/api/orders/carts/my_cart/').data['items'], [])
+
+    @override_settings(ANONYMOUS_CART_MAX_LINES=2)
+    def test_oversized_cookie_is_capped(self):
+        lamp = Product.objects.create(
+            store=self.store, name='Lamp', description='-', price=Decimal('9.00'), quantity=5
+        )
+        self.set_cookie_lines([[product.pk, None, 1] for product in (self.pen, self.book, lamp)])
+        response = self.client.get('/api/orders/carts/my_cart/')
+        self.assertEqual(self.cart_lines(response), {self.pen.pk: 1, self.book.pk: 1})
+
+        # A full cart takes no new lines, but existing lines can still change
+        response = self.add_item(lamp)
+        self.assertEqual(response.status_code, 400)
+        response = self.add_item(self.pen, 3)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_merges_cookie_into_cart(self):
+        buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        cart = Cart.objects.create(user=buyer)
+        CartItem.objects.create(cart=cart, product=self.pen, quantity=4)
+        gone = Product.objects.create(
+            store=self.store, name='Gone', description='-', price=Decimal('1.00'), quantity=5, is_active=False
+        )
+        self.set_cookie_lines([
+            [self.pen.pk, None, 3], [self.book.pk, None, 1], [gone.pk, None, 1]
+        ])
+
+        self.client.force_authenticate(buyer)
+        response = self.client.get('/api/orders/carts/my_cart/')
+        # Quantities add up to the stock available; unavailable lines are dropped
+        self.assertEqual(self.cart_lines(response), {self.pen.pk: 5, self.book.pk: 1})
+        self.assertEqual(response.cookies[settings.ANONYMOUS_CART_COOKIE].value, '')
+
+        # The cookie is gone, so the next request does not merge again
+        response = self.client.get('/api/orders/carts/my_cart/')
+        self.assertEqual(self.cart_lines(response), {self.pen.pk: 5, self.book.pk: 1})
+
+
+class CartValidationTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Cart Store', status='approved')
+        self.pen, self.book = [
+            Product.objects.create(store=store, name=name, description='-', price=Decimal('2.50'), quantity=5)
+            for name in ('Pen', 'Book')
+        ]
+        cart = Cart.objects.create(user=self.buyer)
+        for product in (self.pen, self.book):
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_out_of_stock_line_blocks_checkout(self):
+        Product.objects.filter(pk=self.pen.pk).update(quantity=0)
+        Product.objects.filter(pk=self.book.pk).update(price=Decimal('3.00'))
+
+        response = self.client.get('/api/orders/carts/my_cart/')
+        lines = {item['product']: item for item in response.data['items']}
+        self.assertEqual(lines[self.pen.pk]['issue'], 'out_of_stock')
+        self.assertIsNone(lines[self.book.pk]['issue'])
+        self.assertTrue(lines[self.book.pk]['price_changed'])
+        self.assertTrue(response.data['has_issues'])
+        # Only lines that can be bought count towards the total, at today's price
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('6.00'))
+
+        response = self.client.post(
+            '/api/orders/carts/checkout/', {'payment_method': 'cash_on_delivery'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item['product'] for item in response.data['items']], [self.pen.pk])
+        self.assertFalse(Order.objects.exists())
+
+        # Once the line is gone checkout goes ahead at the new price
+        CartItem.objects.filter(product=self.pen).delete()
+        response = self.client.post(
+            '/api/orders/carts/checkout/', {'payment_method': 'cash_on_delivery'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().total, Decimal('6.00'))
+
+    def test_list_and_detail_include_validated_lines(self):
+        Product.objects.filter(pk=self.pen.pk).update(quantity=0)
+        cart = Cart.objects.get(user=self.buyer)
+        for response in (
+            self.client.get('/api/orders/carts/'),
+            self.client.get(f'/api/orders/carts/{cart.pk}/'),
+        ):
+            self.assertEqual(response.status_code, 200)
+            data = response.data['results'][0] if 'results' in response.data else response.data
+            self.assertEqual(len(data['items']), 2)
+            self.assertEqual(data['item_count'], 4)
+            self.assertEqual(Decimal(data['subtotal']), Decimal('5.00'))
+            self.assertTrue(data['has_issues'])
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Cart Store', status='approved')
+        self.pen, self.book = [
+            Product.objects.create(store=store, name=name, description='-', price=Decimal('2.50'), quantity=5)
+            for name in ('Pen', 'Book')
+        ]
+        self.gone = Product.objects.create(
+            store=store, name='Gone', description='-', price=Decimal('1.00'), quantity=5, is_active=False
+        )
+        self.cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=self.cart, product=self.pen, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def batch(self, *operations):
+        return self.client.post('/api/orders/carts/batch/', {'operations': list(operations)}, format='json')
+
+    def cart_lines(self):
+        return dict(self.cart.items.values_list('product_id', 'quantity'))
+
+    def test_operations_apply_together(self):
+        response = self.batch(
+            {'op': 'add', 'product_id': self.pen.pk, 'quantity': 2},
+            {'op': 'set', 'product_id': self.book.pk, 'quantity': 4},
+            {'op': 'remove', 'product_id': self.gone.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart_lines(), {self.pen.pk: 3, self.book.pk: 4})
+        self.assertEqual(response.data['subtotal'], '17.50')
+
+    def test_partial_failure_changes_nothing(self):
+        response = self.batch(
+            {'op': 'set', 'product_id': self.book.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.pen.pk, 'quantity': 5},
+            {'op': 'remove', 'product_id': self.pen.pk},
+            {'op': 'add', 'product_id': self.gone.pk},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 3])
+        self.assertEqual(response.data['errors'][0]['error'], 'Only 5 items available')
+        # The valid operations were not applied either
+        self.assertEqual(self.cart_lines(), {self.pen.pk: 1})
+
+    def test_unavailable_lines_can_be_taken_out(self):
+        CartItem.objects.create(cart=self.cart, product=self.book, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.gone, quantity=1)
+        Product.objects.filter(pk=self.book.pk).update(quantity=0)
+
+        response = self.batch(
+            {'op': 'set', 'product_id': self.book.pk, 'quantity': 0},
+            {'op': 'remove', 'product_id': self.gone.pk},
+            {'op': 'add', 'product_id': self.gone.pk, 'quantity': 0},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart_lines(), {self.pen.pk: 1})
+
+
+class SweepStaleDataTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Sweep Store', status='approved')
+        self.pen, self.sold_out = [
+            Product.objects.create(store=store, name=name, description='-', price=Decimal('2.50'), quantity=quantity)
+            for name, quantity in (('Pen', 5), ('Sold Out', 0))
+        ]
+        self.users = [
+            User.objects.create_user(email=f'buyer{index}@example.com', password='pass')
+            for index in range(3)
+        ]
+        long_ago = timezone.now() - timedelta(days=60)
+        # Abandoned; old but with a recently touched line; recent
+        self.abandoned, self.touched, self.recent = [Cart.objects.create(user=user) for user in self.users]
+        for cart in (self.abandoned, self.touched, self.recent):
+            CartItem.objects.create(cart=cart, product=self.pen, quantity=1)
+        CartItem.objects.create(cart=self.recent, product=self.sold_out, quantity=1)
+        Cart.objects.filter(pk__in=[self.abandoned.pk, self.touched.pk]).update(updated_at=long_ago)
+        CartItem.objects.filter(cart=self.abandoned).update(updated_at=long_ago)
+
+        for index, expires_at in enumerate((long_ago, timezone.now() + timedelta(days=1))):
+            OutstandingToken.objects.create(
+                user=self.users[0], jti=f'jti-{index}', token='-', expires_at=expires_at
+            )
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command('sweep_stale_data', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_counts(self):
+        output = self.sweep('--dry-run')
+        self.assertIn('Would delete 1 carts untouched for 30 days', output)
+        self.assertIn('Would delete 1 cart items no longer available', output)
+        self.assertIn('Would delete 1 expired outstanding tokens', output)
+        self.assertEqual(Cart.objects.count(), 3)
+        self.assertEqual(CartItem.objects.count(), 4)
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+
+    def test_sweeps_in_batches(self):
+        output = self.sweep('--batch-size', '1')
+        self.assertIn('Deleted 1 carts untouched for 30 days (1 batches', output)
+        self.assertEqual(
+            set(Cart.objects.values_list('pk', flat=True)), {self.touched.pk, self.recent.pk}
+        )
+        self.assertFalse(CartItem.objects.filter(product=self.sold_out).exists())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-1'])
+
+        # A shorter retention reaches the carts touched since
+        self.sweep('--cart-days', '0')
+        self.assertFalse(Cart.objects.exists())
+
+
+class LatePaymentTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.owners = []
+        self.stores = []
+        self.products = []
+        self.order = Order.objects.create(
+            user=self.buyer, subtotal=Decimal('40.00'), total=Decimal('40.00')
+        )
+        for index in range(2):
+            owner = User.objects.create_user(email=f'seller{index}@example.com', password='pass', is_seller=True)
+            store = Store.objects.create(owner=owner, name=f'Late Store {index}', status='approved')
+            product = Product.objects.create(
+                store=store, name=f'Stool {index}', description='-', price=Decimal('20.00'), quantity=5
+            )
+            store_order = StoreOrder.objects.create(
+                order=self.order, store=store, subtotal=Decimal('20.00'),
+                platform_fee=Decimal('1.00'), total=Decimal('20.00')
+            )
+            OrderItem.objects.create(order=self.order, store_order=store_order, product=product, quantity=1)
+            self.owners.append(owner)
+            self.stores.append(store)
+            self.products.append(product)
+        self.client = APIClient()
+
+    def stock(self):
+        return [Product.objects.get(pk=product.pk).quantity for product in self.products]
+
+    def assert_reconciles(self):
+        out = StringIO()
+        call_command('reconcile_seller_ledger', stdout=out)
+        self.assertNotIn('do not reconcile', out.getvalue())
+
+    def test_payment_after_cancellation_is_flagged_for_refund(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.post(f'/api/orders/{self.order.pk}/cancel/').status_code, 200)
+
+        self.order.mark_as_paid('REF-LATE')
+        self.assertEqual(self.order.status, 'cancelled')
+        self.assertEqual(self.order.payment_status, 'refund_due')
+        self.assertEqual(self.stock(), [5, 5])
+        self.assertFalse(SellerLedgerEntry.objects.exists())
+        self.assertTrue(self.order.status_history.filter(note__contains='refund due').exists())
+        self.assertIsNone(create_payout_run(Decimal('1.00')))
+        self.assert_reconciles()
+
+        # A repeated notification changes nothing
+        self.order.mark_as_paid('REF-LATE')
+        self.assertFalse(SellerLedgerEntry.objects.exists())
+
+    def test_payment_after_one_store_cancelled(self):
+        store_order = StoreOrder.objects.get(store=self.stores[0])
+        self.client.force_authenticate(self.owners[0])
+        response = self.client.post(
+            f'/api/orders/seller/orders/{store_order.pk}/update_status/', {'status': 'cancelled'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.order.mark_as_paid('REF-PARTLY')
+        self.assertEqual((self.order.status, self.order.payment_status), ('processing', 'paid'))
+        self.assertEqual(self.stock(), [5, 4])
+        self.assertEqual(SellerBalance.objects.get(store=self.stores[0]).available_balance, Decimal('0.00'))
+        self.assertEqual(SellerBalance.objects.get(store=self.stores[1]).available_balance, Decimal('19.00'))
+        self.assertTrue(self.order.status_history.filter(note__contains='partial refund due').exists())
+        self.assert_reconciles()
+
+
+class OrderQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        address = Address.objects.create(
+            user=self.buyer, street_address='1 Hall Road', city='Accra',
+            state='Greater Accra', postal_code='00233'
+        )
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Budget Store', status='approved')
+        products = []
+        for index in range(3):
+            product = Product.objects.create(
+                store=store, name=f'Product {index}', description='-', price=Decimal('10.00')
+            )
+            ProductImage.objects.create(product=product, image=f'products/{index}.jpg', is_main=True)
+            products.append(product)
+
+        for index in range(5):
+            order = Order.objects.create(
+                user=self.buyer, subtotal=Decimal('30.00'), total=Decimal('30.00'),
+                shipping_address=address, billing_address=address
+            )
+            for product in products:
+                item = OrderItem.objects.create(
+                    order=order, product=product, store=store, product_name=product.name,
+                    price=product.price, quantity=1, subtotal=product.price, total=product.price
+                )
+            # Lines from before snapshots existed fall back to the live image
+            OrderItem.objects.filter(pk=item.pk).update(product_image='')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_order_list_query_count_is_constant(self):
+        # count, orders, items with store/product, main images
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+        for order in response.data['results']:
+            self.assertEqual(len(order['items']), 3)
+            self.assertTrue(all(item['product_image'] for item in order['items']))
+
+    def test_reorder_query_count_is_constant(self):
+        Product.objects.update(quantity=10)
+        small = Order.objects.create(user=self.buyer, subtotal=Decimal('10.00'), total=Decimal('10.00'))
+        product = Product.objects.first()
+        OrderItem.objects.create(
+            order=small, product=product, store=product.store, product_name=product.name,
+            price=product.price, quantity=1, subtotal=product.price, total=product.price
+        )
+        large = Order.objects.filter(items__isnull=False).exclude(pk=small.pk).first()
+
+        for order, lines in ((small, 1), (large, 3)):
+            Cart.objects.filter(user=self.buyer).delete()
+            # order, its lines, products, cart (created), one merge of the cart
+            # items and the cart serializer, whatever the number of lines
+            with self.assertNumQueries(16):
+                response = self.client.post(f'/api/orders/{order.pk}/reorder/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['added'], lines)
+
+    def test_staff_cannot_reorder_another_customers_order(self):
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        order = Order.objects.filter(user=self.buyer).first()
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        response = client.post(f'/api/orders/{order.pk}/reorder/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Cart.objects.filter(user=staff).exists())
+        # Staff still see the order itself
+        self.assertEqual(client.get(f'/api/orders/{order.pk}/').status_code, 200)
+
+    def test_order_line_keeps_image_snapshot(self):
+        item = OrderItem.objects.exclude(product_image='').first()
+        snapshot = item.product_image
+        ProductImage.objects.filter(product=item.product).delete()
+
+        response = self.client.get(f'/api/orders/{item.order_id}/')
+        line = next(line for line in response.data['items'] if line['id'] == item.id)
+        self.assertTrue(line['product_image'].endswith(snapshot))
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=5)
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.other = User.objects.create_user(email='other@example.com', password='pass')
+        for user, count in ((self.buyer, 4), (self.other, 2)):
+            for _ in range(count):
+                Order.objects.create(user=user, subtotal=Decimal('5.00'), total=Decimal('5.00'))
+
+    def count(self, queryset):
+        return EstimatedCountPaginator(queryset.order_by('pk'), 10).count
+
+    def test_small_table_is_counted_exactly(self):
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=100):
+            self.assertEqual(self.count(Order.objects.all()), 6)
+            Order.objects.create(user=self.buyer, subtotal=Decimal('5.00'), total=Decimal('5.00'))
+            self.assertEqual(self.count(Order.objects.all()), 7)
+
+    def test_large_unfiltered_table_uses_the_estimate(self):
+        self.assertEqual(estimated_count(Order.objects.all()), 6)
+        Order.objects.create(user=self.buyer, subtotal=Decimal('5.00'), total=Decimal('5.00'))
+
+        # The cached estimate is served instead of a fresh COUNT(*)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(Order.objects.all()), 6)
+
+    def test_filtered_listing_is_counted_exactly(self):
+        self.assertEqual(self.count(Order.objects.all()), 6)
+        Order.objects.create(user=self.buyer, subtotal=Decimal('5.00'), total=Decimal('5.00'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(Order.objects.filter(user=self.buyer)), 5)
+        self.assertEqual(self.count(Order.objects.filter(user=self.other)), 2)
+
+    def test_admin_changelists_skip_the_full_count(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='pass')
+        self.client.force_login(admin_user)
+        for url in ('/admin/orders/order/', '/admin/products/product/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            self.assertFalse(changelist.show_full_result_count)
+            self.assertIsInstance(changelist.paginator, EstimatedCountPaginator)
+
+        for model, model_admin in django_admin.site._registry.items():
+            if isinstance(model_admin, EstimatedCountAdminMixin):
+                self.assertFalse(model_admin.show_full_result_count, model.__name__)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=self.owner, name='Export Store', status='approved')
+        other_owner = User.objects.create_user(email='other@example.com', password='pass', is_seller=True)
+        other_store = Store.objects.create(owner=other_owner, name='Other Store', status='approved')
+
+        products = [
+            Product.objects.create(store=line_store, name='Notebook', description='-', price=Decimal('5.00'))
+            for line_store in (store, other_store)
+        ]
+
+        self.orders = []
+        created = [
+            datetime(2026, 3, 9, 12, 0, tzinfo=dt_timezone.utc),
+            # 21:00 on the 9th in New York
+            datetime(2026, 3, 10, 2, 0, tzinfo=dt_timezone.utc),
+            datetime(2026, 3, 11, 12, 0, tzinfo=dt_timezone.utc),
+        ]
+        for index, created_at in enumerate(created):
+            order = Order.objects.create(user=self.buyer, subtotal=Decimal('5.00'), total=Decimal('5.00'))
+            for product in products:
+                OrderItem.objects.create(
+                    order=order, product=product, store=product.store, product_name=f'Item {index}',
+                    price=Decimal('5.00'), quantity=1, subtotal=Decimal('5.00'), total=Decimal('5.00')
+                )
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            self.orders.append(order)
+        self.client = APIClient()
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        self.client.force_authenticate(self.buyer)
+        rows = list(csv.reader(StringIO(self.export('/api/orders/export/', type='csv'))))
+        self.assertEqual(rows[0][:2], ['order_number', 'created_at'])
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1][0], self.orders[0].order_number)
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_dates_are_whole_local_days(self):
+        self.client.force_authenticate(self.buyer)
+        lines = self.export('/api/orders/export/', type='jsonl', to='2026-03-09').splitlines()
+        self.assertEqual(
+            {json.loads(line)['order_number'] for line in lines},
+            {self.orders[0].order_number, self.orders[1].order_number}
+        )
+        lines = self.export('/api/orders/export/', type='jsonl', **{'from': '2026-03-10'}).splitlines()
+        self.assertEqual({json.loads(line)['order_number'] for line in lines}, {self.orders[2].order_number})
+
+    def test_seller_export_has_only_their_lines(self):
+        self.client.force_authenticate(self.owner)
+        lines = self.export('/api/orders/seller/orders/export/', type='jsonl').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual({json.loads(line)['store'] for line in lines}, {'Export Store'})
+
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/orders/export/', {'type': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'from': '09/03/2026'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'status': 'lost'}).status_code, 400)
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=owner, name='Archive Store', status='approved')
+        self.product = Product.objects.create(
+            store=self.store, name='Lamp', description='-', price=Decimal('20.00'), quantity=10
+        )
+        old = timezone.now() - timedelta(days=400)
+        self.old_order = self.create_order('delivered', created_at=old)
+        self.old_pending = self.create_order('pending', created_at=old)
+        self.recent_order = self.create_order('delivered')
+
+    def create_order(self, order_status, created_at=None):
+        order = Order.objects.create(
+            user=self.buyer, subtotal=Decimal('20.00'), total=Decimal('20.00'),
+            status=order_status, payment_status='paid', paid_at=timezone.now()
+        )
+        store_order = StoreOrder.objects.create(
+            order=order, store=self.store, status=order_status,
+            subtotal=Decimal('20.00'), platform_fee=Decimal('1.00'), total=Decimal('20.00')
+        )
+        OrderItem.objects.create(
+            order=order, store_order=store_order, product=self.product, store=self.store,
+            product_name=self.product.name, price=self.product.price, quantity=1,
+            subtotal=self.product.price, total=self.product.price
+        )
+        Transaction.objects.create(
+            order=order, amount=order.total, status='completed', reference=f'REF-{order.pk}'
+        )
+        if created_at:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def test_archives_only_finished_orders_past_retention(self):
+        out = StringIO()
+        call_command('archive_orders', '--days', '365', '--batch-size', '1', '--benchmark', stdout=out)
+
+        self.assertIn('Archived 1 orders', out.getvalue())
+        self.assertIn('order list page', out.getvalue())
+        self.assertEqual(
+            set(Order.objects.values_list('pk', flat=True)),
+            {self.old_pending.pk, self.recent_order.pk}
+        )
+        archived = ArchivedOrder.objects.get(pk=self.old_order.pk)
+        self.assertEqual(archived.order_number, self.old_order.order_number)
+        self.assertEqual(archived.items.count(), 1)
+        self.assertEqual(archived.store_orders.get().total, Decimal('20.00'))
+        self.assertEqual(archived.transactions.get().reference, f'REF-{self.old_order.pk}')
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old_order.pk).exists())
+
+    def test_order_detail_falls_back_to_archive(self):
+        call_command('archive_orders', '--days', '365', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+
+        response = client.get(f'/api/orders/{self.old_order.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order_number'], self.old_order.order_number)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertIsNotNone(response.data['archived_at'])
+
+        client.force_authenticate(User.objects.create_user(email='other@example.com', password='pass'))
+        self.assertEqual(client.get(f'/api/orders/{self.old_order.pk}/').status_code, 404)
@@ -1,46 +1,102 @@
-from rest_framework import viewsets, status, permissions, filters
+from rest_framework import viewsets, status, permissions, filters, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from django.db import transaction as db_transaction
-from django.db.models import Sum, Q
+from django.db.models import Prefetch, Sum, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
 from decimal import Decimal
 import json
-from .models import Cart, CartItem, Order, OrderItem, Transaction, SellerPayout
+import logging
+from .models import (
+    Cart, CartItem, Order, OrderItem, StoreOrder, Transaction, SellerPayout,
+    SellerBalance, SellerLedgerEntry, SellerPayoutAccount, OrderStatusHistory, ArchivedOrder,
+    ArchivedOrderItem
+)
 from .serializers import (
-    CartSerializer, CartItemSerializer, OrderSerializer,
-    TransactionSerializer, SellerPayoutSerializer, CheckoutSerializer
+    CartSerializer, CartItemSerializer, OrderSerializer, StoreOrderSerializer,
+    TransactionSerializer, SellerPayoutSerializer, SellerLedgerEntrySerializer,
+    SellerPayoutAccountSerializer, OrderStatusHistorySerializer, ArchivedOrderSerializer,
+    CheckoutSerializer, CartBatchSerializer, CartLineSerializer
 )
-from products.models import Product, ProductVariant
+from .filters import StoreOrderFilter
+from .exports import EXPORT_FORMATS, export_response, filter_export_items
+from . import anonymous_cart
+from products.models import Product, ProductVariant, ProductImage
 from accounts.models import Address
+from stores.models import Store
 from core.permissions import IsSeller, IsOrderOwner
+from core.pagination import EstimatedCountPagination
 from core.paystack import PaystackAPI, process_order_payment, verify_order_payment
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 class CartViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Visitors who are not logged in get a cookie-backed cart for these
+    anonymous_actions = ['my_cart', 'add_item', 'update_item', 'remove_item', 'clear']
+
+    def get_permissions(self):
+        if self.action in self.anonymous_actions:
+            return [permissions.AllowAny()]
+        return super().get_permissions()
 
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
+    def get_cart(self, request):
+        """Get the user's cart, merging in any cart they built before logging in."""
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        lines = anonymous_cart.read_lines(request)
+        if lines:
+            anonymous_cart.merge_into_cart(cart, lines)
+            self.merged_anonymous_cart = True
+        return cart
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'merged_anonymous_cart', False):
+            response.delete_cookie(settings.ANONYMOUS_CART_COOKIE)
+        return response
+
+    def anonymous_item_response(self, request, lines, product_id, variant_id, response_status=status.HTTP_200_OK):
+        items, valid_lines = anonymous_cart.resolve_lines(lines)
+        item = next(
+            (data for data in anonymous_cart.cart_data(request, items)['items']
+             if (data['product'], data['variant']) == (product_id, variant_id)),
+            None
+        )
+        response = Response(item, status=response_status)
+        anonymous_cart.write_lines(request, response, valid_lines)
+        return response
+
     @action(detail=False, methods=['get'])
     def my_cart(self, request):
         """Get or create the current user's cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        if not request.user.is_authenticated:
+            lines = anonymous_cart.read_lines(request)
+            items, valid_lines = anonymous_cart.resolve_lines(lines)
+            response = Response(anonymous_cart.cart_data(request, items))
+            if valid_lines != lines:
+                anonymous_cart.write_lines(request, response, valid_lines)
+            return response
+
+        cart = self.get_cart(request)
+        cart.validate()
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Add an item to the cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        
         product_id = request.data.get('product_id')
         variant_id = request.data.get('variant_id')
         quantity = request.data.get('quantity', 1)
@@ -78,7 +134,23 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
                 {'error': f'Only {available_quantity} items available'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
+        if not request.user.is_authenticated:
+            lines = anonymous_cart.read_lines(request)
+            created = not any(line[:2] == (product.id, variant and variant.id) for line in lines)
+            lines = anonymous_cart.set_line(lines, product.id, variant and variant.id, int(quantity))
+            if len(lines) > settings.ANONYMOUS_CART_MAX_LINES:
+                return Response(
+                    {'error': 'Cart is full, log in to add more items'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return self.anonymous_item_response(
+                request, lines, product.id, variant and variant.id,
+                status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
+
+        cart = self.get_cart(request)
+
         # Create or update cart item
         cart_item, created = CartItem.objects.get_or_create(
             cart=cart,
@@ -99,6 +171,29 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
         """Update cart item quantity"""
         cart_item_id = request.data.get('cart_item_id')
         quantity = request.data.get('quantity', 1)
+
+        if not request.user.is_authenticated:
+            # Anonymous cart lines are identified by product and variant
+            serializer = CartLineSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            key = (serializer.validated_data['product_id'], serializer.validated_data['variant_id'])
+            quantity = serializer.validated_data['quantity']
+            lines = anonymous_cart.read_lines(request)
+            if not any(line[:2] == key for line in lines):
+                return Response(
+                    {'error': 'Cart item not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            items, _ = anonymous_cart.resolve_lines([(*key, quantity)])
+            available_quantity = items[0]['available'] if items else 0
+            if quantity > available_quantity:
+                return Response(
+                    {'error': f'Only {available_quantity} items available'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            lines = anonymous_cart.set_line(lines, *key, quantity)
+            return self.anonymous_item_response(request, lines, *key)
         
         try:
             cart_item = CartItem.objects.get(id=cart_item_id, cart__user=request.user)
@@ -126,6 +221,21 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
     def remove_item(self, request):
         """Remove an item from the cart"""
         cart_item_id = request.data.get('cart_item_id')
+
+        if not request.user.is_authenticated:
+            serializer = CartLineSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            key = (serializer.validated_data['product_id'], serializer.validated_data['variant_id'])
+            lines = anonymous_cart.read_lines(request)
+            if not any(line[:2] == key for line in lines):
+                return Response(
+                    {'error': 'Cart item not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            response = Response({'status': 'Item removed from cart'})
+            anonymous_cart.write_lines(request, response, anonymous_cart.set_line(lines, *key, 0))
+            return response
         
         try:
             cart_item = CartItem.objects.get(id=cart_item_id, cart__user=request.user)
@@ -140,14 +250,99 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def clear(self, request):
         """Clear all items from the cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        if not request.user.is_authenticated:
+            response = Response({'status': 'Cart cleared'})
+            anonymous_cart.write_lines(request, response, [])
+            return response
+
+        cart = self.get_cart(request)
         cart.items.all().delete()
         return Response({'status': 'Cart cleared'})
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of add/set/remove operations to the cart atomically"""
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data['operations']
+
+        # Resolve every product and variant in one query. Removals and zero
+        # quantities take lines out, so they work for unavailable products too.
+        keys = {
+            (op['product_id'], op['variant_id'])
+            for op in operations if op['op'] != 'remove' and op['quantity']
+        }
+        items, _ = anonymous_cart.resolve_lines([(*key, 1) for key in keys])
+        catalogue = {(item['product'], item['variant']): item for item in items}
+
+        with db_transaction.atomic():
+            cart = self.get_cart(request)
+            existing = {
+                (item.product_id, item.variant_id): item
+                for item in cart.items.select_for_update()
+            }
+            quantities = {key: item.quantity for key, item in existing.items()}
+
+            errors = []
+            for index, op in enumerate(operations):
+                key = (op['product_id'], op['variant_id'])
+                if op['op'] == 'remove' or (op['op'] == 'set' and not op['quantity']):
+                    # Removing a line that is not in the cart is a no-op
+                    quantities.pop(key, None)
+                    continue
+                if not op['quantity']:
+                    # Adding nothing leaves the line as it is
+                    continue
+                if key not in catalogue:
+                    errors.append({'index': index, 'error': 'Product or variant is not available'})
+                    continue
+                if op['op'] == 'add':
+                    quantity = quantities.get(key, 0) + op['quantity']
+                else:
+                    quantity = op['quantity']
+                if quantity > catalogue[key]['available']:
+                    errors.append({
+                        'index': index,
+                        'error': f"Only {catalogue[key]['available']} items available"
+                    })
+                    continue
+                quantities[key] = quantity
+
+            if errors:
+                return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            now = timezone.now()
+            to_create = []
+            to_update = []
+            for key, quantity in quantities.items():
+                item = existing.get(key)
+                if item is None:
+                    to_create.append(CartItem(
+                        cart=cart,
+                        product_id=key[0],
+                        variant_id=key[1],
+                        quantity=quantity,
+                        price=catalogue[key]['price']
+                    ))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    item.updated_at = now
+                    to_update.append(item)
+            removed = [item.pk for key, item in existing.items() if key not in quantities]
+
+            CartItem.objects.filter(pk__in=removed).delete()
+            CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+            # bulk_create skips CartItem.save, so the price is set explicitly above
+            CartItem.objects.bulk_create(to_create)
+
+            cart.validate()
+        return Response(self.get_serializer(cart).data)
+
     @action(detail=False, methods=['post'])
     def checkout(self, request):
         """Process checkout and create an order"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        cart = self.get_cart(request)
         
         if cart.items.count() == 0:
             return Response(
@@ -188,11 +383,30 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
                 )
         
         with db_transaction.atomic():
+            # Reprices every line; lines that cannot be bought block checkout
+            issues = cart.validate()
+            if issues:
+                return Response({
+                    'error': 'Some items in your cart are no longer available',
+                    'items': CartItemSerializer(issues, many=True, context={'request': request}).data
+                }, status=status.HTTP_400_BAD_REQUEST)
+            cart_items = cart.lines
+
+            # Split the cart into one fulfillment per store
+            store_subtotals = {}
+            for item in cart_items:
+                store_id = item.product.store_id
+                store_subtotals[store_id] = store_subtotals.get(store_id, Decimal('0.00')) + item.total_price
+            store_fees = {
+                store_id: StoreOrder.calculate_platform_fee(store_subtotal)
+                for store_id, store_subtotal in store_subtotals.items()
+            }
+
             # Calculate totals
-            subtotal = cart.subtotal
+            subtotal = sum(store_subtotals.values(), Decimal('0.00'))
             tax_amount = Decimal('0.00')  # Implement tax calculation
             shipping_cost = Decimal('0.00')  # Implement shipping calculation
-            platform_fee = subtotal * Decimal(str(0.05))  # 5% platform fee
+            platform_fee = sum(store_fees.values(), Decimal('0.00'))
             total = subtotal + tax_amount + shipping_cost
             
             # Create order
@@ -210,20 +424,37 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
                 ip_address=request.META.get('REMOTE_ADDR')
             )
             
+            store_orders = {
+                store_order.store_id: store_order
+                for store_order in StoreOrder.objects.bulk_create([
+                    StoreOrder(
+                        order=order,
+                        store_id=store_id,
+                        subtotal=store_subtotal,
+                        platform_fee=store_fees[store_id],
+                        total=store_subtotal,
+                        created_at=order.created_at
+                    )
+                    for store_id, store_subtotal in store_subtotals.items()
+                ])
+            }
+            
             # Create order items
-            for item in cart.items.all():
+            for item in cart_items:
                 OrderItem.objects.create(
                     order=order,
                     product=item.product,
                     variant=item.variant,
-                    store=item.product.store,
+                    store_id=item.product.store_id,
+                    store_order=store_orders[item.product.store_id],
                     product_name=item.product.name,
                     variant_name=str(item.variant) if item.variant else '',
                     price=item.price,
                     quantity=item.quantity,
                     subtotal=item.total_price,
                     tax_amount=Decimal('0.00'),
-                    total=item.total_price
+                    total=item.total_price,
+                    product_image=OrderItem.product_image_url(item.product)
                 )
             
             # Create transaction
@@ -276,6 +507,7 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EstimatedCountPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status', 'payment_method']
     ordering_fields = ['created_at', 'total']
@@ -283,44 +515,138 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(user=user)
+        if self.action in ['cancel', 'timeline', 'reorder']:
+            queryset = Order.objects.all()
+        else:
+            queryset = Order.objects.with_details()
+        # Reordering fills the caller's own cart, so staff only reorder their own orders
+        if user.is_staff and self.action != 'reorder':
+            return queryset
+        return queryset.filter(user=user)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pass
+
+        # Finished orders past the retention window live in the archive
+        queryset = ArchivedOrder.objects.select_related(
+            'user', 'shipping_address', 'billing_address'
+        ).prefetch_related(
+            Prefetch('items', queryset=ArchivedOrderItem.objects.select_related(
+                'store', 'product'
+            ).prefetch_related(
+                Prefetch(
+                    'product__images',
+                    queryset=ProductImage.objects.filter(is_main=True),
+                    to_attr='main_images'
+                )
+            ))
+        )
+        if not request.user.is_staff:
+            queryset = queryset.filter(user=request.user)
+        order = generics.get_object_or_404(queryset, pk=kwargs[self.lookup_field])
+        serializer = ArchivedOrderSerializer(order, context=self.get_serializer_context())
+        return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel an order"""
         order = self.get_object()
-        
-        if order.status not in ['pending', 'processing']:
+
+        # Cancels the store orders too, reversing the sale in the ledger of
+        # stores that were already paid
+        if not order.transition_to('cancelled', changed_by=request.user, note='Cancelled by customer'):
             return Response(
                 {'error': 'Cannot cancel an order that is already shipped or delivered'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        order.status = 'cancelled'
-        order.save(update_fields=['status'])
         return Response({'status': 'Order cancelled'})
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream order lines as CSV or JSONL (?type=csv|jsonl&from=&to=&status=)"""
+        items = OrderItem.objects.all()
+        if not request.user.is_staff:
+            items = items.filter(order__user=request.user)
+        return _export_order_items(request, items, 'orders')
+
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, pk=None):
+        """Add the items of a past order to the cart at today's prices"""
+        order = self.get_object()
+
+        requested = {}
+        names = {}
+        for product_id, variant_id, quantity, product_name, variant_name in order.items.values_list(
+            'product_id', 'variant_id', 'quantity', 'product_name', 'variant_name'
+        ):
+            key = (product_id, variant_id)
+            requested[key] = requested.get(key, 0) + quantity
+            names[key] = {'product_name': product_name, 'variant_name': variant_name}
+
+        rejected = {}
+        items, _ = anonymous_cart.resolve_lines(
+            [(*key, quantity) for key, quantity in requested.items()], rejected
+        )
+        skipped = [{**names[key], 'reason': reason} for key, reason in rejected.items()]
+        for item in items:
+            wanted = requested[(item['product'], item['variant'])]
+            if item['quantity'] < wanted:
+                skipped.append({
+                    **names[(item['product'], item['variant'])],
+                    'reason': f"Only {item['quantity']} of {wanted} available"
+                })
+
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        with db_transaction.atomic():
+            anonymous_cart.merge_items(cart, items)
+            cart.validate()
+        return Response({
+            'cart': CartSerializer(cart, context={'request': request}).data,
+            'added': len(items),
+            'skipped': skipped,
+        })
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Status changes of an order, oldest first"""
+        order = self.get_object()
+        # Served by the (order, created_at) index
+        history = (
+            OrderStatusHistory.objects.filter(order_id=order.pk)
+            .select_related('created_by')
+            .order_by('created_at')
+        )
+        serializer = OrderStatusHistorySerializer(history, many=True)
+        return Response(serializer.data)
+
 
 class SellerOrderViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for sellers to manage their store's orders"""
-    serializer_class = OrderSerializer
+    """ViewSet for sellers to manage their store's part of each order"""
+    serializer_class = StoreOrderSerializer
     permission_classes = [permissions.IsAuthenticated, IsSeller]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['status', 'payment_status']
+    filterset_class = StoreOrderFilter
     ordering_fields = ['created_at', 'total']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Order.objects.filter(
-            items__store__owner=self.request.user
-        ).distinct()
+        store = Store.objects.filter(owner=self.request.user).first()
+        if store is None:
+            return StoreOrder.objects.none()
+        # Filtering on the store id directly uses the (store, -created_at) index
+        return StoreOrder.objects.filter(store_id=store.id).select_related(
+            'order', 'order__user', 'order__shipping_address'
+        ).prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.with_details())
+        )
 
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
-        """Update order status"""
-        order = self.get_object()
+        """Update the fulfillment status of this store's part of the order"""
+        store_order = self.get_object()
         new_status = request.data.get('status')
         
         if new_status not in dict(Order.STATUS_CHOICES):
@@ -329,18 +655,43 @@ class SellerOrderViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order.status = new_status
-        if new_status == 'delivered':
-            from django.utils import timezone
-            order.delivered_at = timezone.now()
-        
-        order.save()
+        if not store_order.update_status(new_status, changed_by=request.user):
+            return Response(
+                {'error': f"Cannot change status from {store_order.status} to {new_status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response({'status': 'Order status updated'})
 
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream this store's order lines as CSV or JSONL"""
+        store = Store.objects.filter(owner=request.user).first()
+        if store is None:
+            return Response({'error': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
+        items = OrderItem.objects.filter(store_id=store.id)
+        return _export_order_items(request, items, 'store-orders', status_lookup='store_order__status')
+
+
+def _export_order_items(request, items, filename, status_lookup='order__status'):
+    # ``format`` is reserved by DRF for content negotiation
+    export_format = request.query_params.get('type', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Unsupported export type, choose one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        items = filter_export_items(items, request.query_params, status_lookup)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return export_response(items, export_format, filename)
+
+
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EstimatedCountPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -363,48 +714,60 @@ class SellerPayoutViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def balance(self, request):
         """Get seller's balance and earnings"""
-        try:
-            store = request.user.store
-        except:
+        balance = SellerBalance.objects.filter(store__owner=request.user).first()
+        if balance is None:
+            if not Store.objects.filter(owner=request.user).exists():
+                return Response(
+                    {'error': 'You do not have a store'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            # No ledger activity yet
+            balance = SellerBalance()
+        
+        return Response({
+            'total_sales': balance.total_sales,
+            'platform_fees': balance.platform_fees,
+            'total_refunds': balance.total_refunds,
+            'total_payouts': balance.total_payouts,
+            'pending_payouts': balance.pending_payouts,
+            'available_balance': max(balance.available_balance, Decimal('0.00')),
+        })
+
+    @action(detail=False, methods=['get', 'put', 'patch'])
+    def account(self, request):
+        """Get or update where the seller's payouts are sent"""
+        store = Store.objects.filter(owner=request.user).first()
+        if store is None:
             return Response(
                 {'error': 'You do not have a store'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Calculate earnings from paid orders
-        total_sales = OrderItem.objects.filter(
-            store=store,
-            order__payment_status='paid'
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        
-        # Calculate platform fees
-        platform_fees = OrderItem.objects.filter(
-            store=store,
-            order__payment_status='paid'
-        ).aggregate(total=Sum('order__platform_fee'))['total'] or Decimal('0.00')
-        
-        # Calculate total payouts
-        total_payouts = SellerPayout.objects.filter(
-            store=store,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Calculate pending payouts
-        pending_payouts = SellerPayout.objects.filter(
-            store=store,
-            status__in=['pending', 'processing']
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Available balance
-        available_balance = total_sales - platform_fees - total_payouts - pending_payouts
+        account = SellerPayoutAccount.objects.filter(store=store).first()
+        if request.method == 'GET':
+            if account is None:
+                return Response(
+                    {'error': 'No payout account set up'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(SellerPayoutAccountSerializer(account).data)
         
-        return Response({
-            'total_sales': total_sales,
-            'platform_fees': platform_fees,
-            'total_payouts': total_payouts,
-            'pending_payouts': pending_payouts,
-            'available_balance': max(available_balance, Decimal('0.00')),
-        })
+        serializer = SellerPayoutAccountSerializer(
+            account,
+            data=request.data,
+            partial=request.method == 'PATCH'
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(store=store)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def ledger(self, request):
+        """List the ledger entries behind the seller's balance"""
+        entries = SellerLedgerEntry.objects.filter(store__owner=request.user)
+        page = self.paginate_queryset(entries)
+        serializer = SellerLedgerEntrySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 # =================== PAYSTACK PAYMENT ENDPOINTS ===================
@@ -462,10 +825,11 @@ def verify_payment(request, reference):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
+            serializer_class = ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer
             return Response({
                 'success': True,
                 'message': verification_result['message'],
-                'order': OrderSerializer(order, context={'request': request}).data
+                'order': serializer_class(order, context={'request': request}).data
             })
         else:
             return Response(
@@ -511,24 +875,30 @@ def paystack_webhook(request):
             verification_result = verify_order_payment(reference)
             
             if verification_result['success']:
-                print(f"Webhook: Payment verified for reference {reference}")
+                logger.info("Webhook: payment verified for reference %s", reference)
             else:
-                print(f"Webhook: Payment verification failed for reference {reference}")
+                logger.warning("Webhook: payment verification failed for reference %s", reference)
         
         elif event_type == 'transfer.success':
             # Handle successful payout
             data = event_data['data']
-            print(f"Webhook: Payout completed - {data.get('reference')}")
+            payout = SellerPayout.objects.filter(reference=data.get('reference')).first()
+            if payout:
+                payout.mark_as_completed(payment_details={'gateway_response': data})
+            logger.info("Webhook: payout completed - %s", data.get('reference'))
         
-        elif event_type == 'transfer.failed':
+        elif event_type in ('transfer.failed', 'transfer.reversed'):
             # Handle failed payout
             data = event_data['data']
-            print(f"Webhook: Payout failed - {data.get('reference')}")
+            payout = SellerPayout.objects.filter(reference=data.get('reference')).first()
+            if payout:
+                payout.mark_as_failed(reason=data.get('reason') or event_type)
+            logger.warning("Webhook: payout failed - %s", data.get('reference'))
         
         return HttpResponse('OK', status=200)
         
     except Exception as e:
-        print(f"Webhook error: {str(e)}")
+        logger.exception("Webhook error: %s", e)
         return HttpResponse('Error processing webhook', status=500)
 
 
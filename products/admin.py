@@ -1,4 +1,6 @@
 from django.contrib import admin
+from core.pagination import EstimatedCountAdminMixin
+from stores.models import Category, Store
 from .models import (
     Product, ProductVariant, ProductImage, Review, 
     ProductAttribute, ProductAttributeValue, ProductVariantOption
@@ -18,7 +20,7 @@ class ProductVariantInline(admin.TabularInline):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'store', 'category', 'price', 'quantity', 'condition', 'is_active', 'is_featured', 'created_at']
     list_filter = ['is_active', 'is_featured', 'condition', 'category', 'store', 'created_at']
     search_fields = ['name', 'description', 'sku', 'store__name', 'category__name']
@@ -31,22 +33,32 @@ class ProductAdmin(admin.ModelAdmin):
     actions = ['make_active', 'make_inactive', 'make_featured', 'remove_featured']
     
     def make_active(self, request, queryset):
+        store_ids = set(queryset.values_list('store_id', flat=True))
         queryset.update(is_active=True)
+        Store.bump_page_version(*store_ids)
+        Category.invalidate_cache()
         self.message_user(request, f'{queryset.count()} products were successfully marked as active.')
     make_active.short_description = "Mark selected products as active"
     
     def make_inactive(self, request, queryset):
+        store_ids = set(queryset.values_list('store_id', flat=True))
         queryset.update(is_active=False)
+        Store.bump_page_version(*store_ids)
+        Category.invalidate_cache()
         self.message_user(request, f'{queryset.count()} products were successfully marked as inactive.')
     make_inactive.short_description = "Mark selected products as inactive"
     
     def make_featured(self, request, queryset):
+        store_ids = set(queryset.values_list('store_id', flat=True))
         queryset.update(is_featured=True)
+        Store.bump_page_version(*store_ids)
         self.message_user(request, f'{queryset.count()} products were successfully marked as featured.')
     make_featured.short_description = "Mark selected products as featured"
     
     def remove_featured(self, request, queryset):
+        store_ids = set(queryset.values_list('store_id', flat=True))
         queryset.update(is_featured=False)
+        Store.bump_page_version(*store_ids)
         self.message_user(request, f'{queryset.count()} products were successfully removed from featured.')
     remove_featured.short_description = "Remove selected products from featured"
     
@@ -106,11 +118,13 @@ class ReviewAdmin(admin.ModelAdmin):
     actions = ['approve_reviews', 'unapprove_reviews']
     
     def approve_reviews(self, request, queryset):
-        queryset.update(is_approved=True)
+        updated = Review.set_approved(queryset, True)
+        self.message_user(request, f"{updated} review(s) approved.")
     approve_reviews.short_description = "Approve selected reviews"
     
     def unapprove_reviews(self, request, queryset):
-        queryset.update(is_approved=False)
+        updated = Review.set_approved(queryset, False)
+        self.message_user(request, f"{updated} review(s) unapproved.")
     unapprove_reviews.short_description = "Unapprove selected reviews"
 
 
@@ -0,0 +1,21 @@
+import django_filters
+
+from stores.models import Category
+from .models import Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    category = django_filters.NumberFilter(
+        method='filter_category',
+        help_text='Products in this category or any category below it'
+    )
+
+    class Meta:
+        model = Product
+        fields = ['store', 'category', 'is_active', 'is_featured', 'condition']
+
+    def filter_category(self, queryset, name, value):
+        path = Category.objects.filter(pk=value).values_list('path', flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
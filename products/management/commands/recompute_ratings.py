@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Count, Q, Sum
+
+from products.models import Product, Review
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute product and store rating totals from approved reviews and '
+        'repair any that have drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted totals without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with db_transaction.atomic():
+            # One grouped query gives the true totals for every product and store
+            grouped = (
+                Review.objects.filter(is_approved=True)
+                .values('product_id', 'product__store_id')
+                .annotate(total=Sum('rating'), count=Count('id'))
+                .order_by()
+            )
+            product_totals = {}
+            store_totals = defaultdict(lambda: [0, 0])
+            for row in grouped:
+                product_totals[row['product_id']] = (row['total'], row['count'])
+                store_total = store_totals[row['product__store_id']]
+                store_total[0] += row['total']
+                store_total[1] += row['count']
+
+            products = []
+            for product in Product.objects.select_for_update().filter(
+                Q(pk__in=product_totals) | Q(rating_count__gt=0) | Q(rating_sum__gt=0)
+            ).only('pk', 'rating_sum', 'rating_count'):
+                total, count = product_totals.get(product.pk, (0, 0))
+                if (product.rating_sum, product.rating_count) != (total, count):
+                    product.rating_sum, product.rating_count = total, count
+                    products.append(product)
+
+            stores = []
+            for store in Store.objects.select_for_update().filter(
+                Q(pk__in=store_totals) | Q(total_ratings__gt=0) | Q(rating_sum__gt=0)
+            ).only('pk', 'rating', 'rating_sum', 'total_ratings'):
+                total, count = store_totals.get(store.pk, (0, 0))
+                rating = total / count if count else 0.0
+                if (
+                    (store.rating_sum, store.total_ratings) != (total, count)
+                    or abs(store.rating - rating) > 1e-9
+                ):
+                    store.rating_sum, store.total_ratings, store.rating = total, count, rating
+                    stores.append(store)
+
+            if not dry_run:
+                Product.objects.bulk_update(products, ['rating_sum', 'rating_count'], batch_size=500)
+                Store.objects.bulk_update(stores, ['rating', 'rating_sum', 'total_ratings'], batch_size=500)
+
+        verb = 'Would repair' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} ratings for {len(products)} product(s) and {len(stores)} store(s).'
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:04
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    """Seed product and store running totals from approved reviews."""
+    Review = apps.get_model('products', 'Review')
+    Product = apps.get_model('products', 'Product')
+    Store = apps.get_model('stores', 'Store')
+
+    grouped = (
+        Review.objects.filter(is_approved=True)
+        .values('product_id', 'product__store_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+        .order_by()
+    )
+    store_totals = defaultdict(lambda: [0, 0])
+    for row in grouped:
+        Product.objects.filter(pk=row['product_id']).update(
+            rating_sum=row['total'], rating_count=row['count']
+        )
+        store_total = store_totals[row['product__store_id']]
+        store_total[0] += row['total']
+        store_total[1] += row['count']
+
+    Store.objects.update(rating=0.0, rating_sum=0, total_ratings=0)
+    for store_id, (total, count) in store_totals.items():
+        Store.objects.filter(pk=store_id).update(
+            rating=total / count, rating_sum=total, total_ratings=count
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('stores', '0003_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='rating count'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='rating sum'),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:27
+
+from django.db import migrations, models
+import uploads.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=uploads.storage.content_addressed_storage, upload_to='products/', verbose_name='image'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:13
+
+import os
+import shutil
+
+import core.downloads
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _move_digital_files(apps, source_root, target_root):
+    Product = apps.get_model('products', 'Product')
+    names = (
+        Product.objects.exclude(digital_file='')
+        .exclude(digital_file__isnull=True)
+        .values_list('digital_file', flat=True)
+    )
+    for name in names:
+        source = os.path.join(source_root, name)
+        if not os.path.exists(source):
+            continue
+        target = os.path.join(target_root, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+
+
+def move_to_protected_storage(apps, schema_editor):
+    """Move existing digital files out of the publicly served MEDIA_ROOT."""
+    _move_digital_files(apps, settings.MEDIA_ROOT, settings.PROTECTED_MEDIA_ROOT)
+
+
+def move_to_media_storage(apps, schema_editor):
+    _move_digital_files(apps, settings.PROTECTED_MEDIA_ROOT, settings.MEDIA_ROOT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='digital_file',
+            field=models.FileField(blank=True, help_text='For digital products only', null=True, storage=core.downloads.protected_storage, upload_to='digital_products/'),
+        ),
+        migrations.RunPython(move_to_protected_storage, move_to_media_storage),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models import Count, Exists, ExpressionWrapper, F, OuterRef, Sum
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
@@ -6,6 +8,9 @@ from django.utils.text import slugify
 from decimal import Decimal
 import uuid
 
+from core.downloads import protected_storage
+from uploads.storage import content_addressed_storage
+
 
 class Product(models.Model):
     """Product model for items being sold in the marketplace."""
@@ -91,11 +96,15 @@ class Product(models.Model):
     is_digital = models.BooleanField(_('digital product'), default=False)
     digital_file = models.FileField(
         upload_to='digital_products/',
+        storage=protected_storage,
         null=True,
         blank=True,
         help_text=_('For digital products only')
     )
     view_count = models.PositiveIntegerField(_('view count'), default=0)
+    # Running totals over approved reviews, maintained by Review
+    rating_sum = models.PositiveIntegerField(_('rating sum'), default=0, editable=False)
+    rating_count = models.PositiveIntegerField(_('rating count'), default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -112,6 +121,37 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def visible_q(prefix=''):
+        """
+        Q for products shoppers can see: active, in an approved store whose
+        owner is active. ``prefix`` is the lookup path to the product.
+        """
+        return models.Q(**{
+            f'{prefix}is_active': True,
+            f'{prefix}store__status': 'approved',
+            f'{prefix}store__owner__is_active': True,
+        })
+
+    @staticmethod
+    def purchased_by(user):
+        """
+        Boolean expression that is true for products in a paid order of
+        ``user`` that was not cancelled or refunded, whether the order is live
+        or has been moved to the archive. Each side uses its order item
+        (product, order) index.
+        """
+        from orders.models import ArchivedOrderItem, OrderItem
+
+        purchased = models.Q()
+        for item_model in (OrderItem, ArchivedOrderItem):
+            purchased |= Exists(
+                item_model.objects.filter(
+                    product=OuterRef('pk'), order__user=user, order__payment_status='paid'
+                ).exclude(order__status__in=('cancelled', 'refunded'))
+            )
+        return ExpressionWrapper(purchased, output_field=models.BooleanField())
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
@@ -128,19 +168,22 @@ class Product(models.Model):
     @property
     def main_image(self):
         """Get the main product image or None."""
+        # Populated by Prefetch('images', ..., to_attr='main_images')
+        if hasattr(self, 'main_images'):
+            return self.main_images[0] if self.main_images else None
         return self.images.filter(is_main=True).first()
 
     @property
     def rating(self):
-        """Calculate average rating from reviews."""
-        return self.reviews.aggregate(
-            avg_rating=models.Avg('rating')
-        )['avg_rating'] or 0.0
+        """Average rating of approved reviews."""
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
 
     @property
     def review_count(self):
-        """Get total number of reviews."""
-        return self.reviews.count()
+        """Number of approved reviews."""
+        return self.rating_count
 
     def increment_view_count(self):
         """Increment the view count."""
@@ -215,7 +258,8 @@ class ProductImage(models.Model):
     )
     image = models.ImageField(
         _('image'),
-        upload_to='products/'
+        upload_to='products/',
+        storage=content_addressed_storage
     )
     alt_text = models.CharField(
         _('alt text'),
@@ -279,10 +323,87 @@ class Review(models.Model):
     def __str__(self):
         return f"Review by {self.user} for {self.product}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What this review contributed to the rating totals when loaded
+        instance._counted_rating = instance.counted_rating()
+        return instance
+
+    def counted_rating(self):
+        """``(product_id, rating)`` if this review counts towards ratings, else None."""
+        if self.is_approved:
+            return (self.product_id, self.rating)
+        return None
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update product's store rating when a new review is saved
-        self.product.store.update_rating()
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            old = getattr(self, '_counted_rating', None)
+            new = self.counted_rating()
+            if old != new:
+                changes = []
+                if old:
+                    changes.append((old[0], -old[1], -1))
+                if new:
+                    changes.append((new[0], new[1], 1))
+                Review.apply_rating_changes(changes)
+        self._counted_rating = new
+
+    @classmethod
+    def set_approved(cls, queryset, approved):
+        """Approve or unapprove reviews in bulk, keeping ratings in step."""
+        with db_transaction.atomic():
+            ids = list(
+                queryset.filter(is_approved=not approved)
+                .select_for_update()
+                .values_list('pk', flat=True)
+            )
+            grouped = (
+                cls.objects.filter(pk__in=ids)
+                .values('product_id')
+                .annotate(total=Sum('rating'), count=Count('id'))
+                .order_by()
+            )
+            sign = 1 if approved else -1
+            changes = [
+                (row['product_id'], sign * row['total'], sign * row['count'])
+                for row in grouped
+            ]
+            updated = cls.objects.filter(pk__in=ids).update(
+                is_approved=approved,
+                updated_at=timezone.now()
+            )
+            cls.apply_rating_changes(changes)
+        return updated
+
+    @staticmethod
+    def apply_rating_changes(changes):
+        """
+        Apply ``(product_id, rating_delta, count_delta)`` changes to the product
+        and store running totals with atomic F() updates.
+        """
+        from stores.models import Store
+
+        changes = [change for change in changes if change[1] or change[2]]
+        if not changes:
+            return
+        store_ids = dict(
+            Product.objects.filter(pk__in={change[0] for change in changes})
+            .values_list('pk', 'store_id')
+        )
+        store_changes = {}
+        for product_id, rating_delta, count_delta in changes:
+            Product.objects.filter(pk=product_id).update(
+                rating_sum=F('rating_sum') + rating_delta,
+                rating_count=F('rating_count') + count_delta
+            )
+            if product_id in store_ids:
+                totals = store_changes.setdefault(store_ids[product_id], [0, 0])
+                totals[0] += rating_delta
+                totals[1] += count_delta
+        for store_id, (rating_delta, count_delta) in store_changes.items():
+            Store.apply_rating_change(store_id, rating_delta, count_delta)
 
 
 class ProductAttribute(models.Model):
@@ -1,15 +1,43 @@
+from django.db import transaction as db_transaction
 from rest_framework import serializers
+from uploads.models import ChunkedUpload
 from .models import (
     Product, ProductVariant, ProductImage, Review,
     ProductAttribute, ProductAttributeValue, ProductVariantOption
 )
 
 
+def claim_upload(upload_id, user, purpose):
+    """Attach a completed chunked upload, reporting a bad id as a validation error"""
+    try:
+        return ChunkedUpload.claim(upload_id, user, purpose)
+    except ValueError as e:
+        raise serializers.ValidationError({'upload_id': str(e)})
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
+    # A completed chunked upload can be given instead of the image itself
+    upload_id = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_main', 'position', 'created_at']
+        fields = ['id', 'image', 'upload_id', 'alt_text', 'is_main', 'position', 'created_at']
         read_only_fields = ['created_at']
+        extra_kwargs = {'image': {'required': False}}
+
+    def validate(self, data):
+        if self.instance is None and bool(data.get('image')) == bool(data.get('upload_id')):
+            raise serializers.ValidationError('Provide either an image or an upload_id')
+        return data
+
+    def create(self, validated_data):
+        upload_id = validated_data.pop('upload_id', None)
+        with db_transaction.atomic():
+            if upload_id:
+                validated_data['image'] = claim_upload(
+                    upload_id, self.context['request'].user, 'product_image'
+                )
+            return super().create(validated_data)
 
 
 class ProductVariantOptionSerializer(serializers.ModelSerializer):
@@ -101,6 +129,12 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
+    # Or completed chunked uploads, for images too large for one request
+    upload_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        write_only=True,
+        required=False
+    )
 
     class Meta:
         model = Product
@@ -110,7 +144,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'sku', 'barcode', 'quantity', 'is_taxable', 'is_physical', 'weight',
             'condition', 'is_active', 'is_featured', 'requires_shipping', 'is_digital',
             'view_count', 'images', 'variants', 'reviews', 'rating', 'review_count',
-            'has_variants', 'uploaded_images', 'created_at', 'updated_at'
+            'has_variants', 'uploaded_images', 'upload_ids', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'sku', 'view_count', 'created_at', 'updated_at']
 
@@ -134,17 +168,24 @@ class ProductSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Extract uploaded images from validated data
         uploaded_images = validated_data.pop('uploaded_images', [])
-        
-        # Create the product
-        product = Product.objects.create(**validated_data)
-        
-        # Create image instances for uploaded images
-        for index, image_file in enumerate(uploaded_images):
-            ProductImage.objects.create(
-                product=product,
-                image=image_file,
-                position=index,
-                is_main=(index == 0)  # First image is main
-            )
-        
+        upload_ids = validated_data.pop('upload_ids', [])
+
+        with db_transaction.atomic():
+            # Create the product
+            product = Product.objects.create(**validated_data)
+
+            user = self.context['request'].user
+            uploaded_images += [
+                claim_upload(upload_id, user, 'product_image') for upload_id in upload_ids
+            ]
+
+            # Create image instances for uploaded images
+            for index, image_file in enumerate(uploaded_images):
+                ProductImage.objects.create(
+                    product=product,
+                    image=image_file,
+                    position=index,
+                    is_main=(index == 0)  # First image is main
+                )
+
         return product
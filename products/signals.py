@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from stores.models import Category, Store
+from .models import Product, ProductImage, Review
+
+# Product fields that decide which category counts a product is in
+CATEGORY_COUNT_FIELDS = {'is_active', 'category', 'store'}
+# Product fields that change often but are not shown on the store page
+UNLISTED_FIELDS = {'view_count', 'quantity'}
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    """Take a deleted review out of the rating totals, including bulk and cascade deletes."""
+    counted = getattr(instance, '_counted_rating', None)
+    if counted:
+        Review.apply_rating_changes([(counted[0], -counted[1], -1)])
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    # View count bumps and stock changes leave the counts alone
+    if update_fields is None or not CATEGORY_COUNT_FIELDS.isdisjoint(update_fields):
+        Category.invalidate_cache()
+    if update_fields is None or not UNLISTED_FIELDS.issuperset(update_fields):
+        Store.bump_page_version(instance.store_id)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    Category.invalidate_cache()
+    Store.bump_page_version(instance.store_id)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    store_id = Product.objects.filter(pk=instance.product_id).values_list('store_id', flat=True).first()
+    if store_id is not None:
+        Store.bump_page_version(store_id)
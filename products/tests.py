@@ -1,3 +1,223 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps as global_apps
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Address, User
+from orders.models import ArchivedOrder, Order, OrderItem
+from stores.models import Store
+from .models import Product, Review
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PROTECTED_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PROTECTED_MEDIA_ROOT=PROTECTED_MEDIA_ROOT)
+class DigitalDownloadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(PROTECTED_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Digital Store', status='approved')
+        self.product = Product.objects.create(
+            store=store, name='Lecture Notes', description='-', price=Decimal('4.00'),
+            is_digital=True, requires_shipping=False
+        )
+        self.content = b'%PDF-' + bytes(range(256)) * 4
+        self.product.digital_file.save('notes.pdf', ContentFile(self.content))
+
+        address = Address.objects.create(
+            user=self.buyer, street_address='1 Hall Road', city='Accra',
+            state='Greater Accra', postal_code='00233'
+        )
+        self.order = Order.objects.create(
+            user=self.buyer, subtotal=Decimal('4.00'), total=Decimal('4.00'),
+            shipping_address=address, billing_address=address
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.url = f'/api/products/{self.product.slug}/download/'
+
+    def pay(self):
+        Order.objects.filter(pk=self.order.pk).update(payment_status='paid', status='processing')
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_requires_paid_order(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.pay()
+        # Entitlement and the file are looked up in one query
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(self.read(response), self.content)
+
+        Order.objects.filter(pk=self.order.pk).update(status='refunded')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_archived_orders_keep_access(self):
+        Order.objects.filter(pk=self.order.pk).update(
+            payment_status='paid', paid_at=timezone.now(), status='delivered',
+            created_at=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_orders', '--days', '365', stdout=StringIO())
+        self.assertTrue(ArchivedOrder.objects.filter(pk=self.order.pk).exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), self.content)
+
+        ArchivedOrder.objects.filter(pk=self.order.pk).update(status='refunded')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_range_requests(self):
+        self.pay()
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.read(response), self.content[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.read(response), self.content[-5:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(self.read(response), self.content[1000:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(DIGITAL_DOWNLOAD_MODE='x-accel', DIGITAL_DOWNLOAD_ACCEL_PREFIX='/protected/')
+    def test_offload_to_web_server(self):
+        self.pay()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.product.digital_file.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_files_are_kept_outside_media_root(self):
+        name = self.product.digital_file.name
+        self.assertTrue(os.path.exists(os.path.join(PROTECTED_MEDIA_ROOT, name)))
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+        self.assertEqual(self.product.digital_file.url, '')
+
+    def test_migration_moves_existing_files(self):
+        migration = import_module('products.migrations.0004_protected_digital_files')
+        name = self.product.digital_file.name
+        os.makedirs(os.path.join(MEDIA_ROOT, 'digital_products'), exist_ok=True)
+        shutil.move(os.path.join(PROTECTED_MEDIA_ROOT, name), os.path.join(MEDIA_ROOT, name))
+
+        migration.move_to_protected_storage(global_apps, None)
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+        self.pay()
+        self.assertEqual(self.read(self.client.get(self.url)), self.content)
+
+    def test_signed_link(self):
+        self.assertEqual(self.client.get(f'{self.url[:-1]}_link/').status_code, 403)
+        self.pay()
+        url = self.client.get(f'{self.url[:-1]}_link/').data['url']
+
+        anonymous = APIClient()
+        response = anonymous.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), self.content)
+        self.assertEqual(anonymous.get(url[:-2] + 'x/').status_code, 403)
+
+        with override_settings(DIGITAL_DOWNLOAD_URL_MAX_AGE=-1):
+            self.assertEqual(anonymous.get(url).status_code, 403)
+
+
+class RatingTotalsTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=owner, name='Rated Store', status='approved')
+        self.products = [
+            Product.objects.create(store=self.store, name=f'Mug {index}', description='-', price=Decimal('5.00'))
+            for index in range(2)
+        ]
+        self.users = [
+            User.objects.create_user(email=f'reviewer{index}@example.com', password='pass')
+            for index in range(4)
+        ]
+
+    def review(self, product, user, rating, approved=True):
+        return Review.objects.create(
+            product=product, user=user, rating=rating, title='-', comment='-', is_approved=approved
+        )
+
+    def assert_totals(self, product_totals, store_total):
+        """Check the running totals, and that recompute_ratings finds nothing to repair."""
+        for product, expected in zip(self.products, product_totals):
+            product.refresh_from_db()
+            self.assertEqual((product.rating_sum, product.rating_count), expected)
+        self.store.refresh_from_db()
+        self.assertEqual((self.store.rating_sum, self.store.total_ratings), store_total)
+        self.assertAlmostEqual(
+            self.store.rating, store_total[0] / store_total[1] if store_total[1] else 0.0
+        )
+        out = StringIO()
+        call_command('recompute_ratings', '--dry-run', stdout=out)
+        self.assertIn('Would repair ratings for 0 product(s) and 0 store(s).', out.getvalue())
+
+    def test_running_totals_match_recompute(self):
+        mug, other = self.products
+        first = self.review(mug, self.users[0], 5)
+        second = self.review(mug, self.users[1], 3)
+        pending = self.review(other, self.users[2], 4, approved=False)
+        self.assert_totals([(8, 2), (0, 0)], (8, 2))
+
+        # Editing a rating
+        second.rating = 1
+        second.save()
+        self.assert_totals([(6, 2), (0, 0)], (6, 2))
+
+        # Moving a review to another product
+        first.product = other
+        first.save()
+        self.assert_totals([(1, 1), (5, 1)], (6, 2))
+
+        # Approving and unapproving in bulk
+        Review.set_approved(Review.objects.filter(pk=pending.pk), True)
+        self.assert_totals([(1, 1), (9, 2)], (10, 3))
+        Review.set_approved(Review.objects.filter(pk__in=[pending.pk, second.pk]), False)
+        self.assert_totals([(0, 0), (5, 1)], (5, 1))
+
+        # Deleting one review, then the rest in bulk
+        self.review(mug, self.users[3], 2)
+        first.delete()
+        self.assert_totals([(2, 1), (0, 0)], (2, 1))
+        Review.objects.all().delete()
+        self.assert_totals([(0, 0), (0, 0)], (0, 0))
+
+    def test_recompute_repairs_drift(self):
+        self.review(self.products[0], self.users[0], 4)
+        self.review(self.products[1], self.users[1], 2)
+        Product.objects.update(rating_sum=0, rating_count=7)
+        Store.objects.update(rating_sum=1, total_ratings=1, rating=1.0)
+
+        out = StringIO()
+        call_command('recompute_ratings', stdout=out)
+        self.assertIn('Repaired ratings for 2 product(s) and 1 store(s).', out.getvalue())
+        self.assert_totals([(4, 1), (2, 1)], (6, 2))
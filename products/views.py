@@ -1,13 +1,17 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Q
+from django.conf import settings
+from django.db.models import Avg, Count, F, Q
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Product, ProductVariant, Review, ProductAttribute, ProductImage
 from .serializers import (
     ProductSerializer, ProductListSerializer, ProductVariantSerializer, 
     ReviewSerializer, ProductAttributeSerializer, ProductImageSerializer
 )
+from .filters import ProductFilter
+from core.downloads import serve_file, sign_download, unsign_download
 from core.permissions import IsProductOwner, IsSeller
 
 
@@ -15,7 +19,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.select_related('store', 'category').prefetch_related('images', 'variants', 'reviews')
     serializer_class = ProductSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['store', 'category', 'is_active', 'is_featured', 'condition']
+    filterset_class = ProductFilter
     search_fields = ['name', 'description', 'sku']
     ordering_fields = ['price', 'created_at', 'view_count', 'name']
     ordering = ['-created_at']
@@ -26,11 +30,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         # Only show active products to non-staff users
         if not (self.request.user.is_authenticated and self.request.user.is_staff):
-            queryset = queryset.filter(
-                is_active=True, 
-                store__status='approved',
-                store__owner__is_active=True
-            )
+            queryset = queryset.filter(Product.visible_q())
         return queryset
 
     def get_serializer_class(self):
@@ -43,8 +43,73 @@ class ProductViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated(), IsSeller()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated(), IsProductOwner()]
+        elif self.action in ['download', 'download_link']:
+            return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def get_download(self, slug, user_id):
+        """
+        The digital product and whether ``user_id`` may download it, in one
+        query. Buyers keep access after the product is hidden from the shop.
+        """
+        product = (
+            Product.objects.filter(slug=slug, is_digital=True)
+            .exclude(digital_file='')
+            .exclude(digital_file__isnull=True)
+            .annotate(purchased=Product.purchased_by(user_id), store_owner_id=F('store__owner_id'))
+            .only('id', 'slug', 'name', 'digital_file')
+            .first()
+        )
+        if product is None:
+            return None, False
+        return product, product.purchased or product.store_owner_id == user_id
+
+    def download_response(self, request, slug, user_id):
+        product, allowed = self.get_download(slug, user_id)
+        if product is None:
+            return Response({'error': 'No download for this product'}, status=status.HTTP_404_NOT_FOUND)
+        if not allowed:
+            return Response(
+                {'error': 'Purchase this product to download it'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return serve_file(request, product.digital_file)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, slug=None):
+        """Download a purchased digital product; supports Range requests"""
+        return self.download_response(request, slug, request.user.pk)
+
+    @action(detail=True, methods=['get'])
+    def download_link(self, request, slug=None):
+        """Short-lived URL that downloads the product without credentials"""
+        product, allowed = self.get_download(slug, request.user.pk)
+        if product is None:
+            return Response({'error': 'No download for this product'}, status=status.HTTP_404_NOT_FOUND)
+        if not allowed:
+            return Response(
+                {'error': 'Purchase this product to download it'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        token = sign_download(product.slug, request.user.pk)
+        url = reverse('product-signed-download', kwargs={'slug': product.slug, 'token': token})
+        return Response({
+            'url': request.build_absolute_uri(url),
+            'expires_in': settings.DIGITAL_DOWNLOAD_URL_MAX_AGE,
+        })
+
+    @action(detail=True, methods=['get'], url_path=r'download/(?P<token>[^/]+)')
+    def signed_download(self, request, slug=None, token=None):
+        """Download through a link from download_link"""
+        parts = unsign_download(token)
+        if parts is None or parts[0] != slug:
+            return Response(
+                {'error': 'Download link is invalid or has expired'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        user_id = parts[1]
+        return self.download_response(request, slug, int(user_id))
+
     @action(detail=True, methods=['post'])
     def increment_view(self, request, slug=None):
         """Increment the view count for a product"""
@@ -1,21 +1,30 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from django.utils import timezone
-from .models import Store, Category, StoreSocialMedia, StoreAnalytics, StoreVerification
+from .models import (
+    Store, Category, StoreSocialMedia, StoreAnalytics, StoreDailyStats, StoreVerification,
+    StoreVerificationAudit
+)
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'is_active', 'products_count', 'created_at']
-    list_filter = ['is_active', 'created_at']
+    list_display = ['name', 'parent', 'slug', 'is_active', 'products_count', 'created_at']
+    list_filter = ['is_active', 'depth', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ['products_count', 'created_at', 'updated_at']
+    raw_id_fields = ['parent']
+    list_select_related = ['parent']
+    readonly_fields = ['path', 'depth', 'products_count', 'created_at', 'updated_at']
+    ordering = ['path']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_products_count()
     
     def products_count(self, obj):
         return obj.get_products_count()
     products_count.short_description = 'Products Count'
+    products_count.admin_order_field = 'products_count'
 
 
 class StoreSocialMediaInline(admin.StackedInline):
@@ -97,35 +106,44 @@ class StoreAdmin(admin.ModelAdmin):
         )
     verification_status_display.short_description = 'Verification Status'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('owner').with_products_count()
+
     def total_products(self, obj):
         return obj.total_products
     total_products.short_description = 'Products'
+    total_products.admin_order_field = 'products_count'
     
     def approve_stores(self, request, queryset):
+        store_ids = list(queryset.values_list('pk', flat=True))
         count = queryset.update(status='approved')
+        Category.invalidate_cache()
+        Store.bump_page_version(*store_ids)
         self.message_user(request, f'{count} stores approved successfully.')
     approve_stores.short_description = 'Approve selected stores'
     
     def suspend_stores(self, request, queryset):
+        store_ids = list(queryset.values_list('pk', flat=True))
         count = queryset.update(status='suspended')
+        Category.invalidate_cache()
+        Store.bump_page_version(*store_ids)
         self.message_user(request, f'{count} stores suspended successfully.')
     suspend_stores.short_description = 'Suspend selected stores'
     
     def approve_verification(self, request, queryset):
-        count = queryset.filter(verification_status='pending').update(
-            verification_status='verified',
-            verification_approved_at=timezone.now(),
-            verification_notes='Approved by admin'
+        updated = Store.decide_verifications(
+            queryset.values_list('pk', flat=True), True,
+            reviewer=request.user, notes='Approved by admin'
         )
-        self.message_user(request, f'{count} verifications approved successfully.')
+        self.message_user(request, f'{len(updated)} verifications approved successfully.')
     approve_verification.short_description = 'Approve pending verifications'
     
     def reject_verification(self, request, queryset):
-        count = queryset.filter(verification_status='pending').update(
-            verification_status='rejected',
-            verification_notes='Rejected by admin - please resubmit with correct documents'
+        updated = Store.decide_verifications(
+            queryset.values_list('pk', flat=True), False,
+            reviewer=request.user, notes='Rejected by admin - please resubmit with correct documents'
         )
-        self.message_user(request, f'{count} verifications rejected.')
+        self.message_user(request, f'{len(updated)} verifications rejected.')
     reject_verification.short_description = 'Reject pending verifications'
 
 
@@ -143,6 +161,7 @@ class StoreVerificationAdmin(admin.ModelAdmin):
         'store__owner__email', 'business_registration_number'
     ]
     readonly_fields = ['submitted_at', 'updated_at', 'store_link']
+    list_select_related = ['store']
     actions = ['approve_verifications', 'reject_verifications']
     
     fieldsets = (
@@ -219,26 +238,19 @@ class StoreVerificationAdmin(admin.ModelAdmin):
     admin_actions.short_description = 'Actions'
     
     def approve_verifications(self, request, queryset):
-        count = 0
-        for verification in queryset:
-            if verification.store.verification_status == 'pending':
-                verification.store.verification_status = 'verified'
-                verification.store.verification_approved_at = timezone.now()
-                verification.store.verification_notes = 'Approved by admin'
-                verification.store.save()
-                count += 1
-        self.message_user(request, f'{count} verifications approved successfully.')
+        updated = Store.decide_verifications(
+            queryset.values_list('store_id', flat=True), True,
+            reviewer=request.user, notes='Approved by admin'
+        )
+        self.message_user(request, f'{len(updated)} verifications approved successfully.')
     approve_verifications.short_description = 'Approve selected verifications'
     
     def reject_verifications(self, request, queryset):
-        count = 0
-        for verification in queryset:
-            if verification.store.verification_status == 'pending':
-                verification.store.verification_status = 'rejected'
-                verification.store.verification_notes = 'Rejected by admin - please resubmit with correct documents'
-                verification.store.save()
-                count += 1
-        self.message_user(request, f'{count} verifications rejected.')
+        updated = Store.decide_verifications(
+            queryset.values_list('store_id', flat=True), False,
+            reviewer=request.user, notes='Rejected by admin - please resubmit with correct documents'
+        )
+        self.message_user(request, f'{len(updated)} verifications rejected.')
     reject_verifications.short_description = 'Reject selected verifications'
 
 
@@ -248,3 +260,23 @@ class StoreAnalyticsAdmin(admin.ModelAdmin):
     list_filter = ['last_updated']
     search_fields = ['store__name']
     readonly_fields = ['last_updated']
+
+
+@admin.register(StoreDailyStats)
+class StoreDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['store', 'date', 'views', 'orders', 'units_sold', 'revenue', 'fees']
+    list_filter = ['date']
+    search_fields = ['store__name']
+    raw_id_fields = ['store']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(StoreVerificationAudit)
+class StoreVerificationAuditAdmin(admin.ModelAdmin):
+    list_display = ['store', 'previous_status', 'status', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['store__name', 'notes']
+    raw_id_fields = ['store', 'created_by']
+    list_select_related = ['store', 'created_by']
+    readonly_fields = ['store', 'previous_status', 'status', 'notes', 'created_by', 'created_at']
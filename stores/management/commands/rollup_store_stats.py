@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from stores import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll paid orders and view counters up into StoreDailyStats. Only days '
+        'since the last rollup are recomputed unless --since is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            default=None,
+            help='Recompute sales from this date (YYYY-MM-DD) instead of the last rolled-up day',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute sales for all history',
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            since = None
+        elif options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        else:
+            since = stats.default_since()
+
+        today = timezone.localdate()
+        sales_stores = stats.rollup_sales(since)
+        view_stores = stats.rollup_views(today)
+        stats.refresh_lifetime_totals(sales_stores)
+
+        start = since.isoformat() if since else 'the beginning'
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up sales for {len(sales_stores)} store(s) since {start} '
+            f'and views for {len(view_stores)} store(s).'
+        ))
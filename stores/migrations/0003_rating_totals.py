@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_store_verification_approved_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='rating sum'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:07
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def start_view_watermarks(apps, schema_editor):
+    """Count only views from now on, rather than all history on the first rollup day."""
+    StoreAnalytics = apps.get_model('stores', 'StoreAnalytics')
+    Product = apps.get_model('products', 'Product')
+
+    product_views = dict(
+        Product.objects.values('store_id')
+        .annotate(views=Sum('view_count'))
+        .order_by()
+        .values_list('store_id', 'views')
+    )
+    StoreAnalytics.objects.bulk_create(
+        [StoreAnalytics(store_id=store_id) for store_id, views in product_views.items() if views],
+        ignore_conflicts=True
+    )
+    for analytics in StoreAnalytics.objects.all():
+        analytics.views_rolled_up = analytics.total_views + (product_views.get(analytics.store_id) or 0)
+        analytics.save(update_fields=['views_rolled_up'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0003_rating_totals'),
+        ('products', '0002_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeanalytics',
+            name='views_rolled_up',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='views rolled up'),
+        ),
+        migrations.CreateModel(
+            name='StoreDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='views')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='orders')),
+                ('units_sold', models.PositiveIntegerField(default=0, verbose_name='units sold')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='revenue')),
+                ('fees', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='platform fees')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='stores.store', verbose_name='store')),
+            ],
+            options={
+                'verbose_name': 'store daily stats',
+                'verbose_name_plural': 'store daily stats',
+                'ordering': ['store', 'date'],
+                'unique_together': {('store', 'date')},
+            },
+        ),
+        migrations.RunPython(start_view_watermarks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_root_paths(apps, schema_editor):
+    """Existing categories are all top level."""
+    Category = apps.get_model('stores', 'Category')
+    for category in Category.objects.only('pk'):
+        Category.objects.filter(pk=category.pk).update(path=f'{category.pk:06d}/', depth=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0004_store_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='depth'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='stores.category', verbose_name='parent'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='path'),
+        ),
+        migrations.RunPython(set_root_paths, migrations.RunPython.noop),
+    ]
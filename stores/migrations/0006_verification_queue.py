@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stores', '0005_category_tree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreVerificationAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(choices=[('unverified', 'Unverified'), ('pending', 'Pending Verification'), ('verified', 'Verified'), ('rejected', 'Verification Rejected')], max_length=20, verbose_name='previous status')),
+                ('status', models.CharField(choices=[('unverified', 'Unverified'), ('pending', 'Pending Verification'), ('verified', 'Verified'), ('rejected', 'Verification Rejected')], max_length=20, verbose_name='status')),
+                ('notes', models.TextField(blank=True, verbose_name='notes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'store verification audit',
+                'verbose_name_plural': 'store verification audits',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['verification_status', 'verification_submitted_at'], name='stores_stor_verific_be71d4_idx'),
+        ),
+        migrations.AddField(
+            model_name='storeverificationaudit',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='changed by'),
+        ),
+        migrations.AddField(
+            model_name='storeverificationaudit',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_audits', to='stores.store', verbose_name='store'),
+        ),
+        migrations.AddIndex(
+            model_name='storeverificationaudit',
+            index=models.Index(fields=['store', 'created_at'], name='stores_stor_store_i_19c2a6_idx'),
+        ),
+    ]
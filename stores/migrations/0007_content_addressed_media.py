@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:27
+
+from django.db import migrations, models
+import uploads.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0006_verification_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=uploads.storage.content_addressed_storage, upload_to='categories/'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='banner',
+            field=models.ImageField(blank=True, null=True, storage=uploads.storage.content_addressed_storage, upload_to='stores/banners/'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=uploads.storage.content_addressed_storage, upload_to='stores/logos/'),
+        ),
+    ]
@@ -1,21 +1,66 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction as db_transaction
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, RegexValidator
 from django.conf import settings
-from django.db.models import Avg, Count
+from django.core.cache import cache
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Substr
+from django.utils import timezone
 from django.utils.text import slugify
+from decimal import Decimal
+import time
+
+from uploads.storage import content_addressed_storage
+
+
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, category):
+        """``category`` and all of its descendants, by path prefix."""
+        return self.filter(path__startswith=category.path)
+
+    def with_products_count(self):
+        """Annotate ``products_count``, the visible products in each category."""
+        from products.models import Product
+
+        return self.annotate(
+            products_count=Count('products', filter=Product.visible_q('products__'))
+        )
 
 
 class Category(models.Model):
-    """Category model for product classification."""
+    """
+    Category model for product classification.
+
+    Categories nest through ``parent``. Each one also stores its materialized
+    ``path``, the zero-padded ids from the root down to itself (e.g.
+    ``000001/000004/``), so a whole subtree is one indexed prefix match.
+    """
+    CACHE_KEY = 'stores:categories:active'
+    PATH_STEP_WIDTH = 6
+
     name = models.CharField(_('name'), max_length=100, unique=True)
     slug = models.SlugField(_('slug'), max_length=100, unique=True)
     description = models.TextField(_('description'), blank=True)
-    image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image = models.ImageField(
+        upload_to='categories/', storage=content_addressed_storage, blank=True, null=True
+    )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='children',
+        verbose_name=_('parent')
+    )
+    path = models.CharField(_('path'), max_length=255, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(_('depth'), default=0, editable=False)
     is_active = models.BooleanField(_('is active'), default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('category')
         verbose_name_plural = _('categories')
@@ -24,18 +69,89 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.parent_id and self.pk and self.parent.path.startswith(self.path):
+            raise ValidationError({'parent': _('A category cannot be moved under itself.')})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            super().save(*args, **kwargs)
+            return
+
+        with db_transaction.atomic():
+            parent_path = self.parent.path if self.parent_id else ''
+            if self.pk and self.path and parent_path.startswith(self.path):
+                raise ValueError('A category cannot be moved under itself')
+            super().save(*args, **kwargs)
+            old_path, old_depth = self.path, self.depth
+            self.path = f'{parent_path}{self.pk:0{self.PATH_STEP_WIDTH}d}/'
+            self.depth = self.path.count('/') - 1
+            if self.path != old_path:
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+                if old_path:
+                    # Move the whole subtree in one statement
+                    Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                        path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                        depth=F('depth') + (self.depth - old_depth)
+                    )
 
     def get_products_count(self):
-        """Return the number of active products in this category."""
-        return self.products.filter(is_active=True).count()
+        """Return the number of visible products in this category."""
+        # Set by CategoryQuerySet.with_products_count()
+        if hasattr(self, 'products_count'):
+            return self.products_count
+        from products.models import Product
+        return self.products.filter(Product.visible_q()).count()
+
+    @classmethod
+    def cached_active(cls):
+        """Active categories with their product counts, cached."""
+        categories = cache.get(cls.CACHE_KEY)
+        if categories is None:
+            categories = list(cls.objects.filter(is_active=True).with_products_count())
+            cache.set(cls.CACHE_KEY, categories, settings.CATEGORY_CACHE_TIMEOUT)
+        return categories
+
+    @classmethod
+    def invalidate_cache(cls):
+        cache.delete(cls.CACHE_KEY)
+
+
+class StoreQuerySet(models.QuerySet):
+    def with_products_count(self):
+        """Annotate ``products_count``, the store's active products."""
+        from products.models import Product
+
+        products = (
+            Product.objects.filter(store=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('store')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return self.annotate(products_count=Coalesce(Subquery(products), 0))
+
+    def with_order_items_count(self):
+        """Annotate ``order_items_count``, every order line sold by each store."""
+        from orders.models import OrderItem
+
+        items = (
+            OrderItem.objects.filter(store=OuterRef('pk'))
+            .order_by()
+            .values('store')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return self.annotate(order_items_count=Coalesce(Subquery(items), 0))
 
 
 class Store(models.Model):
     """Store model for student sellers."""
+    PAGE_VERSION_KEY = 'stores:page-version:{}'
+
     STATUS_CHOICES = (
         ('pending', _('Pending Approval')),
         ('approved', _('Approved')),
@@ -58,8 +174,12 @@ class Store(models.Model):
     name = models.CharField(_('store name'), max_length=100)
     slug = models.SlugField(_('slug'), max_length=100, unique=True)
     description = models.TextField(_('description'), blank=True)
-    logo = models.ImageField(upload_to='stores/logos/', blank=True, null=True)
-    banner = models.ImageField(upload_to='stores/banners/', blank=True, null=True)
+    logo = models.ImageField(
+        upload_to='stores/logos/', storage=content_addressed_storage, blank=True, null=True
+    )
+    banner = models.ImageField(
+        upload_to='stores/banners/', storage=content_addressed_storage, blank=True, null=True
+    )
     categories = models.ManyToManyField(
         Category,
         related_name='stores',
@@ -97,13 +217,21 @@ class Store(models.Model):
     is_featured = models.BooleanField(_('is featured'), default=False)
     rating = models.FloatField(_('rating'), default=0.0, editable=False)
     total_ratings = models.PositiveIntegerField(_('total ratings'), default=0, editable=False)
+    # Running sum of approved review ratings; rating = rating_sum / total_ratings
+    rating_sum = models.PositiveIntegerField(_('rating sum'), default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StoreQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('store')
         verbose_name_plural = _('stores')
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # The admin verification queue, oldest submission first
+            models.Index(fields=['verification_status', 'verification_submitted_at']),
+        ]
 
     def __str__(self):
         return self.name
@@ -116,19 +244,86 @@ class Store(models.Model):
                 self.slug = f"{self.slug}-{self.owner.id}"
         super().save(*args, **kwargs)
 
+    @classmethod
+    def decide_verifications(cls, store_ids, approve, reviewer=None, notes=''):
+        """
+        Approve or reject the pending verifications among ``store_ids`` with a
+        single UPDATE, recording an audit entry for each. Returns the ids of
+        the stores that were changed.
+        """
+        new_status = 'verified' if approve else 'rejected'
+        changes = {'verification_status': new_status, 'verification_notes': notes}
+        if approve:
+            changes['verification_approved_at'] = timezone.now()
+
+        with db_transaction.atomic():
+            pending = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=store_ids, verification_status='pending')
+                .values_list('pk', flat=True)
+            )
+            cls.objects.filter(pk__in=pending).update(**changes)
+            StoreVerificationAudit.objects.bulk_create([
+                StoreVerificationAudit(
+                    store_id=store_id,
+                    previous_status='pending',
+                    status=new_status,
+                    notes=notes,
+                    created_by=reviewer
+                )
+                for store_id in pending
+            ])
+        cls.bump_page_version(*pending)
+        return pending
+
     def update_rating(self):
-        """Update the store's rating based on product reviews."""
+        """Recompute the store's rating from its approved product reviews."""
         from products.models import Review
-        
-        # Get all reviews for products in this store
-        result = Review.objects.filter(product__store=self).aggregate(
-            avg_rating=Avg('rating'),
+
+        result = Review.objects.filter(product__store=self, is_approved=True).aggregate(
+            total=Sum('rating'),
             count=Count('id')
         )
-        
-        self.rating = result['avg_rating'] or 0.0
-        self.total_ratings = result['count'] or 0
-        self.save(update_fields=['rating', 'total_ratings'])
+
+        self.rating_sum = result['total'] or 0
+        self.total_ratings = result['count']
+        self.rating = self.rating_sum / self.total_ratings if self.total_ratings else 0.0
+        self.save(update_fields=['rating', 'rating_sum', 'total_ratings'])
+
+    @staticmethod
+    def page_version(store_id):
+        """Version the store's cached page is stored under."""
+        return cache.get_or_set(Store.PAGE_VERSION_KEY.format(store_id), time.time_ns, None)
+
+    @staticmethod
+    def bump_page_version(*store_ids):
+        """Invalidate the cached pages of the given stores."""
+        # A fresh timestamp rather than incr(), so a version evicted from the
+        # cache can never come back as one an old page was cached under
+        cache.set_many(
+            {Store.PAGE_VERSION_KEY.format(store_id): time.time_ns() for store_id in store_ids},
+            None
+        )
+
+    @classmethod
+    def apply_rating_change(cls, store_id, rating_delta, count_delta):
+        """Add to a store's running rating totals in one atomic UPDATE."""
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('total_ratings') + count_delta
+        # Every expression here sees the row as it was before the update
+        cls.objects.filter(pk=store_id).update(
+            rating_sum=new_sum,
+            total_ratings=new_count,
+            rating=Case(
+                When(
+                    total_ratings__gt=-count_delta,
+                    then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField())
+                ),
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        )
+        cls.bump_page_version(store_id)
 
     def get_absolute_url(self):
         from django.urls import reverse
@@ -142,6 +337,9 @@ class Store(models.Model):
     @property
     def total_products(self):
         """Return the count of active products in this store."""
+        # Set by StoreQuerySet.with_products_count()
+        if hasattr(self, 'products_count'):
+            return self.products_count
         return self.products.filter(is_active=True).count()
 
 
@@ -154,6 +352,7 @@ class StoreAnalytics(models.Model):
         verbose_name=_('store')
     )
     total_views = models.PositiveIntegerField(_('total views'), default=0)
+    # Lifetime totals, refreshed from StoreDailyStats by the rollup job
     total_sales = models.PositiveIntegerField(_('total sales'), default=0)
     total_revenue = models.DecimalField(
         _('total revenue'),
@@ -161,6 +360,8 @@ class StoreAnalytics(models.Model):
         decimal_places=2,
         default=0.00
     )
+    # Store and product views already added to StoreDailyStats
+    views_rolled_up = models.PositiveIntegerField(_('views rolled up'), default=0, editable=False)
     last_updated = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -172,14 +373,47 @@ class StoreAnalytics(models.Model):
 
     def increment_views(self):
         """Increment the view counter."""
-        self.total_views += 1
-        self.save(update_fields=['total_views', 'last_updated'])
+        StoreAnalytics.objects.filter(pk=self.pk).update(
+            total_views=F('total_views') + 1,
+            last_updated=timezone.now()
+        )
 
-    def record_sale(self, amount):
-        """Record a new sale and update revenue."""
-        self.total_sales += 1
-        self.total_revenue += amount
-        self.save(update_fields=['total_sales', 'total_revenue', 'last_updated'])
+
+class StoreDailyStats(models.Model):
+    """Per-store, per-day activity, filled in by the rollup_store_stats command."""
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name=_('store')
+    )
+    date = models.DateField(_('date'))
+    views = models.PositiveIntegerField(_('views'), default=0)
+    orders = models.PositiveIntegerField(_('orders'), default=0)
+    units_sold = models.PositiveIntegerField(_('units sold'), default=0)
+    revenue = models.DecimalField(
+        _('revenue'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    fees = models.DecimalField(
+        _('platform fees'),
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('store daily stats')
+        verbose_name_plural = _('store daily stats')
+        ordering = ['store', 'date']
+        # Also the index behind the analytics range scan
+        unique_together = ['store', 'date']
+
+    def __str__(self):
+        return f"{self.store.name} {self.date}"
 
 
 class StoreSocialMedia(models.Model):
@@ -250,3 +484,43 @@ class StoreVerification(models.Model):
 
     def __str__(self):
         return f"{self.store.name} Verification"
+
+
+class StoreVerificationAudit(models.Model):
+    """A change to a store's verification status and who made it."""
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        related_name='verification_audits',
+        verbose_name=_('store')
+    )
+    previous_status = models.CharField(
+        _('previous status'),
+        max_length=20,
+        choices=Store.VERIFICATION_STATUS_CHOICES
+    )
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=Store.VERIFICATION_STATUS_CHOICES
+    )
+    notes = models.TextField(_('notes'), blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name=_('changed by')
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('store verification audit')
+        verbose_name_plural = _('store verification audits')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['store', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name}: {self.previous_status} -> {self.status}"
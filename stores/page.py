@@ -0,0 +1,99 @@
+"""
+The store page: everything the storefront shows for one store in one payload.
+
+build_store_page() always runs the same handful of queries whatever the size
+of the store. The result is cached under the store's page version (see
+Store.bump_page_version), so a change shown on the page makes the old cached
+copy unreachable instead of having to find and delete it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from django.urls import reverse
+
+from products.models import Product, ProductImage, Review
+from products.serializers import ProductListSerializer
+from .models import Store
+from .serializers import StorePageSerializer
+
+
+FEATURED_LIMIT = 8
+PAGE_KEY = 'stores:page:{}:{}:{}'
+
+
+def visible_products(store):
+    return (
+        Product.objects.filter(Product.visible_q(), store=store)
+        .select_related('store', 'category')
+        .prefetch_related(Prefetch(
+            'images',
+            queryset=ProductImage.objects.filter(is_main=True).order_by('position', 'created_at'),
+            to_attr='main_images'
+        ))
+    )
+
+
+def build_store_page(store, request):
+    """The store header, featured and first-page products, categories and ratings."""
+    context = {'request': request}
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    products = visible_products(store).order_by('-created_at')
+    featured = products.filter(is_featured=True)[:FEATURED_LIMIT]
+    first_page = products[:page_size]
+
+    categories = list(
+        Product.objects.filter(Product.visible_q(), store=store)
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(products_count=Count('id'))
+        .order_by('category__name')
+    )
+    total_products = sum(category['products_count'] for category in categories)
+
+    distribution = dict(
+        Review.objects.filter(product__store=store, is_approved=True)
+        .values('rating')
+        .annotate(count=Count('id'))
+        .order_by()
+        .values_list('rating', 'count')
+    )
+
+    next_url = None
+    if total_products > page_size:
+        next_url = request.build_absolute_uri(
+            f"{reverse('product-list')}?store={store.pk}&page=2"
+        )
+
+    return {
+        'store': StorePageSerializer(store, context=context).data,
+        'featured_products': ProductListSerializer(featured, many=True, context=context).data,
+        'products': {
+            'count': total_products,
+            'next': next_url,
+            'results': ProductListSerializer(first_page, many=True, context=context).data,
+        },
+        'categories': [
+            {
+                'id': category['category_id'],
+                'name': category['category__name'],
+                'slug': category['category__slug'],
+                'products_count': category['products_count'],
+            }
+            for category in categories
+        ],
+        'rating': {
+            'average': store.rating,
+            'count': store.total_ratings,
+            'distribution': {stars: distribution.get(stars, 0) for stars in range(5, 0, -1)},
+        },
+    }
+
+
+def cached_store_page(store, request):
+    # Absolute URLs in the payload depend on the host it was requested through
+    key = PAGE_KEY.format(store.pk, Store.page_version(store.pk), request.build_absolute_uri('/'))
+    page = cache.get(key)
+    if page is None:
+        page = build_store_page(store, request)
+        cache.set(key, page, settings.STORE_PAGE_CACHE_TIMEOUT)
+    return page
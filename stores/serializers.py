@@ -8,8 +8,9 @@ class CategorySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'image', 'is_active', 'products_count', 'created_at']
-        read_only_fields = ['slug', 'created_at']
+        fields = ['id', 'name', 'slug', 'description', 'image', 'parent', 'depth', 'is_active',
+                  'products_count', 'created_at']
+        read_only_fields = ['slug', 'depth', 'created_at']
 
 
 class StoreSocialMediaSerializer(serializers.ModelSerializer):
@@ -25,6 +26,16 @@ class StoreAnalyticsSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class StoreStatsPeriodSerializer(serializers.Serializer):
+    """One day, week or month of StoreDailyStats."""
+    period = serializers.DateField()
+    views = serializers.IntegerField()
+    orders = serializers.IntegerField()
+    units_sold = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    fees = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
 class StoreSerializer(serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     social_media = StoreSocialMediaSerializer(read_only=True)
@@ -56,7 +67,7 @@ class StoreSerializer(serializers.ModelSerializer):
 
     def get_is_owner(self, obj):
         request = self.context.get('request')
-        return request and request.user.is_authenticated and request.user == obj.owner
+        return bool(request and request.user.is_authenticated and request.user.pk == obj.owner_id)
 
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
@@ -66,11 +77,67 @@ class StoreSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class StorePageSerializer(serializers.ModelSerializer):
+    """Store header for the store page; the same for every visitor so it can be cached."""
+    owner_name = serializers.CharField(source='owner.full_name', read_only=True)
+    social_media = StoreSocialMediaSerializer(read_only=True)
+
+    class Meta:
+        model = Store
+        fields = [
+            'id', 'name', 'slug', 'description', 'logo', 'banner', 'owner_name',
+            'contact_phone', 'contact_email', 'address', 'is_featured', 'verification_status',
+            'rating', 'total_ratings', 'social_media', 'created_at'
+        ]
+        read_only_fields = fields
+
+
 class StoreListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing stores"""
     owner_name = serializers.CharField(source='owner.full_name', read_only=True)
+    total_products = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Store
         fields = ['id', 'name', 'slug', 'logo', 'rating', 'total_ratings', 
-                 'is_featured', 'owner_name', 'created_at']
+                 'is_featured', 'owner_name', 'total_products', 'created_at']
+
+
+class StoreVerificationQueueSerializer(serializers.ModelSerializer):
+    """A pending store in the admin verification queue."""
+    store_id = serializers.IntegerField(source='id', read_only=True)
+    store_name = serializers.CharField(source='name', read_only=True)
+    owner_name = serializers.CharField(source='owner.full_name', read_only=True)
+    owner_email = serializers.EmailField(source='owner.email', read_only=True)
+    business_name = serializers.CharField(source='verification_data.business_name', read_only=True, default=None)
+    business_type = serializers.CharField(source='verification_data.business_type', read_only=True, default=None)
+    owner_name_verification = serializers.CharField(source='verification_data.owner_name', read_only=True, default=None)
+    submitted_at = serializers.DateTimeField(source='verification_submitted_at', read_only=True)
+    has_documents = serializers.SerializerMethodField()
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Store
+        fields = ['store_id', 'store_name', 'owner_name', 'owner_email', 'business_name',
+                  'business_type', 'owner_name_verification', 'submitted_at', 'has_documents', 'error']
+        read_only_fields = fields
+
+    def get_has_documents(self, obj):
+        verification = getattr(obj, 'verification_data', None)
+        # File names only; the files themselves are never opened
+        return bool(verification and (verification.business_registration.name or verification.owner_id.name))
+
+    def get_error(self, obj):
+        # Store marked as pending but no verification data
+        if getattr(obj, 'verification_data', None) is None:
+            return 'No verification data found'
+        return None
+
+
+class VerificationDecisionSerializer(serializers.Serializer):
+    """Serializer for approving or rejecting verifications in bulk"""
+    DECISIONS = ('approve', 'reject')
+
+    store_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    decision = serializers.ChoiceField(choices=DECISIONS)
+    notes = serializers.CharField(required=False, allow_blank=True)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Store, StoreSocialMedia
+
+# Store fields that decide whether its products are visible
+CATEGORY_COUNT_FIELDS = {'status', 'owner'}
+
+
+@receiver(post_save, sender=Store)
+def store_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or not CATEGORY_COUNT_FIELDS.isdisjoint(update_fields):
+        Category.invalidate_cache()
+    Store.bump_page_version(instance.pk)
+
+
+@receiver(post_save, sender=StoreSocialMedia)
+def social_media_saved(sender, instance, **kwargs):
+    Store.bump_page_version(instance.store_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver(post_delete, sender=Store)
+def category_changed(sender, instance, **kwargs):
+    Category.invalidate_cache()
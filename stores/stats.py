@@ -0,0 +1,215 @@
+"""
+Daily store statistics.
+
+StoreDailyStats holds one row per store per day. The rollup_store_stats
+command fills it incrementally: sales columns are recomputed from paid order
+lines, live and archived, for the days since the last rollup, and views are
+the growth of the store and product view counters since they were last
+rolled up. The analytics endpoint then reads a date range of rows instead of
+counting live.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from orders.models import ArchivedOrderItem, ArchivedStoreOrder, OrderItem, StoreOrder
+from products.models import Product
+from .models import StoreAnalytics, StoreDailyStats
+
+
+GRANULARITIES = {
+    'day': F,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+DEFAULT_RANGE_DAYS = 30
+
+# (order lines, store orders) that sales are rolled up from; an order is in
+# exactly one of the pairs, so their totals add up
+SALES_SOURCES = (
+    (OrderItem, StoreOrder),
+    (ArchivedOrderItem, ArchivedStoreOrder),
+)
+
+
+def default_since():
+    """First day the next rollup needs to recompute, or None for all history."""
+    return StoreDailyStats.objects.aggregate(latest=Max('date'))['latest']
+
+
+def rollup_sales(since=None):
+    """
+    Recompute the sales columns of StoreDailyStats for every day from
+    ``since`` on, from orders paid in that period, live or archived.
+    Returns the ids of the stores touched.
+    """
+    start = None
+    if since is not None:
+        # Bound on the datetime itself so the paid_at index can be used
+        start = timezone.make_aware(datetime.combine(since, time.min))
+
+    rows = {}
+    for item_model, store_order_model in SALES_SOURCES:
+        items = item_model.objects.filter(order__payment_status='paid', order__paid_at__isnull=False)
+        store_orders = store_order_model.objects.filter(
+            order__payment_status='paid', order__paid_at__isnull=False
+        )
+        if start is not None:
+            items = items.filter(order__paid_at__gte=start)
+            store_orders = store_orders.filter(order__paid_at__gte=start)
+
+        grouped_items = (
+            items.annotate(day=TruncDate('order__paid_at'))
+            .values('store_id', 'day')
+            .annotate(orders=Count('order_id', distinct=True), units_sold=Sum('quantity'), revenue=Sum('total'))
+            .order_by()
+        )
+        for row in grouped_items:
+            stats = rows.setdefault((row['store_id'], row['day']), StoreDailyStats(
+                store_id=row['store_id'],
+                date=row['day'],
+                orders=0,
+                units_sold=0,
+                revenue=Decimal('0.00'),
+                fees=Decimal('0.00')
+            ))
+            stats.orders += row['orders']
+            stats.units_sold += row['units_sold']
+            stats.revenue += row['revenue']
+        grouped_fees = (
+            store_orders.annotate(day=TruncDate('order__paid_at'))
+            .values('store_id', 'day')
+            .annotate(fees=Sum('platform_fee'))
+            .order_by()
+        )
+        for row in grouped_fees:
+            stats = rows.get((row['store_id'], row['day']))
+            if stats is not None:
+                stats.fees += row['fees']
+
+    # Recomputing a whole day is idempotent, so re-running a range is safe
+    StoreDailyStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['store', 'date'],
+        update_fields=['orders', 'units_sold', 'revenue', 'fees', 'updated_at'],
+        batch_size=500
+    )
+    return {store_id for store_id, _ in rows}
+
+
+def rollup_views(day):
+    """
+    Add the growth of each store's view counters since the last rollup to
+    its stats for ``day``. Returns the ids of the stores touched.
+    """
+    product_views = dict(
+        Product.objects.values('store_id')
+        .annotate(views=Sum('view_count'))
+        .order_by()
+        .values_list('store_id', 'views')
+    )
+    with db_transaction.atomic():
+        # Every store with product views needs an analytics row for its watermark
+        StoreAnalytics.objects.bulk_create(
+            [StoreAnalytics(store_id=store_id) for store_id, views in product_views.items() if views],
+            ignore_conflicts=True
+        )
+        added = {}
+        watermarks = []
+        for analytics in StoreAnalytics.objects.select_for_update().only(
+            'pk', 'store_id', 'total_views', 'views_rolled_up'
+        ):
+            current = analytics.total_views + (product_views.get(analytics.store_id) or 0)
+            if current == analytics.views_rolled_up:
+                continue
+            # Counters can shrink when products are deleted; just move the watermark
+            if current > analytics.views_rolled_up:
+                added[analytics.store_id] = current - analytics.views_rolled_up
+            analytics.views_rolled_up = current
+            watermarks.append(analytics)
+
+        StoreDailyStats.objects.bulk_create(
+            [StoreDailyStats(store_id=store_id, date=day) for store_id in added],
+            ignore_conflicts=True
+        )
+        for store_id, views in added.items():
+            StoreDailyStats.objects.filter(store_id=store_id, date=day).update(
+                views=F('views') + views,
+                updated_at=timezone.now()
+            )
+        StoreAnalytics.objects.bulk_update(watermarks, ['views_rolled_up'], batch_size=500)
+    return set(added)
+
+
+def refresh_lifetime_totals(store_ids):
+    """Copy lifetime sales and revenue from StoreDailyStats onto StoreAnalytics."""
+    if not store_ids:
+        return
+    StoreAnalytics.objects.bulk_create(
+        [StoreAnalytics(store_id=store_id) for store_id in store_ids],
+        ignore_conflicts=True
+    )
+    totals = {
+        row['store_id']: row
+        for row in StoreDailyStats.objects.filter(store_id__in=store_ids)
+        .values('store_id')
+        .annotate(sales=Sum('orders'), revenue=Sum('revenue'))
+        .order_by()
+    }
+    analytics = list(StoreAnalytics.objects.filter(store_id__in=totals))
+    for row in analytics:
+        row.total_sales = totals[row.store_id]['sales']
+        row.total_revenue = totals[row.store_id]['revenue']
+        row.last_updated = timezone.now()
+    StoreAnalytics.objects.bulk_update(
+        analytics, ['total_sales', 'total_revenue', 'last_updated'], batch_size=500
+    )
+
+
+def parse_range(params):
+    """
+    Read the ``from``, ``to`` and ``granularity`` query parameters.
+
+    Dates are inclusive and default to the last DEFAULT_RANGE_DAYS days.
+    Raises ValueError for a malformed parameter.
+    """
+    dates = {}
+    for param in ('from', 'to'):
+        value = params.get(param)
+        if value:
+            dates[param] = parse_date(value)
+            if dates[param] is None:
+                raise ValueError(f"Invalid '{param}' date, expected YYYY-MM-DD")
+    end = dates.get('to') or timezone.localdate()
+    start = dates.get('from') or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Invalid granularity, expected one of: {', '.join(GRANULARITIES)}")
+    return start, end, granularity
+
+
+def stats_series(store, start, end, granularity='day'):
+    """Stats for ``store`` between two dates, summed per day, week or month."""
+    return (
+        StoreDailyStats.objects.filter(store=store, date__range=(start, end))
+        .annotate(period=GRANULARITIES[granularity]('date'))
+        .values('period')
+        .annotate(
+            views=Sum('views'),
+            orders=Sum('orders'),
+            units_sold=Sum('units_sold'),
+            revenue=Sum('revenue'),
+            fees=Sum('fees')
+        )
+        .order_by('period')
+    )
@@ -1,3 +1,337 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from orders.models import ArchivedOrder, Order, OrderItem, StoreOrder
+from products.models import Product
+from .models import (
+    Category, Store, StoreAnalytics, StoreDailyStats, StoreVerification, StoreVerificationAudit
+)
+
+
+class StoreDailyStatsTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='pass')
+        self.owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=self.owner, name='Stats Store', status='approved')
+        self.product = Product.objects.create(
+            store=self.store, name='Lamp', description='-', price=Decimal('20.00'), quantity=10
+        )
+        self.today = timezone.localdate()
+
+    def create_paid_order(self, quantity, paid_at):
+        order = Order.objects.create(
+            user=self.buyer, subtotal=Decimal('20.00') * quantity, total=Decimal('20.00') * quantity,
+            status='processing', payment_status='paid', paid_at=paid_at
+        )
+        store_order = StoreOrder.objects.create(
+            order=order, store=self.store, status='processing', subtotal=order.total,
+            platform_fee=Decimal('1.00'), total=order.total
+        )
+        OrderItem.objects.create(
+            order=order, store_order=store_order, product=self.product, store=self.store,
+            product_name=self.product.name, price=self.product.price, quantity=quantity,
+            subtotal=order.total, total=order.total
+        )
+        return order
+
+    def test_rollup_is_incremental_and_served_by_range(self):
+        self.create_paid_order(2, timezone.now() - timedelta(days=1))
+        self.create_paid_order(1, timezone.now())
+        Product.objects.filter(pk=self.product.pk).update(view_count=5)
+
+        call_command('rollup_store_stats', stdout=StringIO())
+        today = StoreDailyStats.objects.get(store=self.store, date=self.today)
+        self.assertEqual((today.orders, today.units_sold, today.views), (1, 1, 5))
+        self.assertEqual(today.revenue, Decimal('20.00'))
+        self.assertEqual(today.fees, Decimal('1.00'))
+
+        # A second run only adds what is new since the first
+        self.create_paid_order(3, timezone.now())
+        Product.objects.filter(pk=self.product.pk).update(view_count=7)
+        call_command('rollup_store_stats', stdout=StringIO())
+        today.refresh_from_db()
+        self.assertEqual((today.orders, today.units_sold, today.views), (2, 4, 7))
+
+        analytics = StoreAnalytics.objects.get(store=self.store)
+        self.assertEqual(analytics.total_sales, 3)
+        self.assertEqual(analytics.total_revenue, Decimal('120.00'))
+
+        # An unpaid order's line counts towards total_orders but not the sales
+        unpaid = self.create_paid_order(1, None)
+        Order.objects.filter(pk=unpaid.pk).update(status='pending', payment_status='pending')
+
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/stores/{self.store.pk}/analytics/'
+        with self.assertNumQueries(2):
+            response = client.get(url, {
+                'from': (self.today - timedelta(days=6)).isoformat(),
+                'to': self.today.isoformat(),
+                'granularity': 'month',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['orders'], 3)
+        self.assertEqual(response.data['totals']['units_sold'], 6)
+        self.assertEqual(response.data['totals']['revenue'], '120.00')
+        self.assertEqual(response.data['total_products'], 1)
+        self.assertEqual(response.data['total_orders'], 4)
+        self.assertEqual(response.data['total_sales'], 3)
+
+        response = client.get(url, {'granularity': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_full_rollup_includes_archived_orders(self):
+        paid_at = timezone.now() - timedelta(days=400)
+        order = self.create_paid_order(2, paid_at)
+        Order.objects.filter(pk=order.pk).update(status='delivered', created_at=paid_at)
+        self.create_paid_order(1, timezone.now())
+        call_command('archive_orders', '--days', '365', stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+
+        call_command('rollup_store_stats', '--full', stdout=StringIO())
+        archived_day = StoreDailyStats.objects.get(store=self.store, date=timezone.localdate(paid_at))
+        self.assertEqual((archived_day.orders, archived_day.units_sold), (1, 2))
+        self.assertEqual(archived_day.revenue, Decimal('40.00'))
+        self.assertEqual(archived_day.fees, Decimal('1.00'))
+
+        analytics = StoreAnalytics.objects.get(store=self.store)
+        self.assertEqual(analytics.total_sales, 2)
+        self.assertEqual(analytics.total_revenue, Decimal('60.00'))
+
+
+class CategoryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.category = Category.objects.create(name='Books')
+        self.store = Store.objects.create(owner=owner, name='Book Store', status='approved')
+        self.product = Product.objects.create(
+            store=self.store, category=self.category, name='Novel', description='-',
+            price=Decimal('5.00'), quantity=3
+        )
+        other = User.objects.create_user(email='other@example.com', password='pass', is_seller=True)
+        pending = Store.objects.create(owner=other, name='Pending Store')
+        Product.objects.create(
+            store=pending, category=self.category, name='Atlas', description='-',
+            price=Decimal('5.00'), quantity=3
+        )
+
+    def get_count(self):
+        response = APIClient().get('/api/stores/categories/')
+        return response.data[0]['products_count']
+
+    def test_counts_visible_products_and_caches(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_count(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_count(), 1)
+
+        # Stock and view changes keep the cache; visibility changes clear it
+        self.product.increment_view_count()
+        with self.assertNumQueries(0):
+            self.get_count()
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(self.get_count(), 0)
+
+        self.product.is_active = True
+        self.product.save()
+        self.store.status = 'suspended'
+        self.store.save()
+        self.assertEqual(self.get_count(), 0)
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.phones = Category.objects.create(name='Phones', parent=self.electronics)
+        self.chargers = Category.objects.create(name='Chargers', parent=self.phones)
+        self.books = Category.objects.create(name='Books')
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        store = Store.objects.create(owner=owner, name='Gadgets', status='approved')
+        for name, category in (('Cable', self.chargers), ('Handset', self.phones), ('Novel', self.books)):
+            Product.objects.create(
+                store=store, category=category, name=name, description='-',
+                price=Decimal('5.00'), quantity=3
+            )
+
+    def product_names(self, category):
+        response = APIClient().get('/api/products/', {'category': category.pk})
+        return sorted(product['name'] for product in response.data['results'])
+
+    def test_subtree_filter_and_move(self):
+        self.assertEqual(self.chargers.path, f'{self.electronics.pk:06d}/{self.phones.pk:06d}/{self.chargers.pk:06d}/')
+        self.assertEqual(self.product_names(self.electronics), ['Cable', 'Handset'])
+        self.assertEqual(self.product_names(self.chargers), ['Cable'])
+
+        # Moving a category carries its descendants along
+        self.phones.parent = self.books
+        self.phones.save()
+        self.chargers.refresh_from_db()
+        self.assertTrue(self.chargers.path.startswith(self.books.path))
+        self.assertEqual(self.chargers.depth, 2)
+        self.assertEqual(self.product_names(self.electronics), [])
+        self.assertEqual(self.product_names(self.books), ['Cable', 'Handset', 'Novel'])
+
+        self.books.parent = self.chargers
+        with self.assertRaises(ValueError):
+            self.books.save()
+
+    def test_tree_endpoint(self):
+        APIClient().get('/api/stores/categories/tree/')
+        with self.assertNumQueries(0):
+            response = APIClient().get('/api/stores/categories/tree/')
+        self.assertEqual([node['name'] for node in response.data], ['Books', 'Electronics'])
+        electronics = response.data[1]
+        self.assertEqual(electronics['products_count'], 0)
+        self.assertEqual(electronics['total_products_count'], 2)
+        self.assertEqual(electronics['children'][0]['children'][0]['name'], 'Chargers')
+
+
+class StorePageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=owner, name='Page Store', status='approved')
+        self.category = Category.objects.create(name='Stationery')
+        self.url = f'/api/stores/{self.store.pk}/page/'
+
+    def add_products(self, count, **kwargs):
+        for i in range(count):
+            Product.objects.create(
+                store=self.store, category=self.category, name=f'Pen {i}', description='-',
+                price=Decimal('2.00'), quantity=5, **kwargs
+            )
+
+    def test_fixed_queries_cached_per_version(self):
+        self.add_products(2, is_featured=True)
+        self.add_products(3)
+        cache.clear()
+        with self.assertNumQueries(7):
+            response = APIClient().get(self.url)
+        self.add_products(20)
+        cache.clear()
+        with self.assertNumQueries(7):
+            response = APIClient().get(self.url)
+        self.assertEqual(response.data['products']['count'], 25)
+        self.assertEqual(len(response.data['products']['results']), 10)
+        self.assertEqual(len(response.data['featured_products']), 2)
+        self.assertEqual(response.data['categories'][0]['products_count'], 25)
+        self.assertFalse(response.data['is_owner'])
+
+        # Only the store lookup runs while the cached page is current
+        with self.assertNumQueries(1):
+            APIClient().get(self.url)
+
+        product = Product.objects.filter(store=self.store).first()
+        product.increment_view_count()
+        with self.assertNumQueries(1):
+            APIClient().get(self.url)
+        product.is_active = False
+        product.save()
+        response = APIClient().get(self.url)
+        self.assertEqual(response.data['products']['count'], 24)
+
+
+class StoreQueryCountTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Food')
+        self.add_stores(2)
+
+    def add_stores(self, count):
+        start = Store.objects.count()
+        for i in range(start, start + count):
+            owner = User.objects.create_user(email=f'seller{i}@example.com', password='pass', is_seller=True)
+            store = Store.objects.create(owner=owner, name=f'Store {i}', status='approved')
+            store.categories.add(self.category)
+            StoreAnalytics.objects.create(store=store)
+            Product.objects.create(
+                store=store, category=self.category, name=f'Snack {i}', description='-',
+                price=Decimal('1.00'), quantity=1
+            )
+        return store
+
+    def test_store_list_and_detail(self):
+        with self.assertNumQueries(2):
+            APIClient().get('/api/stores/')
+        store = self.add_stores(5)
+        with self.assertNumQueries(2):
+            response = APIClient().get('/api/stores/')
+        self.assertEqual(response.data['results'][0]['total_products'], 1)
+
+        client = APIClient()
+        client.force_authenticate(store.owner)
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/stores/{store.pk}/')
+        self.assertEqual(response.data['total_products'], 1)
+        self.assertTrue(response.data['is_owner'])
+        self.assertEqual(response.data['categories'][0]['products_count'], 7)
+
+    def test_admin_changelist(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='pass')
+        self.client.force_login(admin_user)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get('/admin/stores/store/').status_code, 200)
+        self.add_stores(5)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get('/admin/stores/store/')
+        self.assertEqual(len(small), len(large))
+
+
+class VerificationQueueTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', is_staff=True)
+        self.stores = []
+        for i in range(3):
+            owner = User.objects.create_user(email=f'seller{i}@example.com', password='pass', is_seller=True)
+            store = Store.objects.create(
+                owner=owner, name=f'Store {i}', status='approved', verification_status='pending',
+                verification_submitted_at=timezone.now() - timedelta(days=3 - i)
+            )
+            StoreVerification.objects.create(
+                store=store, business_name=f'Business {i}', business_address='-',
+                business_type='retail', owner_name='Owner'
+            )
+            self.stores.append(store)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_queue_and_bulk_decision(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/stores/pending_verifications/')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [row['store_id'] for row in response.data['results']],
+            [store.pk for store in self.stores]
+        )
+        self.assertEqual(response.data['results'][0]['business_name'], 'Business 0')
+        self.assertIsNone(response.data['results'][0]['error'])
+
+        response = self.client.post('/api/stores/bulk_verification/', {
+            'store_ids': [self.stores[0].pk, self.stores[1].pk], 'decision': 'approve'
+        }, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        # Already decided, so only the last one changes
+        response = self.client.post('/api/stores/bulk_verification/', {
+            'store_ids': [store.pk for store in self.stores], 'decision': 'reject', 'notes': 'Blurry ID'
+        }, format='json')
+        self.assertEqual(response.data['store_ids'], [self.stores[2].pk])
 
-# Create your tests here.
+        self.assertEqual(
+            list(Store.objects.order_by('pk').values_list('verification_status', flat=True)),
+            ['verified', 'verified', 'rejected']
+        )
+        audit = StoreVerificationAudit.objects.get(store=self.stores[2])
+        self.assertEqual((audit.previous_status, audit.status, audit.notes), ('pending', 'rejected', 'Blurry ID'))
+        self.assertEqual(audit.created_by, self.admin)
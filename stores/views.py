@@ -1,23 +1,64 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Q
+from django.db import transaction as db_transaction
+from django.db.models import Count, Prefetch, Sum, Q
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Store, Category, StoreSocialMedia, StoreVerification
-from .serializers import StoreSerializer, StoreListSerializer, CategorySerializer, StoreSocialMediaSerializer
+from decimal import Decimal
+from .models import Store, Category, StoreSocialMedia, StoreVerification, StoreVerificationAudit, StoreAnalytics
+from .serializers import (
+    StoreSerializer, StoreListSerializer, CategorySerializer, StoreSocialMediaSerializer,
+    StoreStatsPeriodSerializer, StoreVerificationQueueSerializer, VerificationDecisionSerializer
+)
+from . import stats
+from .page import cached_store_page
 from core.permissions import IsStoreOwner
+from uploads.models import ChunkedUpload
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.filter(is_active=True)
+    queryset = Category.objects.filter(is_active=True).with_products_count()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None  # No pagination for categories
 
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(Category.cached_active(), many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Active categories nested under their parents. ``total_products_count``
+        includes products in descendant categories.
+        """
+        # Parents sort before their children, siblings by name
+        categories = sorted(Category.cached_active(), key=lambda c: (c.depth, c.name))
+        data = self.get_serializer(categories, many=True).data
+
+        nodes = {}
+        roots = []
+        for category, node in zip(categories, data):
+            node['children'] = []
+            node['total_products_count'] = node['products_count']
+            if category.parent_id is None:
+                roots.append(node)
+            elif category.parent_id in nodes:
+                nodes[category.parent_id]['children'].append(node)
+            else:
+                # Under an inactive category
+                continue
+            nodes[category.pk] = node
+
+        for category in reversed(categories):
+            if category.pk in nodes and category.parent_id in nodes:
+                nodes[category.parent_id]['total_products_count'] += nodes[category.pk]['total_products_count']
+        return Response(roots)
+
 
 class StoreViewSet(viewsets.ModelViewSet):
-    queryset = Store.objects.select_related('owner').prefetch_related('categories', 'analytics', 'social_media')
+    queryset = Store.objects.select_related('owner', 'analytics', 'social_media')
     serializer_class = StoreSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'is_featured', 'categories']
@@ -30,6 +71,19 @@ class StoreViewSet(viewsets.ModelViewSet):
         # Only show approved stores to non-staff users
         if not self.request.user.is_staff:
             queryset = queryset.filter(status='approved', owner__is_active=True)
+        if self.action == 'analytics':
+            return queryset.with_products_count().with_order_items_count()
+        if self.action == 'page':
+            return queryset
+        return self.annotate_for_serializer(queryset)
+
+    def annotate_for_serializer(self, queryset):
+        """Load what the store serializers read, so no field queries per store."""
+        queryset = queryset.with_products_count()
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(
+                Prefetch('categories', queryset=Category.objects.with_products_count())
+            )
         return queryset
 
     def get_serializer_class(self):
@@ -46,7 +100,12 @@ class StoreViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def analytics(self, request, pk=None):
-        """Get detailed analytics for a store"""
+        """
+        Store activity over a date range from the daily rollups.
+
+        Accepts ``from`` and ``to`` (YYYY-MM-DD, inclusive; default the last
+        30 days) and ``granularity`` (day, week or month).
+        """
         store = self.get_object()
         
         # Check permission
@@ -55,23 +114,53 @@ class StoreViewSet(viewsets.ModelViewSet):
                 {'error': 'You do not have permission to view these analytics'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
+
+        try:
+            start, end, granularity = stats.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = StoreStatsPeriodSerializer(
+            stats.stats_series(store, start, end, granularity), many=True
+        ).data
+        totals = {
+            field: sum(period[field] for period in series)
+            for field in ('views', 'orders', 'units_sold')
+        }
+        for field in ('revenue', 'fees'):
+            totals[field] = f"{sum(Decimal(period[field]) for period in series):.2f}"
+
+        lifetime = getattr(store, 'analytics', None)
         analytics_data = {
-            'total_products': store.products.filter(is_active=True).count(),
-            'total_orders': store.order_items.count(),
-            'total_revenue': store.analytics.total_revenue if hasattr(store, 'analytics') else 0,
-            'total_sales': store.analytics.total_sales if hasattr(store, 'analytics') else 0,
-            'total_views': store.analytics.total_views if hasattr(store, 'analytics') else 0,
+            'from': start,
+            'to': end,
+            'granularity': granularity,
+            'totals': totals,
+            'series': series,
+            'total_products': store.products_count,
+            # Order lines, as before the rollups; total_sales counts paid orders
+            'total_orders': store.order_items_count,
+            'total_revenue': lifetime.total_revenue if lifetime else 0,
+            'total_sales': lifetime.total_sales if lifetime else 0,
+            'total_views': lifetime.total_views if lifetime else 0,
             'average_rating': store.rating,
             'total_ratings': store.total_ratings,
         }
         return Response(analytics_data)
 
+    @action(detail=True, methods=['get'])
+    def page(self, request, pk=None):
+        """Everything the store page shows, in one cached response"""
+        store = self.get_object()
+        data = dict(cached_store_page(store, request))
+        data['is_owner'] = request.user.is_authenticated and request.user.pk == store.owner_id
+        return Response(data)
+
     @action(detail=True, methods=['post'])
     def increment_view(self, request, pk=None):
         """Increment the view counter for a store"""
         store = self.get_object()
-        analytics, created = store.analytics.get_or_create(store=store)
+        analytics, created = StoreAnalytics.objects.get_or_create(store=store)
         analytics.increment_views()
         return Response({'status': 'view count incremented'})
 
@@ -112,7 +201,7 @@ class StoreViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            store = Store.objects.get(owner=request.user)
+            store = self.annotate_for_serializer(self.queryset.all()).get(owner=request.user)
             serializer = self.get_serializer(store)
             return Response(serializer.data)
         except Store.DoesNotExist:
@@ -172,16 +261,36 @@ class StoreViewSet(viewsets.ModelViewSet):
             if field in request.FILES:
                 verification_data[field] = request.FILES[field]
         
-        # Create or update verification record
-        verification, created = StoreVerification.objects.update_or_create(
-            store=store,
-            defaults=verification_data
-        )
-        
-        # Update store verification status
-        store.verification_status = 'pending'
-        store.verification_submitted_at = timezone.now()
-        store.save(update_fields=['verification_status', 'verification_submitted_at'])
+        with db_transaction.atomic():
+            # Large documents can be sent as completed chunked uploads instead
+            for field in file_fields:
+                upload_id = request.data.get(f'{field}_upload_id')
+                if upload_id and field not in verification_data:
+                    try:
+                        verification_data[field] = ChunkedUpload.claim(
+                            upload_id, request.user, 'verification_document'
+                        )
+                    except ValueError as e:
+                        db_transaction.set_rollback(True)
+                        return Response(
+                            {'error': f'{field}_upload_id: {e}'},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+
+            # Create or update verification record
+            verification, created = StoreVerification.objects.update_or_create(
+                store=store,
+                defaults=verification_data
+            )
+
+            # Update store verification status
+            previous_status = store.verification_status
+            store.verification_status = 'pending'
+            store.verification_submitted_at = timezone.now()
+            store.save(update_fields=['verification_status', 'verification_submitted_at'])
+            StoreVerificationAudit.objects.create(
+                store=store, previous_status=previous_status, status='pending', created_by=request.user
+            )
         
         return Response({
             'message': 'Verification submitted successfully',
@@ -227,11 +336,9 @@ class StoreViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update store verification status
-        store.verification_status = 'verified'
-        store.verification_approved_at = timezone.now()
-        store.verification_notes = request.data.get('notes', 'Approved by admin')
-        store.save(update_fields=['verification_status', 'verification_approved_at', 'verification_notes'])
+        notes = request.data.get('notes', 'Approved by admin')
+        Store.decide_verifications([store.pk], True, reviewer=request.user, notes=notes)
+        store.refresh_from_db(fields=['verification_status', 'verification_approved_at', 'verification_notes'])
         
         return Response({
             'message': 'Verification approved successfully',
@@ -259,10 +366,7 @@ class StoreViewSet(viewsets.ModelViewSet):
         
         rejection_reason = request.data.get('notes', 'Verification rejected by admin')
         
-        # Update store verification status
-        store.verification_status = 'rejected'
-        store.verification_notes = rejection_reason
-        store.save(update_fields=['verification_status', 'verification_notes'])
+        Store.decide_verifications([store.pk], False, reviewer=request.user, notes=rejection_reason)
         
         return Response({
             'message': 'Verification rejected',
@@ -272,46 +376,42 @@ class StoreViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def pending_verifications(self, request):
-        """Get all stores with pending verifications (admin only)"""
+        """Paginated queue of stores awaiting verification, oldest first (admin only)"""
         if not request.user.is_staff:
             return Response(
                 {'error': 'Admin access required'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        stores = Store.objects.filter(verification_status='pending').select_related('owner')
-        
-        verification_data = []
-        for store in stores:
-            try:
-                verification = store.verification_data
-                verification_data.append({
-                    'store_id': store.id,
-                    'store_name': store.name,
-                    'owner_name': f"{store.owner.first_name} {store.owner.last_name}",
-                    'owner_email': store.owner.email,
-                    'business_name': verification.business_name,
-                    'business_type': verification.business_type,
-                    'owner_name_verification': verification.owner_name,
-                    'submitted_at': store.verification_submitted_at,
-                    'has_documents': bool(verification.business_registration or verification.owner_id),
-                })
-            except StoreVerification.DoesNotExist:
-                # Store marked as pending but no verification data
-                verification_data.append({
-                    'store_id': store.id,
-                    'store_name': store.name,
-                    'owner_name': f"{store.owner.first_name} {store.owner.last_name}",
-                    'owner_email': store.owner.email,
-                    'business_name': None,
-                    'business_type': None,
-                    'owner_name_verification': None,
-                    'submitted_at': store.verification_submitted_at,
-                    'has_documents': False,
-                    'error': 'No verification data found'
-                })
-        
+        stores = (
+            Store.objects.filter(verification_status='pending')
+            .select_related('owner', 'verification_data')
+            .order_by('verification_submitted_at', 'pk')
+        )
+        page = self.paginate_queryset(stores)
+        serializer = StoreVerificationQueueSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_verification(self, request):
+        """Approve or reject many pending verifications at once (admin only)"""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Admin access required'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = VerificationDecisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        approve = serializer.validated_data['decision'] == 'approve'
+        notes = serializer.validated_data.get('notes') or (
+            'Approved by admin' if approve else 'Verification rejected by admin'
+        )
+        updated = Store.decide_verifications(
+            serializer.validated_data['store_ids'], approve, reviewer=request.user, notes=notes
+        )
         return Response({
-            'count': len(verification_data),
-            'pending_verifications': verification_data
+            'updated': len(updated),
+            'store_ids': updated,
+            'verification_status': 'verified' if approve else 'rejected'
         })
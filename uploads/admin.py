@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import ChunkedUpload, MediaBlob
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'user', 'purpose', 'size', 'status', 'created_at', 'completed_at']
+    list_filter = ['purpose', 'status', 'created_at']
+    search_fields = ['filename', 'user__email', 'sha256']
+    raw_id_fields = ['user']
+    readonly_fields = ['id', 'size', 'chunk_size', 'file', 'sha256', 'created_at', 'updated_at', 'completed_at']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'refcount', 'pending', 'pinned', 'touched_at']
+    list_filter = ['pinned', 'created_at']
+    search_fields = ['name', 'sha256']
+    readonly_fields = ['name', 'sha256', 'size', 'refcount', 'pending', 'pinned', 'created_at', 'touched_at']
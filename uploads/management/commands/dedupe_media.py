@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import ArchivedOrderItem, OrderItem
+from uploads.models import MediaBlob
+from uploads.storage import BLOB_DIRECTORY, blob_name_from_url, media_fields, media_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Move files referenced by content-addressed fields into blob storage, so '
+        'identical files are stored once, then recount blob references and '
+        'delete blobs nothing refers to.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-originals',
+            action='store_true',
+            help='Leave the original files in place after moving their references',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be moved without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        converted = {}  # original name -> blob name
+        missing = set()
+        moved = 0
+
+        for model, fields in media_fields():
+            for field in fields:
+                queryset = (
+                    model._default_manager
+                    .exclude(**{f'{field}__startswith': BLOB_DIRECTORY})
+                    .exclude(**{field: ''})
+                    .exclude(**{f'{field}__isnull': True})
+                )
+                for instance in queryset.iterator():
+                    name = getattr(instance, field).name
+                    if name not in converted and name not in missing:
+                        if not media_storage.exists(name):
+                            missing.add(name)
+                        elif dry_run:
+                            converted[name] = None
+                        else:
+                            with media_storage.open(name, 'rb') as original:
+                                converted[name] = media_storage.save(name, original)
+                    if name in missing:
+                        continue
+                    moved += 1
+                    if not dry_run:
+                        # Saving through the model keeps counts and caches in step
+                        setattr(instance, field, converted[name])
+                        instance.save(update_fields=[field])
+
+        if dry_run:
+            self.stdout.write(
+                f'Would move {moved} references to {len(converted)} files into blob storage '
+                f'({len(missing)} referenced files are missing)'
+            )
+            return
+
+        # Order lines show image snapshots by URL, so those files stay
+        snapshots = set()
+        for item_model in (OrderItem, ArchivedOrderItem):
+            snapshots.update(
+                item_model.objects.exclude(product_image='')
+                .values_list('product_image', flat=True).distinct().iterator()
+            )
+        MediaBlob.pin_urls(snapshots)
+        snapshot_names = {blob_name_from_url(url) for url in snapshots}
+
+        removed = 0
+        if not options['keep_originals']:
+            for name in converted:
+                if name not in snapshot_names:
+                    media_storage.delete(name)
+                    removed += 1
+
+        recounted = MediaBlob.recount()
+        # Blobs saved in the last hour may belong to a save still in progress
+        deleted = MediaBlob.delete_unreferenced(touched_before=timezone.now() - timedelta(hours=1))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} references from {len(converted)} files into '
+            f'{len(set(converted.values()))} blobs and removed {removed} originals. '
+            f'Corrected {recounted} reference counts and deleted {deleted} unreferenced blobs.'
+        ))
+        if missing:
+            self.stdout.write(self.style.WARNING(f'{len(missing)} referenced files are missing'))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete chunked uploads that were never finished or never attached, '
+        'with their chunk files, and forget attached ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='Expire uploads untouched for this many hours (default: CHUNKED_UPLOAD_EXPIRY_HOURS)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be deleted without deleting it',
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        if hours is None:
+            hours = settings.CHUNKED_UPLOAD_EXPIRY_HOURS
+        cutoff = timezone.now() - timedelta(hours=hours)
+        stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+
+        abandoned = stale.exclude(status='attached')
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would delete {abandoned.count()} abandoned uploads and '
+                f'{stale.filter(status="attached").count()} attached upload records'
+            )
+            return
+
+        removed = 0
+        for upload in abandoned.iterator():
+            upload.discard_chunks()
+            if upload.file:
+                default_storage.delete(upload.file.name)
+            upload.delete()
+            removed += 1
+
+        # Attached files now belong to the model they were claimed for
+        forgotten, _ = stale.filter(status='attached').delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {removed} abandoned uploads and {forgotten} attached upload records'
+        ))
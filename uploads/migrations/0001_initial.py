@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('product_image', 'Product image'), ('verification_document', 'Verification document')], max_length=30, verbose_name='purpose')),
+                ('filename', models.CharField(max_length=255, verbose_name='filename')),
+                ('content_type', models.CharField(max_length=100, verbose_name='content type')),
+                ('size', models.PositiveBigIntegerField(verbose_name='size')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='chunk size')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('attached', 'Attached')], default='pending', max_length=20, verbose_name='status')),
+                ('file', models.FileField(blank=True, max_length=255, upload_to='', verbose_name='file')),
+                ('sha256', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='completed at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'chunked upload',
+                'verbose_name_plural': 'chunked uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='index')),
+                ('size', models.PositiveIntegerField(verbose_name='size')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='uploads.chunkedupload', verbose_name='upload')),
+            ],
+            options={
+                'verbose_name': 'upload chunk',
+                'verbose_name_plural': 'upload chunks',
+                'ordering': ['upload', 'index'],
+                'unique_together': {('upload', 'index')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chunkedupload',
+            index=models.Index(fields=['status', 'updated_at'], name='uploads_chu_status_26d7cd_idx'),
+        ),
+    ]
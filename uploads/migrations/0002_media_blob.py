@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='name')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='size')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='reference count')),
+                ('pinned', models.BooleanField(default=False, verbose_name='pinned')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'media blob',
+                'verbose_name_plural': 'media blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0002_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='pending',
+            field=models.PositiveIntegerField(default=0, verbose_name='pending references'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='touched_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='last saved at'),
+        ),
+    ]
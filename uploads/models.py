@@ -0,0 +1,379 @@
+import hashlib
+import math
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import models, transaction as db_transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext_lazy as _
+
+from .storage import BLOB_DIRECTORY, blob_name_from_url, is_blob_name
+
+
+class HashingReader:
+    """
+    Read-only file-like wrapper that hashes and counts what is read through
+    it, stopping after ``limit`` bytes. Storage backends pull from it in
+    small pieces, so nothing is held in memory.
+    """
+
+    def __init__(self, stream, limit=None):
+        self.stream = stream
+        self.limit = limit
+        self.bytes_read = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        if self.limit is not None:
+            remaining = self.limit - self.bytes_read
+            if remaining <= 0:
+                return b''
+            size = remaining if size is None or size < 0 else min(size, remaining)
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        self.sha256.update(data)
+        return data
+
+
+class ChunkStream:
+    """File-like object reading an upload's chunk files one after another."""
+
+    def __init__(self, names):
+        self.names = iter(names)
+        self.current = None
+
+    def read(self, size=-1):
+        while True:
+            if self.current is None:
+                name = next(self.names, None)
+                if name is None:
+                    return b''
+                self.current = default_storage.open(name, 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file uploaded in fixed-size chunks.
+
+    Each chunk is streamed to storage as it arrives and checked against its
+    SHA-256, so an interrupted upload resumes from the chunks it is missing.
+    Completing the upload joins the chunks into one file, which can then be
+    attached once to a model field with claim().
+    """
+    STATUS_CHOICES = (
+        ('pending', _('Pending')),
+        ('complete', _('Complete')),
+        ('attached', _('Attached')),
+    )
+
+    PURPOSE_CHOICES = (
+        ('product_image', _('Product image')),
+        ('verification_document', _('Verification document')),
+    )
+
+    # Directory the finished file is written to, and the types it may have
+    PURPOSE_DIRECTORIES = {
+        'product_image': 'products/',
+        'verification_document': 'verification/documents/',
+    }
+    PURPOSE_CONTENT_TYPES = {
+        'product_image': ('image/jpeg', 'image/png', 'image/webp', 'image/gif'),
+        'verification_document': ('application/pdf', 'image/jpeg', 'image/png'),
+    }
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        verbose_name=_('user')
+    )
+    purpose = models.CharField(_('purpose'), max_length=30, choices=PURPOSE_CHOICES)
+    filename = models.CharField(_('filename'), max_length=255)
+    content_type = models.CharField(_('content type'), max_length=100)
+    size = models.PositiveBigIntegerField(_('size'))
+    chunk_size = models.PositiveIntegerField(_('chunk size'))
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(_('file'), max_length=255, blank=True)
+    sha256 = models.CharField(_('SHA-256'), max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(_('completed at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('chunked upload')
+        verbose_name_plural = _('chunked uploads')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+    @property
+    def total_chunks(self):
+        return math.ceil(self.size / self.chunk_size)
+
+    def expected_chunk_size(self, index):
+        if index == self.total_chunks - 1:
+            return self.size - self.chunk_size * index
+        return self.chunk_size
+
+    def chunk_name(self, index):
+        return f'uploads/chunks/{self.pk}/{index:05d}'
+
+    def received_chunks(self):
+        return list(self.chunks.order_by('index').values_list('index', flat=True))
+
+    def store_chunk(self, index, stream, checksum):
+        """
+        Stream chunk ``index`` from ``stream`` to storage, replacing any earlier
+        copy. Raises ValueError if its size or SHA-256 does not match.
+        """
+        if self.status != 'pending':
+            raise ValueError('Upload is already complete')
+        if not 0 <= index < self.total_chunks:
+            raise ValueError('Chunk index out of range')
+
+        expected = self.expected_chunk_size(index)
+        name = self.chunk_name(index)
+        # Storage would pick a new name rather than overwrite a resent chunk
+        default_storage.delete(name)
+        reader = HashingReader(stream, limit=expected)
+        content = File(reader, name=name)
+        content.size = expected
+        default_storage.save(name, content)
+
+        if reader.bytes_read != expected or reader.sha256.hexdigest() != checksum.lower():
+            default_storage.delete(name)
+            raise ValueError(f'Chunk {index} does not match its size or checksum')
+
+        UploadChunk.objects.update_or_create(
+            upload=self, index=index,
+            defaults={'size': reader.bytes_read, 'sha256': reader.sha256.hexdigest()}
+        )
+        ChunkedUpload.objects.filter(pk=self.pk).update(updated_at=timezone.now())
+
+    def complete(self, checksum=''):
+        """
+        Join the chunks into the final file. Raises ValueError if chunks are
+        missing or the whole file does not match ``checksum``.
+        """
+        with db_transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=self.pk)
+            if upload.status != 'pending':
+                raise ValueError('Upload is already complete')
+            missing = sorted(set(range(self.total_chunks)) - set(upload.received_chunks()))
+            if missing:
+                raise ValueError(f'Missing chunks: {missing[:20]}')
+
+            chunk_names = [self.chunk_name(index) for index in range(self.total_chunks)]
+            stream = ChunkStream(chunk_names)
+            reader = HashingReader(stream)
+            content = File(reader, name=self.filename)
+            content.size = self.size
+            directory = self.PURPOSE_DIRECTORIES[self.purpose]
+            try:
+                name = default_storage.save(f'{directory}{get_valid_filename(self.filename)}', content)
+            finally:
+                stream.close()
+
+            sha256 = reader.sha256.hexdigest()
+            if reader.bytes_read != self.size or (checksum and checksum.lower() != sha256):
+                default_storage.delete(name)
+                raise ValueError('Assembled file does not match its size or checksum')
+
+            self.file.name = name
+            self.sha256 = sha256
+            self.status = 'complete'
+            self.completed_at = timezone.now()
+            self.save(update_fields=['file', 'sha256', 'status', 'completed_at', 'updated_at'])
+            self.discard_chunks()
+
+    def discard_chunks(self):
+        for index in self.chunks.values_list('index', flat=True):
+            default_storage.delete(self.chunk_name(index))
+        self.chunks.all().delete()
+
+    @classmethod
+    def claim(cls, upload_id, user, purpose):
+        """
+        Mark a completed upload as attached and return its file name, so it can
+        be assigned to a FileField. Each upload can be claimed once. Raises
+        ValueError if it is not a completed upload of ``user`` for ``purpose``.
+        """
+        try:
+            upload_id = uuid.UUID(str(upload_id))
+        except ValueError:
+            raise ValueError(f'{upload_id} is not a valid upload id')
+        claimed = cls.objects.filter(
+            pk=upload_id, user=user, purpose=purpose, status='complete'
+        ).update(status='attached', updated_at=timezone.now())
+        if not claimed:
+            raise ValueError(f'Upload {upload_id} is not a completed {purpose.replace("_", " ")} upload')
+        return cls.objects.values_list('file', flat=True).get(pk=upload_id)
+
+
+class UploadChunk(models.Model):
+    """A chunk of a ChunkedUpload that has been received and verified."""
+    upload = models.ForeignKey(
+        ChunkedUpload,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        verbose_name=_('upload')
+    )
+    index = models.PositiveIntegerField(_('index'))
+    size = models.PositiveIntegerField(_('size'))
+    sha256 = models.CharField(_('SHA-256'), max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('upload chunk')
+        verbose_name_plural = _('upload chunks')
+        ordering = ['upload', 'index']
+        unique_together = ['upload', 'index']
+
+    def __str__(self):
+        return f"{self.upload_id} chunk {self.index}"
+
+
+class MediaBlob(models.Model):
+    """
+    A file in content-addressed storage and the number of model fields that
+    reference it. See uploads.storage.
+    """
+    name = models.CharField(_('name'), max_length=255, unique=True)
+    sha256 = models.CharField(_('SHA-256'), max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(_('size'))
+    refcount = models.PositiveIntegerField(_('reference count'), default=0)
+    # References taken by storage saves whose model row has not been saved yet
+    pending = models.PositiveIntegerField(_('pending references'), default=0)
+    # Kept even when unreferenced, because an order line shows it
+    pinned = models.BooleanField(_('pinned'), default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    touched_at = models.DateTimeField(_('last saved at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('media blob')
+        verbose_name_plural = _('media blobs')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+    @classmethod
+    def reserve(cls, name, sha256, size):
+        """
+        Take a pending reference to ``name`` for a file that is being saved.
+        Must run in a transaction: the row stays locked until it ends, so a
+        concurrent delete_unreferenced() either finishes first or sees the
+        reference.
+        """
+        blob, created = cls.objects.select_for_update().get_or_create(
+            name=name, defaults={'sha256': sha256, 'size': size, 'refcount': 1, 'pending': 1}
+        )
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(
+                refcount=F('refcount') + 1, pending=F('pending') + 1, touched_at=timezone.now()
+            )
+
+    @classmethod
+    def add_references(cls, names):
+        """Count a new reference to each of ``names``, using up a pending one if taken."""
+        for name in names:
+            if not is_blob_name(name):
+                continue
+            if not cls.objects.filter(name=name, pending__gt=0).update(pending=F('pending') - 1):
+                cls.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+    @classmethod
+    def pin_urls(cls, urls):
+        """Keep the blobs behind ``urls`` (e.g. order line image snapshots) for good."""
+        names = [blob_name_from_url(url) for url in urls]
+        names = [name for name in names if is_blob_name(name)]
+        if names:
+            cls.objects.filter(name__in=names, pinned=False).update(pinned=True)
+
+    @classmethod
+    def release(cls, names):
+        """
+        Drop one reference from each of ``names``. Blobs left unreferenced are
+        deleted with their files once the transaction commits.
+        """
+        names = [name for name in names if is_blob_name(name)]
+        if not names:
+            return
+        for name in names:
+            cls.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        db_transaction.on_commit(lambda: cls.delete_unreferenced(names))
+
+    @classmethod
+    def delete_unreferenced(cls, names=None, touched_before=None):
+        """
+        Delete unreferenced blobs, optionally only among ``names`` or those
+        last saved before a time. Returns the count.
+        """
+        from .storage import media_storage
+
+        blobs = cls.objects.filter(refcount=0, pinned=False)
+        if names is not None:
+            blobs = blobs.filter(name__in=names)
+        if touched_before is not None:
+            blobs = blobs.filter(touched_at__lt=touched_before)
+        deleted = 0
+        for name in list(blobs.values_list('name', flat=True)):
+            with db_transaction.atomic():
+                # Re-check under the row lock that no save has reserved it since
+                blob = cls.objects.select_for_update().filter(
+                    name=name, refcount=0, pinned=False
+                ).first()
+                if blob is None:
+                    continue
+                blob.delete()
+                media_storage.delete(name)
+            deleted += 1
+        return deleted
+
+    @classmethod
+    def recount(cls):
+        """
+        Recompute every reference count from the tracked fields, dropping
+        pending references left by saves that never finished. Returns the
+        number of blobs whose count changed.
+        """
+        from .storage import media_fields
+
+        counts = {}
+        for model, field_names in media_fields():
+            for field_name in field_names:
+                rows = (
+                    model._default_manager.filter(**{f'{field_name}__startswith': BLOB_DIRECTORY})
+                    .values(field_name)
+                    .annotate(references=Count('pk'))
+                    .order_by()
+                    .values_list(field_name, 'references')
+                )
+                for name, references in rows:
+                    counts[name] = counts.get(name, 0) + references
+
+        changed = 0
+        for blob in cls.objects.only('name', 'refcount', 'pending').iterator():
+            refcount = counts.get(blob.name, 0)
+            if blob.refcount != refcount or blob.pending:
+                cls.objects.filter(pk=blob.pk).update(refcount=refcount, pending=0)
+                changed += 1
+        return changed
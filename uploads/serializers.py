@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import ChunkedUpload
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'purpose', 'filename', 'content_type', 'size', 'chunk_size', 'total_chunks',
+                  'received_chunks', 'status', 'sha256', 'created_at', 'completed_at']
+        read_only_fields = ['id', 'chunk_size', 'status', 'sha256', 'created_at', 'completed_at']
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes'
+            )
+        return value
+
+    def validate(self, data):
+        allowed = ChunkedUpload.PURPOSE_CONTENT_TYPES[data['purpose']]
+        if data['content_type'] not in allowed:
+            raise serializers.ValidationError({
+                'content_type': f"Must be one of: {', '.join(allowed)}"
+            })
+        return data
+
+    def get_received_chunks(self, obj):
+        return obj.received_chunks()
+
+
+class CompleteUploadSerializer(serializers.Serializer):
+    """Serializer for finishing a chunked upload"""
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
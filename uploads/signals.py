@@ -0,0 +1,49 @@
+"""
+Reference counting for content-addressed file fields.
+
+The names a row was loaded with are remembered on post_init, so a save only
+touches the blobs whose field actually changed.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import MediaBlob
+from .storage import media_fields
+
+
+def field_names(instance, fields):
+    # Deferred fields are left out rather than loaded with a query per row
+    return {
+        field: getattr(instance, field).name or ''
+        for field in fields if field in instance.__dict__
+    }
+
+
+def connect(model, fields):
+    def remember_media(sender, instance, **kwargs):
+        instance._media_names = field_names(instance, fields)
+
+    def update_media_references(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        previous = dict.fromkeys(fields, '') if created else getattr(instance, '_media_names', {})
+        current = field_names(instance, fields)
+        changed = [
+            field for field in fields
+            if field in previous and field in current and previous[field] != current[field]
+        ]
+        MediaBlob.add_references(current[field] for field in changed)
+        MediaBlob.release([previous[field] for field in changed])
+        instance._media_names = current
+
+    def release_media(sender, instance, **kwargs):
+        names = {**field_names(instance, fields), **getattr(instance, '_media_names', {})}
+        MediaBlob.release(list(names.values()))
+
+    uid = f'uploads.media:{model._meta.label}'
+    post_init.connect(remember_media, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(update_media_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_media, sender=model, weak=False, dispatch_uid=uid)
+
+
+for model, fields in media_fields():
+    connect(model, fields)
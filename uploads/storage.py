@@ -0,0 +1,108 @@
+"""
+Content-addressed media storage.
+
+Files saved through ContentAddressedStorage are hashed while they are
+streamed to a temporary file and stored once under their SHA-256, so the
+same photo uploaded for several products, or as a store logo, takes up the
+space of one file. Each stored file has a MediaBlob row counting the model
+fields that point at it; the file is deleted when the last one lets go.
+
+Saving a file takes a "pending" reference under the blob's row lock; the
+post_save receiver turns it into the field's reference. A release that
+races with the save therefore never sees a count of zero.
+
+Fields opt in with ``storage=content_addressed_storage``. References are
+tracked by the signal receivers in uploads.signals for every such field.
+"""
+import hashlib
+import os
+import tempfile
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction as db_transaction
+
+
+BLOB_DIRECTORY = 'blobs/'
+
+
+def blob_name(sha256, name):
+    extension = os.path.splitext(name)[1].lower()[:10]
+    return f'{BLOB_DIRECTORY}{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_DIRECTORY)
+
+
+def blob_name_from_url(url):
+    """Storage name for a media URL (absolute or not), or '' if it is not one."""
+    path = urlsplit(url or '').path
+    prefix = urlsplit(settings.MEDIA_URL).path
+    return unquote(path[len(prefix):]) if path.startswith(prefix) else ''
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names each file after the SHA-256 of its content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The name is chosen from the content in _save
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        directory = self.path(f'{BLOB_DIRECTORY}tmp')
+        os.makedirs(directory, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp:
+            try:
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+            except BaseException:
+                temp.close()
+                os.remove(temp.name)
+                raise
+
+        name = blob_name(sha256.hexdigest(), name)
+        with db_transaction.atomic():
+            # The reference is taken with the row locked while the file is
+            # checked, so a concurrent release cannot delete it underneath us
+            MediaBlob.reserve(name, sha256.hexdigest(), size)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temp.name)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp.name, self.file_permissions_mode)
+                os.replace(temp.name, path)
+        return name
+
+
+def content_addressed_storage():
+    """Storage for ``FileField(storage=...)``; a callable keeps it out of migrations."""
+    return media_storage
+
+
+media_storage = ContentAddressedStorage()
+
+
+def media_fields():
+    """(model, [field names]) for every model with content-addressed file fields."""
+    tracked = []
+    for model in apps.get_models():
+        names = [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+        ]
+        if names:
+            tracked.append((model, names))
+    return tracked
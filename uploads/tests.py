@@ -0,0 +1,217 @@
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Product, ProductImage
+from stores.models import Category, Store, StoreVerification
+from .models import ChunkedUpload, MediaBlob
+from .storage import media_storage
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CHUNKED_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=self.owner, name='Upload Store', status='approved')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.content = b'0123456789'
+
+    def start(self, purpose='product_image', content_type='image/png'):
+        response = self.client.post('/api/uploads/', {
+            'purpose': purpose, 'filename': 'photo.png',
+            'content_type': content_type, 'size': len(self.content),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_chunks'], 3)
+        return response.data['id']
+
+    def put_chunk(self, upload_id, index, data, checksum=None):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{upload_id}/chunks/{index}/', data,
+            content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(data).hexdigest(),
+        )
+
+    def send(self, upload_id, indexes):
+        for index in indexes:
+            data = self.content[index * 4:(index + 1) * 4]
+            self.assertEqual(self.put_chunk(upload_id, index, data).status_code, 200)
+
+    def test_resume_and_complete(self):
+        upload_id = self.start()
+
+        response = self.put_chunk(upload_id, 0, b'0123', checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        response = self.put_chunk(upload_id, 2, b'89999')
+        self.assertEqual(response.status_code, 400)
+
+        self.send(upload_id, [0, 2])
+        response = self.client.get(f'/api/uploads/{upload_id}/')
+        self.assertEqual(response.data['received_chunks'], [0, 2])
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+
+        # Resending a chunk replaces it rather than duplicating it
+        self.send(upload_id, [0, 1])
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/', {
+            'sha256': hashlib.sha256(self.content).hexdigest()
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'complete')
+
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        self.assertTrue(upload.file.name.startswith('products/'))
+        with default_storage.open(upload.file.name, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(upload.chunks.exists())
+        self.assertFalse(default_storage.exists(upload.chunk_name(0)))
+
+    def test_attach_to_product_image_once(self):
+        upload_id = self.start()
+        self.send(upload_id, range(3))
+        self.client.post(f'/api/uploads/{upload_id}/complete/')
+        product = Product.objects.create(
+            store=self.store, category=Category.objects.create(name='Art'),
+            name='Poster', description='-', price=Decimal('5.00'), quantity=1
+        )
+        url = f'/api/products/{product.slug}/images/'
+
+        response = self.client.post(url, {'upload_id': upload_id, 'is_main': True}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(product.images.get().image.name, ChunkedUpload.objects.get(pk=upload_id).file.name)
+
+        response = self.client.post(url, {'upload_id': upload_id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(product.images.count(), 1)
+
+    def test_verification_document_purpose(self):
+        upload_id = self.start('verification_document', 'application/pdf')
+        self.send(upload_id, range(3))
+        self.client.post(f'/api/uploads/{upload_id}/complete/')
+
+        response = self.client.post(f'/api/stores/{self.store.pk}/verification/', {
+            'business_name': 'Uploads Ltd', 'owner_id_upload_id': upload_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(StoreVerification.objects.get(store=self.store).owner_id.name.startswith('verification/documents/'))
+        self.assertEqual(ChunkedUpload.objects.get(pk=upload_id).status, 'attached')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email='seller@example.com', password='pass', is_seller=True)
+        self.store = Store.objects.create(owner=owner, name='Blob Store', status='approved')
+        self.products = [
+            Product.objects.create(
+                store=self.store, name=f'Mug {i}', description='-', price=Decimal('3.00'), quantity=1
+            )
+            for i in range(2)
+        ]
+        self.photo = b'\x89PNG same photo'
+
+    def add_image(self, product, content=None):
+        image = ProductImage(product=product)
+        image.image.save('photo.PNG', ContentFile(content or self.photo))
+        return image
+
+    def test_identical_uploads_share_one_refcounted_blob(self):
+        first = self.add_image(self.products[0])
+        second = self.add_image(self.products[1])
+        digest = hashlib.sha256(self.photo).hexdigest()
+        self.assertEqual(first.image.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.png')
+        self.assertEqual(second.image.name, first.image.name)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+
+        # A logo with the same content is another reference to the same file
+        self.store.logo.save('logo.png', ContentFile(self.photo))
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            self.store.logo = None
+            self.store.save()
+        self.assertTrue(default_storage.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.filter(pk=second.pk).delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_save_racing_a_release_keeps_the_file(self):
+        first = self.add_image(self.products[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get().refcount, 0)
+
+        # The same photo is stored again before the release's commit hook runs
+        second = ProductImage(product=self.products[1])
+        second.image.save('again.png', ContentFile(self.photo), save=False)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(default_storage.exists(second.image.name))
+
+        second.save()
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.pending), (1, 0))
+
+    def test_unfinished_saves_are_dropped_by_recount(self):
+        # A file stored for a row that was never saved
+        name = media_storage.save('x.png', ContentFile(b'orphan'))
+        blob = MediaBlob.objects.get(name=name)
+        self.assertEqual((blob.refcount, blob.pending), (1, 1))
+        MediaBlob.recount()
+        MediaBlob.objects.filter(pk=blob.pk).update(touched_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(MediaBlob.delete_unreferenced(touched_before=timezone.now() - timedelta(hours=1)), 1)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replacing_a_category_image_releases_the_old_blob(self):
+        category = Category.objects.create(name='Kitchen')
+        category.image.save('a.png', ContentFile(b'old'))
+        old_name = category.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            category.image.save('b.png', ContentFile(b'new'))
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(MediaBlob.objects.get().name, category.image.name)
+
+    def test_order_snapshots_are_kept(self):
+        image = self.add_image(self.products[0])
+        MediaBlob.pin_urls([f'http://testserver{image.image.url}'])
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertTrue(default_storage.exists(image.image.name))
+
+    def test_dedupe_existing_media(self):
+        names = [
+            default_storage.save(f'products/legacy{i}.jpg', ContentFile(self.photo)) for i in range(2)
+        ]
+        for product, name in zip(self.products, names):
+            ProductImage.objects.create(product=product, image=name)
+
+        call_command('dedupe_media', stdout=StringIO())
+
+        images = ProductImage.objects.all()
+        self.assertEqual({image.image.name for image in images}, {MediaBlob.objects.get().name})
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+        self.assertFalse(any(default_storage.exists(name) for name in names))
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import ChunkedUploadViewSet
+
+router = DefaultRouter()
+router.register(r'', ChunkedUploadViewSet, basename='chunked-upload')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,65 @@
+from django.conf import settings
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import ChunkedUpload
+from .serializers import ChunkedUploadSerializer, CompleteUploadSerializer
+
+
+class ChunkedUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads: create an upload, PUT each chunk as the raw request body
+    with its SHA-256 in the X-Chunk-SHA256 header, then complete it. Retrieving
+    an upload lists the chunks already received, so a client can resume after
+    a dropped connection by sending only the missing ones.
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """Store one chunk, streamed from the request body"""
+        upload = self.get_object()
+        index = int(index)
+        checksum = request.headers.get('X-Chunk-SHA256', '')
+        if not checksum:
+            return Response(
+                {'error': 'X-Chunk-SHA256 header is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            expected = upload.expected_chunk_size(index)
+            content_length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length, expected = None, 0
+        if content_length != expected:
+            return Response(
+                {'error': f'Chunk {index} must be {expected} bytes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # Read from the raw request stream; request.data would buffer it
+            upload.store_chunk(index, request._request, checksum)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'index': index, 'received_chunks': upload.received_chunks()})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Join the received chunks into the final file"""
+        upload = self.get_object()
+        serializer = CompleteUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload.complete(serializer.validated_data.get('sha256', ''))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data)